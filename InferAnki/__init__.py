@@ -1,22 +1,29 @@
 from aqt import mw, gui_hooks # type: ignore
 from aqt.editor import Editor # type: ignore
 from aqt.utils import showInfo, showCritical # type: ignore
+import asyncio
+import html
 import json
 import os
 import re
-from datetime import datetime
+import threading
+import time
 
-# Import addon modules
-from .functions.tts_handler import SpeechifyTTSProcessor 
-
-# Create alias for backward compatibility
-TTSProcessor = SpeechifyTTSProcessor
+# Import addon modules - only light ones; the rest are imported on first use
+from .functions.pipeline import PipelineStep, run_pipeline, run_pipeline_async
+from .functions.trace_log import get_trace_logger, trace_context
+from .functions.metrics import get_metrics, request_step
 
 # Addon configuration
 ADDON_NAME = "InferAnki"
 
 def get_addon_version():
-    """Get addon version from meta.json"""
+    """Get addon version from meta.json (read once, when first asked for)"""
+    version = getattr(get_addon_version, 'version', None)
+    if version:
+        return version
+    
+    version = "0.5.1"  # Fallback version
     try:
         addon_dir = os.path.dirname(__file__)
         meta_path = os.path.join(addon_dir, "meta.json")
@@ -24,14 +31,13 @@ def get_addon_version():
         if os.path.exists(meta_path):
             with open(meta_path, 'r', encoding='utf-8') as f:
                 meta = json.load(f)
-                return meta.get("dev_version", meta.get("human_version", "0.5.1"))
+                version = meta.get("dev_version", meta.get("human_version", version))
     except Exception as e:
         if CONFIG.get("debug_mode", False):
             showCritical(f"Error loading version from meta.json: {str(e)}")
     
-    return "0.5.1"  # Fallback version
-
-ADDON_VERSION = get_addon_version()
+    get_addon_version.version = version
+    return version
 
 # Load addon configuration
 def load_config():
@@ -57,85 +63,126 @@ def load_config():
 # Global config
 CONFIG = load_config()
 
-# Try to import OpenAI client safely
-try:
-    from .functions import OpenAIClient, NorwegianWordAnalyzer
-    OPENAI_AVAILABLE = True
-    # Removed success message to reduce noise
-except ImportError as e:
-    OPENAI_AVAILABLE = False
-    OpenAIClient = None
-    NorwegianWordAnalyzer = None
-    if CONFIG.get("debug_mode", False):
-        showCritical(f"❌ OpenAI not available: {e}")
-except Exception as e:
-    OPENAI_AVAILABLE = False
-    OpenAIClient = None
-    NorwegianWordAnalyzer = None
-    if CONFIG.get("debug_mode", False):
-        showCritical(f"❌ CardCraft loading error: {e}")
-
-# Initialize processors
-TTS_PROCESSOR = TTSProcessor(CONFIG)
-
-# Initialize CardCraft components if available
-if OPENAI_AVAILABLE and OpenAIClient and NorwegianWordAnalyzer:
+# Heavy components (TTS processor, OpenAI client, word analyzer) are built on first use,
+# so opening a profile does not wait for prompts.json, log folders or the Speechify SDK
+_COMPONENTS = {}
+_COMPONENTS_LOCK = threading.RLock()
+
+def _component(name, create):
+    with _COMPONENTS_LOCK:
+        if name not in _COMPONENTS:
+            _COMPONENTS[name] = create()
+        return _COMPONENTS[name]
+
+def show_critical_on_main(text):
+    """showCritical from any thread - components may be first needed by a background task"""
+    if threading.current_thread() is threading.main_thread():
+        showCritical(text)
+    else:
+        mw.taskman.run_on_main(lambda: showCritical(text))
+
+def get_tts_processor():
+    """Shared Speechify TTS processor"""
+    def create():
+        from .functions.tts_handler import SpeechifyTTSProcessor
+        return SpeechifyTTSProcessor(CONFIG)
+    return _component("tts_processor", create)
+
+def _create_cardcraft_component(class_name):
+    """OpenAIClient or NorwegianWordAnalyzer built from CONFIG, or None if CardCraft is unavailable"""
     try:
-        CARD_CRAFT = OpenAIClient(CONFIG)
-        WORD_ANALYZER = NorwegianWordAnalyzer(CONFIG)
+        from . import functions
+        component_class = getattr(functions, class_name)
+    except ImportError as e:
+        if CONFIG.get("debug_mode", False):
+            show_critical_on_main(f"❌ OpenAI not available: {e}")
+        return None
     except Exception as e:
         if CONFIG.get("debug_mode", False):
-            showCritical(f"❌ Error initializing CardCraft components: {e}")
-        CARD_CRAFT = None
-        WORD_ANALYZER = None
-else:
-    CARD_CRAFT = None
-    WORD_ANALYZER = None
-
-def log_cardcraft_step(step_name, word, data):
-    """Log CardCraft step to convert-{timestamp}.log - all 4 steps in one file"""
+            show_critical_on_main(f"❌ CardCraft loading error: {e}")
+        return None
+    
     try:
-        # Create logs directory in addon folder
-        addon_dir = os.path.dirname(__file__)
-        logs_dir = os.path.join(addon_dir, "logs")
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir, exist_ok=True)
-        
-        # Create single log file for the complete word analysis session
-        # Use only session timestamp (no word in filename for privacy)
-        session_time = getattr(log_cardcraft_step, 'session_time', None)
-        session_word = getattr(log_cardcraft_step, 'session_word', None)
-        
-        # Start new session if word changed or first call
-        if session_word != word or session_time is None:
-            log_cardcraft_step.session_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-            log_cardcraft_step.session_word = word
-            session_time = log_cardcraft_step.session_time
-        
-        # Use only timestamp in filename - no word for privacy
-        log_file = os.path.join(logs_dir, f"convert-{session_time}.log")
-        
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"TIMESTAMP: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"STEP: {step_name}\n")
-            f.write(f"WORD: {word}\n")
-            f.write(f"{'='*60}\n")
-            f.write("DATA:\n")
-            f.write(json.dumps(data, indent=2, ensure_ascii=False))
-            f.write(f"\n{'='*60}\n\n")
+        return component_class(CONFIG)
     except Exception as e:
-        # Also log to Anki console
-        showInfo(f"Logging error: {e}")
+        if CONFIG.get("debug_mode", False):
+            show_critical_on_main(f"❌ Error initializing CardCraft components: {e}")
+        return None
+
+def get_card_craft():
+    """Shared OpenAI client for connection tests, or None"""
+    return _component("card_craft", lambda: _create_cardcraft_component("OpenAIClient"))
+
+def get_word_analyzer():
+    """Shared CardCraft word analyzer, or None if OpenAI is unavailable"""
+    return _component("word_analyzer", lambda: _create_cardcraft_component("NorwegianWordAnalyzer"))
 
 def init_addon():
     try:
         gui_hooks.editor_did_init_buttons.append(add_editor_buttons)
         gui_hooks.webview_did_receive_js_message.append(on_js_message)
+        gui_hooks.browser_menus_did_init.append(add_browser_menu_actions)
+        gui_hooks.profile_did_open.append(warm_tts_audio_cache)
+        gui_hooks.profile_will_close.append(close_http_connections)
+        gui_hooks.main_window_did_init.append(add_tools_menu_actions)
+        init_speculative_cardcraft()
             
     except Exception as e:
         showCritical(f"Error initializing {ADDON_NAME}: {str(e)}")
 
+# Speechify keys that are only config.json placeholders
+_SPEECHIFY_KEY_PLACEHOLDERS = ("", "your-api-key-here", "YOUR_SPEECHIFY_API_KEY_HERE")
+
+def tts_configured():
+    """True if TTS is enabled and a Speechify API key is set - read from CONFIG, nothing is built"""
+    api_key = CONFIG.get("speechify_api_key", "")
+    return bool(CONFIG.get("tts_enabled", True)) and api_key not in _SPEECHIFY_KEY_PLACEHOLDERS
+
+def warm_tts_audio_cache():
+    """Index the profile's voiced audio in the background so the first TTS lookup is instant
+    
+    Skipped unless TTS can be used - then the cache is built by the first TTS call, if ever.
+    """
+    if not tts_configured() or not CONFIG.get("tts_cache_enabled", True):
+        return
+    mw.taskman.run_in_background(lambda: get_tts_processor().get_audio_cache(), lambda future: None)
+
+def close_http_connections():
+    """Drop idle pooled OpenAI connections when the profile closes"""
+    from .functions.http_pool import close_all_pools
+    close_all_pools()
+
+def add_tools_menu_actions():
+    """Tools > InferAnki performance: per-step latency and token report"""
+    from aqt.qt import QAction, qconnect # type: ignore
+    
+    action = QAction("InferAnki performance", mw)
+    qconnect(action.triggered, show_performance_report)
+    mw.form.menuTools.addAction(action)
+
+def show_performance_report():
+    """Show request metrics recorded since Anki started"""
+    from aqt.utils import showText # type: ignore
+    
+    metrics = get_metrics(CONFIG)
+    if metrics is None:
+        showInfo("Performance metrics are disabled (metrics_enabled in config.json).")
+        return
+    report = metrics.report()
+
+    from .functions.token_budget import get_token_budget
+    budget = get_token_budget(CONFIG)
+    limits = budget.snapshot() if budget is not None else {}
+    if limits:
+        report += "\n\nAdaptive max tokens (step: current limit, answers seen, answers resent after hitting it):"
+        for step, stats in sorted(limits.items()):
+            limit = stats["limit"] if stats["limit"] is not None else "prompt limit"
+            report += f"\n{step}: {limit}, {stats['samples']}, {stats['truncated']}"
+    if CONFIG.get("metrics_export_path"):
+        report += f"\n\nEvery request is also exported to {CONFIG['metrics_export_path']}"
+    # <pre> keeps the table columns aligned
+    showText(f"<pre>{html.escape(report)}</pre>", type="html", title="InferAnki performance", minWidth=900, copyBtn=True)
+
 def on_js_message(handled, message, context):
     """Handle JavaScript messages from editor"""
     if message.startswith("inferanki_"):
@@ -260,6 +307,7 @@ def is_norsk_field_available(editor):
         return False
 
 def handle_tts_command(editor):
+    in_background = False
     try:
         # ✨ DISABLE TTS BUTTON AT THE START ✨
         disable_tts_button(editor)
@@ -267,18 +315,34 @@ def handle_tts_command(editor):
         # Check if Norsk field has content before processing
         if not is_norsk_field_available(editor):
             showInfo("⚠️ Norsk field is empty!")
-            enable_tts_button(editor)
             return
-            
-        # Process TTS with real functionality - silent operation
-        result = TTS_PROCESSOR.process_text(editor)
-        # Success is indicated by audio appearing in the audio field
+        
+        processor = get_tts_processor()
+        text = processor.prepare_text(editor)
+        if not text:
+            return
+        
+        note = editor.note
+        
+        def on_done(future):
+            try:
+                # Success is indicated by audio appearing in the audio field
+                processor.attach_audio(editor_for_note(editor, note), future.result())
+            except Exception as e:
+                showCritical(f"TTS Error: {str(e)}")
+            finally:
+                enable_tts_button(editor)
+        
+        # Speechify request runs in the background - the editor stays responsive
+        mw.taskman.run_in_background(lambda: processor.create_audio_file(text), on_done)
+        in_background = True
             
     except Exception as e:
         showCritical(f"TTS Error: {str(e)}")
     finally:
-        # ✨ ALWAYS RE-ENABLE TTS BUTTON AT THE END ✨
-        enable_tts_button(editor)
+        # ✨ RE-ENABLE TTS BUTTON UNLESS THE BACKGROUND TASK WILL DO IT ✨
+        if not in_background:
+            enable_tts_button(editor)
 
 def disable_cardcraft_button(editor):
     """Disable CardCraft button during processing to prevent crashes"""
@@ -520,11 +584,12 @@ def enable_tts_button(editor):
 
 def handle_cardcraft_analysis(editor):
     """Handle CardCraft AI word analysis"""
+    in_background = False
     try:
         # ✨ DISABLE CARDCRAFT BUTTON AT THE START ✨
         disable_cardcraft_button(editor)
         
-        if not WORD_ANALYZER:
+        if not get_word_analyzer():
             showCritical("❌ CardCraft AI not available. Check OpenAI configuration.")
             enable_cardcraft_button(editor)
             return
@@ -554,102 +619,556 @@ def handle_cardcraft_analysis(editor):
         # Use the FULL text before 🔸 for analysis, not just the last word
         word = text
 
-        # Analyze the word (can be a single word or full text)
-        result = WORD_ANALYZER.analyze_word(word)
+        note = editor.note
+        mode = cardcraft_mode_for_note(note, editor)
+        # Progressive mode previews each step as it finishes; the note is still written once
+        on_step_done = progressive_preview(editor, note) if CONFIG.get("cardcraft_progressive_fields", False) else None
         
-        # Log Step 1
-        log_cardcraft_step("STEP1_NORWEGIAN_ANALYSIS", word, {"input": word, "result": result})
+        def on_done(future):
+            try:
+                apply_cardcraft_results(editor_for_note(editor, note), word, future.result())
+            except Exception as e:
+                showCritical(f"CardCraft Analysis Error: {str(e)}")
+            finally:
+                enable_cardcraft_button(editor)
         
-        if result:
-            # Step 1: Format Norwegian analysis and insert into field 2 (Norsk)
-            formatted_norwegian = format_analysis_result(result)
-            insert_analysis_into_editor(editor, formatted_norwegian, "field_2")
-            
-            # Step 2: Translate to English and insert into field 1 (English)
-            english_result = WORD_ANALYZER.translate_to_language(result)
-            
-            # Log Step 2
-            log_cardcraft_step("STEP2_ENGLISH_TRANSLATION", word, {"input": result, "result": english_result})
-            
-            if english_result:
-                formatted_english = format_analysis_result(english_result)
-                insert_analysis_into_editor(editor, formatted_english, "field_1")
-                
-                # Step 3: Get Norwegian word description and add to Norsk field
-                description_list = WORD_ANALYZER.get_description(formatted_norwegian)
-                
-                # Log Step 3
-                log_cardcraft_step("STEP3_NORWEGIAN_DESCRIPTION", word, {"input": formatted_norwegian, "result": description_list})
-                
-                if description_list:
-                    # Add description lines to Norwegian field with proper HTML formatting
-                    description_text = "<br>".join(description_list)
-                    current_norsk = get_field_content(editor, "Norsk")
-                    enhanced_norsk = f"{current_norsk}<br><br>{description_text}"
-                    insert_analysis_into_editor(editor, enhanced_norsk, "Norsk")
-                
-                # Step 4: Get usage examples and add to Norsk field
-                examples_text = WORD_ANALYZER.get_examples_simple(result)
-                
-                # Log Step 4
-                log_cardcraft_step("STEP4_AI_EXAMPLES", word, {"input": result, "result": examples_text})
-                
-                if examples_text:
-                    # Convert Markdown bold (**text**) to HTML (<b>text</b>)
-                    import re
-                    examples_html = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', examples_text)
-                    
-                    # Replace newlines with <br> tags
-                    examples_html = examples_html.replace("\n", "<br>")
-                    
-                    # Add examples to Norwegian field
-                    current_norsk = get_field_content(editor, "Norsk")
-                    enhanced_norsk = f"{current_norsk}<br><br>{examples_html}"
-                    insert_analysis_into_editor(editor, enhanced_norsk, "Norsk")
-                
-                # Step 5: Get example sentences with user context and add to Norsk field
-                # Get user_context from ai_prompts.json instead of hardcoding
-                sentences_text = WORD_ANALYZER.get_examples_sentences(result)
-                
-                # Log Step 5
-                log_cardcraft_step("STEP5_NORWEGIAN_SENTENCES", word, {"input": result, "result": sentences_text})
-                
-                if sentences_text:
-                    # Convert Markdown bold (**text**) to HTML (<b>text</b>)
-                    sentences_html = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', sentences_text)
-                    
-                    # Replace newlines with <br> tags
-                    sentences_html = sentences_html.replace("\n", "<br>")
-                    
-                    # Add sentences to Norwegian field with separator
-                    current_norsk = get_field_content(editor, "Norsk")
-                    enhanced_norsk = f"{current_norsk}<br><br>{sentences_html}"
-                    insert_analysis_into_editor(editor, enhanced_norsk, "Norsk")
-            else:
-                showCritical(f"⚠️ Norwegian analysis complete, but English translation failed for '{word}'")
-        else:
-            showCritical(f"❌ Could not analyze the word '{word}'. Please try again.")
+        def run():
+            # Steps already run while the user was typing are not requested again
+            completed = SPECULATOR.results_for(word) if SPECULATOR else None
+            return run_cardcraft_pipeline(word, completed=completed, on_step_done=on_step_done, mode=mode)
+        
+        # Run the pipeline in the background so Anki stays responsive; field writes happen in on_done
+        mw.taskman.run_in_background(run, on_done)
+        in_background = True
             
     except Exception as e:
         showCritical(f"CardCraft Analysis Error: {str(e)}")
     finally:
-        # ✨ ALWAYS RE-ENABLE CARDCRAFT BUTTON AT THE END ✨
-        enable_cardcraft_button(editor)
+        # ✨ RE-ENABLE CARDCRAFT BUTTON UNLESS THE BACKGROUND TASK WILL DO IT ✨
+        if not in_background:
+            enable_cardcraft_button(editor)
+
+def apply_cardcraft_results(editor, word, results):
+    """Write CardCraft pipeline results into the note with one editor refresh and one save (main thread)"""
+    result = results["analysis"]
+    get_trace_logger(CONFIG).log("cardcraft_results", trace=word, results=results)
+    
+    if not result:
+        showCritical(f"❌ Could not analyze the word '{word}'. Please try again.")
+        return
+    
+    # Field 1 gets the translation, field 2 (Norsk) the word stack with steps 3-5 appended
+    patch = NotePatch(editor)
+    patch.update(cardcraft_field_updates(results))
+    patch.commit()
+    
+    if not results["translation"]:
+        showCritical(f"⚠️ Norwegian analysis complete, but English translation failed for '{word}'")
+
+# Pipeline step name -> step boundary name used in the trace log, job journal and speculation
+CARDCRAFT_STEPS = {
+    "analysis": "STEP1_NORWEGIAN_ANALYSIS",
+    "translation": "STEP2_ENGLISH_TRANSLATION",
+    "description": "STEP3_NORWEGIAN_DESCRIPTION",
+    "examples_simple": "STEP4_AI_EXAMPLES",
+    "sentences": "STEP5_NORWEGIAN_SENTENCES",
+}
+
+def run_cardcraft_pipeline(word, completed=None, on_step_done=None, mode="steps"):
+    """Run the five CardCraft steps as a dependency graph and return results by step name
+    
+    Only step 1 (analysis) is a real dependency: translation, examples and sentences
+    need the step 1 JSON and the description needs its formatted text, so steps 2-5
+    run concurrently once step 1 returns.
+    
+    In "fused" mode all five results come from one JSON-mode request instead; if its
+    answer is unusable the five steps run as usual.
+    
+    completed maps step boundary names (CARDCRAFT_STEPS values) to results that are
+    reused instead of calling the API again; on_step_done(boundary, result) is called
+    from worker threads for every step that produced a result.
+    """
+    completed = completed or {}
+    analyzer = get_word_analyzer()
+    with trace_context(word):
+        if mode == "fused" and not all(boundary in completed for boundary in CARDCRAFT_STEPS.values()):
+            results = analyzer.run_step_flow(_fused_flow(analyzer, word, completed, on_step_done))
+            if results:
+                return results
+        steps = _cardcraft_steps(analyzer, word, completed, on_step_done, analyzer.run_step_flow)
+        return run_pipeline(steps, max_workers=CONFIG.get("cardcraft_max_parallel_steps", 4))
+
+async def run_cardcraft_pipeline_async(client, word, completed=None, on_step_done=None, mode="steps"):
+    """run_cardcraft_pipeline with the requests awaited on client's event loop (an AsyncOpenAIClient)
+    
+    No thread waits for a request, so many notes can be crafted at once.
+    """
+    completed = completed or {}
+    analyzer = get_word_analyzer()
+    with trace_context(word):
+        if mode == "fused" and not all(boundary in completed for boundary in CARDCRAFT_STEPS.values()):
+            results = await client.run_step_flow(_fused_flow(analyzer, word, completed, on_step_done))
+            if results:
+                return results
+        steps = _cardcraft_steps(analyzer, word, completed, on_step_done, client.run_step_flow)
+        return await run_pipeline_async(steps)
+
+def _fused_flow(analyzer, word, completed, on_step_done):
+    """Step flow of the fused mode: all five results from one request, or None if its answer is unusable"""
+    with request_step("FUSED_CARDCRAFT"):
+        fused = yield from analyzer.step_flow("fused", word)
+    if not fused:
+        return None
+    results = {}
+    for name, boundary in CARDCRAFT_STEPS.items():
+        if boundary in completed:
+            results[name] = completed[boundary]
+            continue
+        results[name] = fused.get(name)
+        if results[name] is not None and on_step_done:
+            on_step_done(boundary, results[name])
+    return results
+
+def _cardcraft_steps(analyzer, word, completed, on_step_done, run_flow):
+    """The five CardCraft pipeline steps; run_flow runs a step flow (in a thread, or as a coroutine)"""
+    def journaled(name, make_flow):
+        boundary = CARDCRAFT_STEPS[name]
+        def step_flow(*args):
+            if boundary in completed:
+                get_trace_logger(CONFIG).log("step", step=boundary, reused=True)
+                return completed[boundary]
+            started = time.monotonic()
+            with request_step(boundary):
+                result = yield from make_flow(*args)
+            get_trace_logger(CONFIG).log("step", step=boundary, elapsed=round(time.monotonic() - started, 3), ok=result is not None)
+            if result is not None and on_step_done:
+                on_step_done(boundary, result)
+            return result
+        return lambda *args: run_flow(step_flow(*args))
+    
+    def flow(name):
+        return lambda *args: analyzer.step_flow(name, *args)
+    
+    return [
+        PipelineStep("analysis", journaled("analysis", lambda: analyzer.step_flow("analysis", word))),
+        PipelineStep("translation", journaled("translation", flow("translation")), ["analysis"]),
+        PipelineStep(
+            "description",
+            journaled("description", lambda analysis: analyzer.step_flow("description", format_analysis_result(analysis))),
+            ["analysis"]
+        ),
+        PipelineStep("examples_simple", journaled("examples_simple", flow("examples_simple")), ["analysis"]),
+        PipelineStep("sentences", journaled("sentences", flow("sentences")), ["analysis"]),
+    ]
+
+# Speculative steps 1 (and 2) while the user types - None unless enabled in config.json
+SPECULATOR = None
+
+def init_speculative_cardcraft():
+    """Start speculating on the Norsk field after typing pauses when cardcraft_speculative is set"""
+    global SPECULATOR
+    if not CONFIG.get("cardcraft_speculative", False):
+        return
+    from .functions.speculative import SpeculativeCardCraft
+    
+    analysis = CARDCRAFT_STEPS["analysis"]
+    
+    # The analyzer and the request loop are built by the first speculation, not at startup.
+    # Steps run on the loop, so text that changed cancels the requests still in flight.
+    def submit(step, *args):
+        from .functions.async_openai_client import get_blocking_client
+        analyzer = get_word_analyzer()
+        if analyzer is None:
+            return None
+        requests = get_blocking_client(CONFIG)
+        return requests.submit(requests.client.run_step_flow, analyzer.step_flow(step, *args))
+    
+    def analyze(word, results):
+        return submit("analysis", word)
+    
+    def translate(word, results):
+        return submit("translation", results[analysis])
+    
+    steps = [(analysis, analyze)]
+    if CONFIG.get("cardcraft_speculative_translation", True):
+        steps.append((CARDCRAFT_STEPS["translation"], translate))
+    SPECULATOR = SpeculativeCardCraft(steps, delay=CONFIG.get("cardcraft_speculative_delay", 1.0))
+    gui_hooks.editor_did_load_note.append(on_editor_load_note)
+    gui_hooks.editor_did_fire_typing_timer.append(on_editor_typing)
+
+# CardCraft mode of the note last loaded in an editor - the typing timer must not query its cards
+_LOADED_NOTE_MODE = {"note": None, "mode": None}
+
+def on_editor_load_note(editor):
+    """Resolve the CardCraft mode of the note the editor just loaded, once"""
+    note = getattr(editor, "note", None)
+    if note is not None:
+        _LOADED_NOTE_MODE.update(note=note, mode=cardcraft_mode_for_note(note, editor))
+
+def loaded_note_mode(note):
+    """CardCraft mode of note, resolved when it was loaded (or now, for a note loaded elsewhere)"""
+    if _LOADED_NOTE_MODE["note"] is not note:
+        _LOADED_NOTE_MODE.update(note=note, mode=cardcraft_mode_for_note(note))
+    return _LOADED_NOTE_MODE["mode"]
+
+def on_editor_typing(note):
+    """Anki's typing timer fired for note - speculate on its Norsk field (field index 1)"""
+    try:
+        field_text = note.fields[1] if len(note.fields) > 1 else ""
+        if "🔸" in field_text or loaded_note_mode(note) == "fused":
+            # Already crafted, or the deck makes one fused request anyway
+            SPECULATOR.cancel()
+            return
+        SPECULATOR.text_changed(get_word_from_note(note))
+    except Exception as e:
+        if CONFIG.get("debug_mode", False):
+            print(f"Speculative CardCraft error: {e}")
+
+def cardcraft_mode_for_note(note, editor=None):
+    """CardCraft mode ("steps" or "fused") configured for the deck of note (main thread)"""
+    from .functions.wordstack import resolve_cardcraft_mode
+    
+    if not CONFIG.get("cardcraft_deck_modes"):
+        return resolve_cardcraft_mode(CONFIG)  # No per-deck modes - no need to look up the deck
+    deck_name = None
+    try:
+        cards = note.cards() if note.id else []
+        if cards:
+            deck_id = cards[0].did
+        else:
+            # A note in the Add dialog has no cards yet - use the deck chosen there
+            deck_chooser = getattr(getattr(editor, "parentWindow", None), "deck_chooser", None)
+            deck_id = deck_chooser.selected_deck_id if deck_chooser else None
+        if deck_id:
+            deck_name = mw.col.decks.name(deck_id)
+    except Exception:
+        pass  # Unknown deck - the global cardcraft_mode applies
+    return resolve_cardcraft_mode(CONFIG, deck_name)
+
+def markdown_to_field_html(text):
+    """Convert Markdown bold (**text**) to HTML (<b>text</b>) and newlines to <br> tags"""
+    html = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
+    return html.replace("\n", "<br>")
+
+def cardcraft_field_updates(results):
+    """Compose final field contents from CardCraft pipeline results: {field_index: html}
+    
+    Pure function of the results, without touching any note - used by the editor,
+    progressive previews (with the steps finished so far) and bulk enrichment.
+    """
+    analysis = results.get("analysis")
+    if not analysis:
+        return {}
+    
+    # Field 2 (Norsk): word stack, then description, examples and sentences
+    norsk = format_analysis_result(analysis)
+    if results.get("description"):
+        norsk += "<br><br>" + "<br>".join(results["description"])
+    if results.get("examples_simple"):
+        norsk += "<br><br>" + markdown_to_field_html(results["examples_simple"])
+    if results.get("sentences"):
+        norsk += "<br><br>" + markdown_to_field_html(results["sentences"])
+    updates = {1: norsk}
+    
+    # Field 1: translation
+    if results.get("translation"):
+        updates[0] = format_analysis_result(results["translation"])
+    
+    return updates
+
+def add_browser_menu_actions(browser):
+    """Add InferAnki bulk actions to the Browser's Notes menu"""
+    try:
+        from aqt.qt import QAction, qconnect # type: ignore
+        
+        action = QAction("InferAnki: Enrich selected notes (CardCraft ✨)", browser)
+        qconnect(action.triggered, lambda: enrich_selected_notes(browser))
+        tts_action = QAction("InferAnki: Generate audio for selected notes (TTS 👩🏼)", browser)
+        qconnect(tts_action.triggered, lambda: voice_selected_notes(browser))
+        resume_action = QAction("InferAnki: Resume interrupted bulk jobs", browser)
+        qconnect(resume_action.triggered, lambda: resume_bulk_jobs(browser))
+        browser.form.menu_Notes.addSeparator()
+        browser.form.menu_Notes.addAction(action)
+        browser.form.menu_Notes.addAction(tts_action)
+        browser.form.menu_Notes.addAction(resume_action)
+    except Exception as e:
+        if CONFIG.get("debug_mode", False):
+            showCritical(f"Error adding browser actions: {str(e)}")
+
+def get_job_journal_for_profile():
+    """Return the bulk job journal of the current Anki profile"""
+    from .functions.job_journal import get_job_journal
+    return get_job_journal(mw.pm.name)
+
+def enrich_selected_notes(browser):
+    """Run the full CardCraft pipeline over the notes selected in the Browser"""
+    if not get_word_analyzer():
+        showCritical("❌ CardCraft AI not available. Check OpenAI configuration.")
+        return
+    
+    note_ids = browser.selected_notes()
+    if not note_ids:
+        showInfo("No notes selected.")
+        return
+    
+    # Journal the job before any request so an interrupted run can be resumed
+    journal = get_job_journal_for_profile()
+    job_id = journal.create_job("cardcraft", note_ids)
+    run_cardcraft_bulk_job(browser, journal, job_id, note_ids)
+
+def voice_selected_notes(browser):
+    """Generate TTS audio for the notes selected in the Browser"""
+    processor = get_tts_processor()
+    if not processor.enabled:
+        showInfo("Speechify TTS is disabled in configuration")
+        return
+    if not processor.api_key or processor.api_key == "your-api-key-here":
+        showCritical("Speechify API key not configured. Please add 'speechify_api_key' to config.json")
+        return
+    from .functions.tts_handler import speechify_available
+    if not speechify_available():
+        showCritical("Speechify TTS requires 'speechify-api' library")
+        return
+    
+    note_ids = browser.selected_notes()
+    if not note_ids:
+        showInfo("No notes selected.")
+        return
+    
+    journal = get_job_journal_for_profile()
+    job_id = journal.create_job("tts", note_ids)
+    run_tts_bulk_job(browser, journal, job_id, note_ids)
+
+# Bulk jobs running in this session - still RUNNING in the journal, but not interrupted
+_ACTIVE_BULK_JOBS = set()
+
+def resume_bulk_jobs(browser):
+    """Resume every interrupted bulk job of the current profile, one after another"""
+    journal = get_job_journal_for_profile()
+    jobs = journal.unfinished_jobs(exclude=_ACTIVE_BULK_JOBS)
+    if not jobs:
+        if _ACTIVE_BULK_JOBS:
+            showInfo("InferAnki bulk jobs are still running - nothing to resume.")
+        else:
+            showInfo("No interrupted InferAnki bulk jobs.")
+        return
+    
+    # The jobs share the progress dialog, so each starts when the previous one is done
+    def resume_next():
+        while jobs:
+            job = jobs.pop(0)
+            if job["job_id"] in _ACTIVE_BULK_JOBS:
+                continue
+            note_ids = journal.remaining_notes(job["job_id"])
+            if job["kind"] == "cardcraft":
+                if not get_word_analyzer():
+                    showCritical("❌ CardCraft AI not available. Check OpenAI configuration.")
+                    continue
+                run_cardcraft_bulk_job(browser, journal, job["job_id"], note_ids, on_done=resume_next)
+                return
+            if job["kind"] == "tts":
+                run_tts_bulk_job(browser, journal, job["job_id"], note_ids, on_done=resume_next)
+                return
+    
+    resume_next()
+
+def _bulk_job_done(job_id, on_done):
+    """Forget a finished bulk job and start whatever was waiting for it (once per job)"""
+    if job_id not in _ACTIVE_BULK_JOBS:
+        return
+    _ACTIVE_BULK_JOBS.discard(job_id)
+    if on_done:
+        on_done()
+
+def run_cardcraft_bulk_job(browser, journal, job_id, note_ids, on_done=None):
+    """Run (or resume) a journaled bulk CardCraft job over note_ids; on_done() is called when it ends"""
+    from aqt.operations.note import update_notes # type: ignore
+    from .functions.async_openai_client import get_blocking_client
+    from .functions.bulk import BulkJob
+    from .functions.job_journal import DONE, FAILED
+    
+    _ACTIVE_BULK_JOBS.add(job_id)
+    
+    # Read notes on the main thread; workers only do network I/O
+    items = []
+    skipped = []
+    modes = {}
+    for note_id in note_ids:
+        try:
+            note = mw.col.get_note(note_id)
+        except Exception:
+            # Note was deleted since the job started
+            skipped.append(note_id)
+            continue
+        word = get_word_from_note(note)
+        if word:
+            items.append((note, word))
+            modes[note.id] = cardcraft_mode_for_note(note)
+        else:
+            skipped.append(note_id)
+    journal.mark_notes(job_id, skipped, DONE)
+    
+    if not items:
+        journal.finish_job(job_id)
+        showInfo("⚠️ None of the selected notes has a word in the 'Norsk' field.")
+        _bulk_job_done(job_id, on_done)
+        return
+    
+    state = {"finished": False, "cancelled": False, "writes": 0}
+    
+    def maybe_finish_job():
+        # Finished only when the run ended and every note was written; failed notes stay resumable
+        if not state["finished"] or state["writes"]:
+            return
+        if not state["cancelled"] and not journal.remaining_notes(job_id):
+            journal.finish_job(job_id)
+        _bulk_job_done(job_id, on_done)
+    
+    def note_updates(note, results):
+        updates = cardcraft_field_updates(results)
+        if not updates:
+            journal.mark_notes(job_id, [note.id], FAILED)
+        return updates or None
+    
+    async def process(item):
+        # Runs on the request loop: a note waiting for its requests holds no thread
+        note, word = item
+        loop = asyncio.get_running_loop()
+        # Steps completed before an interruption are reused - no paid request is repeated
+        completed = await loop.run_in_executor(None, journal.completed_steps, job_id, note.id)
+        results = await run_cardcraft_pipeline_async(
+            requests.client, word,
+            completed=completed,
+            on_step_done=lambda boundary, result: journal.record_step(job_id, note.id, boundary, result),
+            mode=modes[note.id]
+        )
+        return await loop.run_in_executor(None, note_updates, note, results)
+    
+    def apply_batch(batch):
+        notes = []
+        for (note, word), updates in batch:
+            for field_index, text in updates.items():
+                if len(note.fields) > field_index:
+                    note.fields[field_index] = text
+            notes.append(note)
+        
+        def on_saved(_changes, written=[note.id for note in notes]):
+            # Notes count as done only once their fields are committed to the collection
+            journal.mark_notes(job_id, written, DONE)
+            state["writes"] -= 1
+            maybe_finish_job()
+        
+        # One collection write (and one undo step) per batch instead of per note
+        state["writes"] += 1
+        update_notes(parent=browser, notes=notes).success(on_saved).run_in_background()
+    
+    def on_finished(job):
+        state["finished"] = True
+        state["cancelled"] = job.cancelled
+        maybe_finish_job()
+    
+    # Notes are handed to the shared event loop rather than a worker thread each
+    requests = get_blocking_client(CONFIG)
+    BulkJob(
+        browser, "CardCraft", items, None, apply_batch,
+        max_workers=CONFIG.get("openai_async_max_in_flight", 64),
+        batch_size=CONFIG.get("bulk_batch_size", 50),
+        on_finished=on_finished,
+        submit=lambda item: requests.submit(process, item)
+    ).start()
+
+def run_tts_bulk_job(browser, journal, job_id, note_ids, on_done=None):
+    """Run (or resume) a journaled bulk TTS job over note_ids; on_done() is called when it ends"""
+    from aqt.operations.note import update_notes # type: ignore
+    from .functions.bulk import BulkJob
+    from .functions.bulk_tts import TTSVoicer, apply_note_audio, plan_notes
+    from .functions.job_journal import DONE, FAILED
+    
+    _ACTIVE_BULK_JOBS.add(job_id)
+    
+    notes = []
+    missing = []
+    for note_id in note_ids:
+        try:
+            notes.append(mw.col.get_note(note_id))
+        except Exception:
+            missing.append(note_id)
+    # Notes that already have audio are left alone - a resumed job skips what it voiced
+    processor = get_tts_processor()
+    items, skipped = plan_notes(processor, notes, CONFIG.get("tts_bulk_skip_existing", True))
+    journal.mark_notes(job_id, missing + skipped, DONE)
+    
+    if not items:
+        journal.finish_job(job_id)
+        showInfo("⚠️ No selected note needs audio (empty text, no Audio field or audio already present).")
+        _bulk_job_done(job_id, on_done)
+        return
+    
+    voicer = TTSVoicer(processor, CONFIG.get("speechify_requests_per_minute", 60))
+    state = {"finished": False, "cancelled": False, "writes": 0}
+    
+    def maybe_finish_job():
+        if not state["finished"] or state["writes"]:
+            return
+        if not state["cancelled"] and not journal.remaining_notes(job_id):
+            journal.finish_job(job_id)
+        _bulk_job_done(job_id, on_done)
+    
+    def process(item):
+        note, text = item
+        try:
+            return voicer.voice(text)
+        except Exception:
+            journal.mark_notes(job_id, [note.id], FAILED)
+            return None
+    
+    def apply_batch(batch):
+        notes = []
+        for (note, text), audio_path in batch:
+            apply_note_audio(processor, note, audio_path)
+            notes.append(note)
+        
+        def on_saved(_changes, written=[note.id for note in notes]):
+            journal.mark_notes(job_id, written, DONE)
+            state["writes"] -= 1
+            maybe_finish_job()
+        
+        # One collection write (and one undo step) per batch instead of per note
+        state["writes"] += 1
+        update_notes(parent=browser, notes=notes).success(on_saved).run_in_background()
+    
+    def on_finished(job):
+        state["finished"] = True
+        state["cancelled"] = job.cancelled
+        maybe_finish_job()
+    
+    BulkJob(
+        browser, "TTS", items, process, apply_batch,
+        max_workers=CONFIG.get("tts_bulk_max_concurrency", 4),
+        batch_size=CONFIG.get("bulk_batch_size", 50),
+        on_finished=on_finished
+    ).start()
 
 def get_selected_text_from_editor(editor):
     """Get text from Norsk field, processing everything before 🔸 symbol"""
+    if hasattr(editor, 'note') and editor.note:
+        return get_word_from_note(editor.note)
+    return ""
+
+def get_word_from_note(note):
+    """Get text from the note's Norsk field, processing everything before 🔸 symbol"""
     try:
         # Find Norsk field by name first
         norsk_field_index = None
         
-        if hasattr(editor, 'note') and editor.note:
+        if note:
             # Use field index 1 (second field) for Norsk content
             norsk_field_index = 1
             if norsk_field_index is None:
                 norsk_field_index = 1
             
-            if len(editor.note.fields) > norsk_field_index:
-                field_text = editor.note.fields[norsk_field_index].strip()
+            if len(note.fields) > norsk_field_index:
+                field_text = note.fields[norsk_field_index].strip()
                 
                 if field_text:
                     # Step 1: Remove everything after 🔸 symbol (including it)
@@ -766,41 +1285,106 @@ def format_analysis_result(analysis):
     
     return "<br>".join(lines)
 
-def insert_analysis_into_editor(editor, formatted_text, field_name="field_2"):
-    """Insert analysis result into specified field, clearing it first"""
-    try:
-        # Simple index-based field selection
-        field_index = 1  # Default to field 2 (second field)
-        
-        if field_name == "field_1":
-            field_index = 0  # Field 1 (first field) - for translations
-        else:
-            field_index = 1  # Field 2 (second field) - for everything else
-        
-        # Use Anki's standard way to set field content
-        if hasattr(editor, 'note') and editor.note and len(editor.note.fields) > field_index:
-            # Clear and set the field content directly
-            editor.note.fields[field_index] = formatted_text
-            
-            # Update the editor display
-            editor.loadNote()
-            
-            # Force save
-            editor.saveNow(lambda: None)
-        else:
-            showCritical(f"❌ Failed to find field {field_name}")
-            
-    except Exception as e:
-        showCritical(f"❌ Insert error: {str(e)}")
+class NotePatch:
+    """CardCraft field changes for an editor's note, collected in memory and saved together"""
+    
+    def __init__(self, editor):
+        self.editor = editor
+        self.changed = set()
+    
+    def update(self, updates):
+        """Put {field_index: html} into the note without touching the editor; returns changed indices"""
+        note = self.editor.note
+        changed = []
+        for field_index, text in sorted(updates.items()):
+            if not note or len(note.fields) <= field_index:
+                showCritical(f"❌ Failed to find field {field_index + 1}")
+            elif note.fields[field_index] != text:
+                note.fields[field_index] = text
+                changed.append(field_index)
+        self.changed.update(changed)
+        return changed
+    
+    def commit(self):
+        """Refresh the editor and save once for every field updated so far"""
+        if not self.changed:
+            return
+        try:
+            self.editor.loadNote()
+            self.editor.saveNow(lambda: None)
+        except Exception as e:
+            showCritical(f"❌ Insert error: {str(e)}")
+        self.changed.clear()
+
+def preview_field_updates(editor, updates):
+    """Progressive mode: show {field_index: html} in the editor webview before anything is saved
+    
+    setFields re-renders only the fields whose content differs, unlike loadNote;
+    the note itself is left alone until the final NotePatch commit.
+    """
+    web = getattr(editor, 'web', None)
+    note = getattr(editor, 'note', None)
+    if web is None or note is None:
+        return
+    fields = []
+    for field_index, (name, value) in enumerate(note.items()):
+        value = updates.get(field_index, value)
+        fields.append((name, mw.col.media.escape_media_filenames(value)))
+    web.eval(f"setFields({json.dumps(fields)});")
+
+def progressive_preview(editor, note):
+    """on_step_done for run_cardcraft_pipeline that previews the fields after every finished step"""
+    names = {boundary: name for name, boundary in CARDCRAFT_STEPS.items()}
+    partial = {name: None for name in CARDCRAFT_STEPS}
+    lock = threading.Lock()
+    
+    def show(updates):
+        # Only while the editor still shows the note
+        if editor_for_note(editor, note) is editor:
+            preview_field_updates(editor, updates)
+    
+    def on_step_done(boundary, result):
+        # Steps finish in worker threads; the lock keeps previews in completion order
+        with lock:
+            partial[names[boundary]] = result
+            updates = cardcraft_field_updates(partial)
+            if updates:
+                mw.taskman.run_on_main(lambda: show(updates))
+    return on_step_done
+
+class DetachedNoteEditor:
+    """Stand-in editor for a note the user navigated away from while a background task ran"""
+    
+    def __init__(self, note):
+        self.note = note
+    
+    def loadNote(self):
+        # Nothing is displayed - the note is only saved
+        pass
+    
+    def saveNow(self, callback=None):
+        # Existing notes are written to the collection; unsaved new notes only keep the change in memory
+        if self.note.id and mw.col:
+            mw.col.update_note(self.note)
+        if callback:
+            callback()
+
+def editor_for_note(editor, note):
+    """Return the editor if it still shows note, otherwise a DetachedNoteEditor for it"""
+    current = getattr(editor, 'note', None)
+    if current is note or (current is not None and note.id and current.id == note.id):
+        return editor
+    return DetachedNoteEditor(note)
 
 def handle_cardcraft_test():
     """Test CardCraft OpenAI connection"""
     try:
-        if not CARD_CRAFT:
+        card_craft = get_card_craft()
+        if not card_craft:
             showCritical("❌ CardCraft not available. OpenAI client not loaded.")
             return
         
-        result = CARD_CRAFT.test_connection()
+        result = card_craft.test_connection()
         
         if not result["success"]:
             showCritical(f"❌ CardCraft connection failed:\n{result['error']}")
@@ -905,37 +1489,46 @@ def handle_examples_command(editor):
         # Disable the examples button while processing
         disable_examples_button(editor)
         
-        try:
-            # Generate examples directly from Norsk field content
-            examples = generate_examples_from_content(norsk_content)
-            if not examples:
-                showInfo("Could not generate examples.")
-                return
-            
-            # Append examples to Norsk field
-            updated_content = norsk_content + "<br><br>" + examples
-            
-            # Find Norsk field index and update it
-            norsk_field_index = 1  # Use field index 1 (second field)
-            
-            # Update the field
-            if len(note.fields) > norsk_field_index:
-                note.fields[norsk_field_index] = updated_content
+        def on_done(future):
+            try:
+                examples = future.result()
+                if not examples:
+                    showInfo("Could not generate examples.")
+                    return
                 
-                # Check if note is new (id = 0) and save appropriately
-                if note.id == 0:
-                    # For new notes, use editor's save method
-                    editor.saveNow(lambda: None)
-                else:
-                    # For existing notes, use note.flush()
-                    note.flush()
+                # Append examples to Norsk field
+                updated_content = norsk_content + "<br><br>" + examples
                 
-                editor.loadNote()
-            
+                # Find Norsk field index and update it
+                norsk_field_index = 1  # Use field index 1 (second field)
+                target = editor_for_note(editor, note)
+                target_note = target.note
+                
+                # Update the field
+                if len(target_note.fields) > norsk_field_index:
+                    target_note.fields[norsk_field_index] = updated_content
+                    
+                    # Check if note is new (id = 0) and save appropriately
+                    if target_note.id == 0:
+                        # For new notes, use editor's save method
+                        target.saveNow(lambda: None)
+                    else:
+                        # For existing notes, use note.flush()
+                        target_note.flush()
+                    
+                    target.loadNote()
+                
+            except Exception as e:
+                showInfo(f"Error generating examples: {str(e)}")
+            finally:
+                # Re-enable the examples button
+                enable_examples_button(editor)
+        
+        # Generate examples directly from Norsk field content in the background
+        try:
+            mw.taskman.run_in_background(lambda: generate_examples_from_content(norsk_content), on_done)
         except Exception as e:
             showInfo(f"Error generating examples: {str(e)}")
-        finally:
-            # Re-enable the examples button
             enable_examples_button(editor)
             
     except Exception as e:
@@ -945,8 +1538,9 @@ def handle_examples_command(editor):
 def generate_examples_from_content(content):
     """Generate example sentences from existing Norsk field content."""
     try:
-        # Check if WORD_ANALYZER is available
-        if not WORD_ANALYZER:
+        # Check if the word analyzer is available
+        analyzer = get_word_analyzer()
+        if not analyzer:
             raise Exception("CardCraft AI not available")
         
         # Get API key from CONFIG
@@ -954,66 +1548,24 @@ def generate_examples_from_content(content):
         if not api_key or api_key == "YOUR_OPENAI_API_KEY_HERE":
             raise Exception("OpenAI API key not configured")
         
-        # Get prompt from ai_prompts.json
-        examples_prompt = WORD_ANALYZER.prompts.get("norwegian_examples_from_content", {})
+        # Get prompt from prompts.json
+        examples_prompt = analyzer.prompt_registry.prompt("norwegian_examples_from_content")
         if not examples_prompt:
-            raise Exception("Examples prompt not found in ai_prompts.json")
+            raise Exception("Examples prompt not found in prompts.json")
         
         # Get user_context from prompt
         user_context = examples_prompt.get("user_context", [])
         
         # Build user message from template
-        user_template = examples_prompt.get("user_template", "")
-        user_message = user_template.format(content=content, user_context=user_context)
+        user_message = examples_prompt.user_message(content=content, user_context=user_context)
         
         # Get system message
-        system_message = examples_prompt.get("system_message", "")
+        system_message, _ = examples_prompt.prefix()
         
-        # Update OpenAI client settings from api_settings
-        api_settings = examples_prompt.get("api_settings", {})
-        if api_settings:
-            # Extract settings with fallbacks
-            custom_model = api_settings.get("model", WORD_ANALYZER.openai_client.model)
-            custom_temperature = api_settings.get("temperature", WORD_ANALYZER.openai_client.temperature)
-            # Handle both old and new token parameter names
-            custom_max_tokens = api_settings.get("max_completion_tokens") or api_settings.get("max_tokens", WORD_ANALYZER.openai_client.max_tokens)
-            
-            # Build messages manually for custom parameters
-            messages = [{"role": "system", "content": system_message}]
-            messages.append({"role": "user", "content": user_message})
-            
-            # Use _prepare_request_data with custom parameters
-            data = WORD_ANALYZER.openai_client._prepare_request_data(
-                messages, 
-                custom_model=custom_model,
-                custom_temperature=custom_temperature, 
-                custom_max_tokens=custom_max_tokens
-            )
-            
-            # Handle response_format if specified (for JSON responses)
-            response_format = api_settings.get("response_format")
-            if response_format:
-                data["response_format"] = response_format
-            
-            # Make request directly
-            result = WORD_ANALYZER.openai_client._make_request("chat/completions", data)
-            
-            if result["success"]:
-                try:
-                    response = result["data"]["choices"][0]["message"]["content"]
-                    if response:
-                        response = response.strip()
-                    else:
-                        raise Exception("Empty response content")
-                except (KeyError, IndexError) as e:
-                    raise Exception(f"Invalid response format: {e}")
-            else:
-                raise Exception(f"OpenAI request failed: {result['error']}")
-        else:
-            # Fallback to simple_request for backward compatibility
-            response = WORD_ANALYZER.openai_client.simple_request(
-                user_message, 
-                system_message
+        # Settings for this request only - the shared client is never modified
+        with request_step("EXAMPLES_FROM_CONTENT"):
+            response = analyzer.openai_client.simple_request(
+                user_message, system_message, options=examples_prompt.options
             )
         
         if not response:
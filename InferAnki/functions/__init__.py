@@ -6,11 +6,27 @@ CardCraft: AI-powered card crafting for InferAnki
 Transforms Norwegian language learning with GPT-powered analysis
 """
 
+import importlib
+
 __version__ = "0.5.1"
 __author__ = "Inferix"
 
-from .openai_client import OpenAIClient
-from .wordstack import NorwegianWordAnalyzer
-from .chatbot_ui import show_chatbot_dialog
+# Exports are imported on first access: the chatbot pulls in Qt widgets and the
+# analyzer its prompts, neither of which Anki's startup should wait for
+_EXPORTS = {
+    "OpenAIClient": ".openai_client",
+    "RequestOptions": ".openai_client",
+    "NorwegianWordAnalyzer": ".wordstack",
+    "show_chatbot_dialog": ".chatbot_ui",
+}
+
+__all__ = ["OpenAIClient", "RequestOptions", "NorwegianWordAnalyzer", "show_chatbot_dialog"]
+
 
-__all__ = ["OpenAIClient", "NorwegianWordAnalyzer", "show_chatbot_dialog"]
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
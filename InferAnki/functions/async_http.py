@@ -0,0 +1,218 @@
+# Async HTTP Connection Pool for InferAnki
+# Keep-alive HTTP/1.1 over asyncio streams - many requests in flight on one thread
+
+import asyncio
+from urllib.parse import urlsplit
+
+from .http_pool import PooledResponse, get_ssl_context
+
+
+# Errors that mean a kept-alive connection was closed by the server while idle
+_STALE_CONNECTION_ERRORS = (
+    asyncio.IncompleteReadError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+# Largest status or header line accepted from the server
+_MAX_LINE = 65536
+
+# Bytes asked for per read of a Content-Length body
+_READ_SIZE = 65536
+
+
+class _StaleConnection(Exception):
+    """A reused connection failed before any of the response arrived - safe to resend"""
+
+
+class ResponseTimeout(asyncio.TimeoutError):
+    """The request was sent but the server went quiet for timeout seconds - resending may repeat the work"""
+
+
+class AsyncConnectionPool:
+    """
+    Pool of keep-alive connections to a single host, for one event loop
+
+    request() is a coroutine; any number of them may run at once, each on its
+    own connection. Up to max_size idle connections are kept for reuse.
+    Cancelling a request closes its connection, since the response may be
+    half read. timeout bounds each connect, send and read, like the socket
+    timeout of ConnectionPool - not the whole request, so a slow answer that
+    keeps the connection busy is not cut off.
+    """
+
+    def __init__(self, base_url, max_size=64, idle_timeout=60.0, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.max_size = max(0, int(max_size))
+        self.idle_timeout = float(idle_timeout)
+        self.timeout = timeout
+        self.opened = 0  # Connections opened so far (reuse shows as requests > opened)
+
+        default_port = 443 if self.scheme == "https" else 80
+        self._host_header = self.host if self.port == default_port else f"{self.host}:{self.port}"
+        self._idle = []  # stack of (reader, writer, last_used) - most recent last
+
+    async def _io(self, awaitable):
+        """Await one connect, write or read, bounded by timeout"""
+        if not self.timeout:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+    async def _open(self):
+        """Open a new connection (TCP and, for https, the TLS handshake)"""
+        if self.scheme == "https":
+            reader, writer = await self._io(asyncio.open_connection(
+                self.host, self.port, ssl=get_ssl_context(), server_hostname=self.host, limit=_MAX_LINE
+            ))
+        else:
+            reader, writer = await self._io(asyncio.open_connection(self.host, self.port, limit=_MAX_LINE))
+        self.opened += 1
+        return reader, writer
+
+    def _take_idle(self):
+        """A fresh idle connection, or None"""
+        loop_time = asyncio.get_running_loop().time()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if loop_time - last_used <= self.idle_timeout and not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _release(self, conn):
+        """Return a connection to the pool or close it if the pool is full"""
+        reader, writer = conn
+        if len(self._idle) < self.max_size and not writer.is_closing():
+            self._idle.append((reader, writer, asyncio.get_running_loop().time()))
+        else:
+            writer.close()
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send a request and return a PooledResponse with the full body read
+
+        Raises ResponseTimeout when the response stalls after the request was sent.
+        """
+        conn = self._take_idle()
+        reused = conn is not None
+        if conn is None:
+            conn = await self._open()
+
+        while True:
+            try:
+                response, keep_alive = await self._exchange(conn, method, path, body, headers, reused)
+                break
+            except _StaleConnection:
+                conn[1].close()
+                # Server dropped the idle connection - retry once on a fresh one
+                conn, reused = await self._open(), False
+            except BaseException:
+                # Includes cancellation: the connection is in an unknown state
+                conn[1].close()
+                raise
+
+        if keep_alive:
+            self._release(conn)
+        else:
+            conn[1].close()
+        return response
+
+    async def _exchange(self, conn, method, path, body, headers, reused):
+        """Write one request and read its response; returns (PooledResponse, keep_alive)"""
+        reader, writer = conn
+        request_headers = {"Host": self._host_header, "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            request_headers["Content-Length"] = str(len(body or b""))
+        head = f"{method} {self.base_path}{path} HTTP/1.1\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in request_headers.items())
+
+        try:
+            writer.write(head.encode("latin-1") + b"\r\n" + (body or b""))
+            await self._io(writer.drain())
+            try:
+                status_line = await self._io(reader.readline())
+            except asyncio.TimeoutError:
+                raise ResponseTimeout(f"No response within {self.timeout} s") from None
+            if not status_line:
+                raise ConnectionResetError("Connection closed before the response")
+        except _STALE_CONNECTION_ERRORS:
+            if reused:
+                raise _StaleConnection()
+            raise
+
+        try:
+            version, status, reason = self._parse_status(status_line)
+            response_headers = await self._read_headers(reader)
+            body_bytes, until_eof = await self._read_body(reader, method, status, response_headers)
+        except asyncio.TimeoutError:
+            raise ResponseTimeout(f"Response stalled for {self.timeout} s") from None
+
+        connection = response_headers.get("connection", "").lower()
+        keep_alive = not until_eof and connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+        return PooledResponse(status, reason, response_headers, body_bytes), keep_alive
+
+    @staticmethod
+    def _parse_status(line):
+        parts = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+            raise ConnectionError(f"Bad status line: {line[:100]!r}")
+        return parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+    async def _read_headers(self, reader):
+        """Header names are lower-cased; repeated headers are joined with ', '"""
+        headers = {}
+        while True:
+            line = await self._io(reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+    async def _read_body(self, reader, method, status, headers):
+        """(body, read_until_eof) following Transfer-Encoding / Content-Length"""
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return b"", False
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size_line = await self._io(reader.readline())
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Trailers end with a blank line
+                    while (await self._io(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks), False
+                chunks.append(await self._read_exactly(reader, size))
+                await self._io(reader.readexactly(2))  # CRLF after the chunk
+        if "content-length" in headers:
+            return await self._read_exactly(reader, int(headers["content-length"])), False
+        parts = []
+        while True:
+            part = await self._io(reader.read(_READ_SIZE))
+            if not part:
+                return b"".join(parts), True
+            parts.append(part)
+
+    async def _read_exactly(self, reader, size):
+        """size bytes, read piece by piece so timeout applies to each read, not the whole body"""
+        parts = []
+        remaining = size
+        while remaining:
+            part = await self._io(reader.read(min(remaining, _READ_SIZE)))
+            if not part:
+                raise asyncio.IncompleteReadError(b"".join(parts), size)
+            parts.append(part)
+            remaining -= len(part)
+        return b"".join(parts)
+
+    def close(self):
+        """Close all idle connections"""
+        idle, self._idle = self._idle, []
+        for _, writer, _ in idle:
+            writer.close()
@@ -0,0 +1,300 @@
+# CardCraft Async HTTP Client
+# OpenAI Chat Completions on asyncio, with a blocking facade for existing callers
+
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+import time
+
+from .async_http import AsyncConnectionPool, ResponseTimeout
+from .openai_client import CACHE_IO_STEPS, OpenAIClient
+from .rate_limit import estimate_tokens
+
+
+class AsyncOpenAIClient:
+    """Chat Completions client for one event loop - many requests in flight on one thread
+
+    Requests are built, cached, budgeted, rate limited and recorded exactly like
+    OpenAIClient's (it uses one for all of that); only the transport differs:
+    keep-alive HTTP/1.1 on asyncio streams, with at most max_in_flight requests
+    on the wire at once. Cancelling a call cancels its request.
+    """
+
+    def __init__(self, config, max_in_flight=None):
+        self.config = config
+        self.base = OpenAIClient(config)
+        self.enabled = self.base.enabled
+        self.max_in_flight = max(1, int(max_in_flight or config.get("openai_async_max_in_flight", 64)))
+        self.pool = AsyncConnectionPool(
+            self.base.base_url,
+            max_size=self.max_in_flight,
+            idle_timeout=config.get("openai_pool_idle_timeout", 60),
+            timeout=config.get("openai_request_timeout", 30)
+        )
+        self._semaphore = None
+        self._loop = None
+
+    def _in_flight(self):
+        """Semaphore bounding the requests on the wire (created in the client's event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError("AsyncOpenAIClient is used from a different event loop")
+        return self._semaphore
+
+    async def _acquire(self, estimated_tokens, stats):
+        """Wait for the shared quota without blocking the loop, counting the wait as time in queue"""
+        limiter = self.base.rate_limiter
+        for bucket, amount in ((limiter.requests, 1), (limiter.tokens, estimated_tokens)):
+            while True:
+                wait = bucket.try_acquire(amount)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+                stats["queue"] += wait
+
+    async def _backoff(self, attempt, status=None, headers=None):
+        """Wait before the next attempt; a 429 holds back every client sharing the quota"""
+        delay = self.base.retry_policy.delay(attempt, headers)
+        if status == 429:
+            self.base.rate_limiter.pause(delay)
+        await asyncio.sleep(delay)
+
+    async def _make_request(self, endpoint, data):
+        """Make HTTP request to OpenAI API, retried like OpenAIClient._make_request"""
+        started = time.monotonic()
+        stats = {"queue": 0.0, "status": None, "retries": 0}
+        result = await self._send_request(endpoint, data, stats)
+        self.base._record_metrics(endpoint, data, result, started, stats)
+        return result
+
+    async def _send_request(self, endpoint, data, stats):
+        headers = self.base._request_headers()
+        json_data = json.dumps(data).encode('utf-8')
+        estimated_tokens = estimate_tokens(data)
+        limiter = self.base.rate_limiter
+        attempt = 0
+
+        while True:
+            stats["retries"] = attempt
+            await self._acquire(estimated_tokens, stats)
+            try:
+                waited = time.monotonic()
+                async with self._in_flight():
+                    stats["queue"] += time.monotonic() - waited
+                    response = await self.pool.request("POST", f"/{endpoint}", body=json_data, headers=headers)
+            except asyncio.CancelledError:
+                limiter.settle(estimated_tokens, 0)
+                raise
+            except Exception as e:
+                stats["status"] = None
+                limiter.settle(estimated_tokens, 0)
+                # A stalled answer may still be generated (and billed) - sending it again could pay twice
+                if not isinstance(e, ResponseTimeout) and self.base.retry_policy.should_retry(attempt):
+                    await self._backoff(attempt)
+                    attempt += 1
+                    continue
+                return {"success": False, "error": str(e) or type(e).__name__}
+
+            stats["status"] = response.status
+            limiter.observe(response.headers)
+
+            if response.status >= 400:
+                limiter.settle(estimated_tokens, 0)
+                error_body = response.body.decode('utf-8', errors='replace')
+                error_msg, error_code = self.base._error_details(response.status, error_body)
+                if self.base.retry_policy.should_retry(attempt, response.status, error_code):
+                    await self._backoff(attempt, response.status, response.headers)
+                    attempt += 1
+                    continue
+                return {"success": False, "error": error_msg}
+
+            try:
+                response_data = json.loads(response.body.decode('utf-8'))
+            except Exception as e:
+                limiter.settle(estimated_tokens, 0)
+                return {"success": False, "error": str(e)}
+
+            usage = response_data.get("usage") or {}
+            limiter.settle(estimated_tokens, usage.get("total_tokens"))
+            return {"success": True, "data": response_data}
+
+    async def _run_flow(self, flow):
+        """Await the steps of an OpenAIClient request flow; cache I/O runs in a worker thread"""
+        loop = asyncio.get_running_loop()
+        reply = None
+        while True:
+            try:
+                name, args = flow.send(reply)
+            except StopIteration as done:
+                return done.value
+            if name in CACHE_IO_STEPS:
+                # SQLite must not stall every other request on the loop (the step stays the caller's)
+                call = functools.partial(contextvars.copy_context().run, getattr(self.base, name), *args)
+                reply = await loop.run_in_executor(None, call)
+            else:
+                reply = await getattr(self, name)(*args)
+
+    async def _cached_request(self, endpoint, data, use_cache=False, key_data=None):
+        """OpenAIClient._cached_request, awaited"""
+        return await self._run_flow(self.base._cache_flow(endpoint, data, use_cache, key_data))
+
+    async def _budgeted_request(self, endpoint, data, use_cache=False):
+        """OpenAIClient._budgeted_request, awaited"""
+        return await self._run_flow(self.base._budget_flow(endpoint, data, use_cache))
+
+    async def _complete(self, prompt, system_message, examples=None, options=None, with_usage=False, **overrides):
+        """The raw chat completion result for one prompt, sent like OpenAIClient sends it"""
+        options = self.base._options(options, **overrides)
+        messages = self.base._build_messages(prompt, system_message, examples)
+        data = self.base._prepare_request_data(messages, options)
+        if with_usage:
+            return await self._make_request("chat/completions", data)
+        return await self._budgeted_request("chat/completions", data, use_cache=options.cache)
+
+    async def simple_request(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                             options=None, **overrides):
+        """Coroutine version of OpenAIClient.simple_request"""
+        if not self.enabled:
+            return None
+        result = await self._complete(prompt, system_message, examples, options, **overrides)
+        return self.base._answer(result)[0]
+
+    async def simple_request_with_usage(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                                        options=None, **overrides):
+        """Coroutine version of OpenAIClient.simple_request_with_usage"""
+        if not self.enabled:
+            return None, None
+        result = await self._complete(prompt, system_message, examples, options, with_usage=True, **overrides)
+        return self.base._answer(result)
+
+    async def run_step_flow(self, flow):
+        """Run an analyzer step flow (see NorwegianWordAnalyzer.run_step_flow) with requests on this loop
+
+        The step's own code (prompt building, parsing, store and journal
+        writes) runs in short bursts in worker threads; only the waiting for
+        each request happens here, so a flow holds no thread while it waits.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        send, value = flow.send, None
+        try:
+            while True:
+                finished, request = await loop.run_in_executor(None, context.run, _advance, send, value)
+                if finished:
+                    return request
+                prompt, system_message, examples, options = request
+                try:
+                    # A task in the flow's context, which carries the step the request is recorded under
+                    value = await context.run(asyncio.ensure_future, self.simple_request(
+                        prompt, system_message, examples, options=options
+                    ))
+                    send = flow.send
+                except Exception as e:
+                    send, value = flow.throw, e
+        finally:
+            try:
+                context.run(flow.close)
+            except (RuntimeError, ValueError):
+                pass  # Cancelled while the flow runs in its worker thread; it ends there
+
+    async def close(self):
+        """Close idle connections"""
+        self.pool.close()
+
+
+def _advance(send, value):
+    """(True, result) when a step flow returned, else (False, its next request)
+
+    StopIteration cannot be passed through a future, so it is turned into a value here.
+    """
+    try:
+        return False, send(value)
+    except StopIteration as done:
+        return True, done.value
+
+
+async def _in_context(context, coroutine):
+    """Run coroutine with the caller's context variables (request step, trace) set in its task"""
+    for variable, value in context.items():
+        variable.set(value)
+    return await coroutine
+
+
+class BlockingOpenAIClient:
+    """Blocking OpenAIClient calls served by one AsyncOpenAIClient on a background event loop
+
+    Any number of threads may call it; they only wait, while all requests share
+    one thread, one connection pool and the max_in_flight limit. submit() and
+    map_requests() start requests without a thread per request.
+    """
+
+    def __init__(self, config, max_in_flight=None):
+        self.config = config
+        self.client = AsyncOpenAIClient(config, max_in_flight)
+        self.enabled = self.client.enabled
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="InferAnki OpenAI loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine_function, *args, **kwargs):
+        """Start coroutine_function(*args, **kwargs) on the loop; returns a concurrent.futures.Future
+
+        The caller's context variables are carried over; future.cancel() cancels the request.
+        """
+        coroutine = _in_context(contextvars.copy_context(), coroutine_function(*args, **kwargs))
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def simple_request(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                       options=None, **overrides):
+        """Blocking simple_request; errors are reported in the calling thread"""
+        if not self.enabled:
+            return None
+        result = self.submit(self.client._complete, prompt, system_message, examples, options, **overrides).result()
+        return self.client.base._answer(result)[0]
+
+    def simple_request_with_usage(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                                  options=None, **overrides):
+        """Blocking simple_request_with_usage"""
+        if not self.enabled:
+            return None, None
+        result = self.submit(
+            self.client._complete, prompt, system_message, examples, options, with_usage=True, **overrides
+        ).result()
+        return self.client.base._answer(result)
+
+    def map_requests(self, requests):
+        """Answers of many simple_request calls (each a dict of its arguments), run concurrently, in order"""
+        async def run_all():
+            return await asyncio.gather(*(self.client.simple_request(**request) for request in requests))
+        return self.submit(run_all).result()
+
+    def close(self, timeout=5.0):
+        """Close idle connections and stop the loop thread"""
+        if self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self.loop.close()
+
+
+# One facade per process, so every analyzer shares the loop and its connections
+_BLOCKING_CLIENT = None
+_BLOCKING_CLIENT_LOCK = threading.Lock()
+
+
+def get_blocking_client(config):
+    """Return the shared BlockingOpenAIClient, creating it on first use"""
+    global _BLOCKING_CLIENT
+    with _BLOCKING_CLIENT_LOCK:
+        if _BLOCKING_CLIENT is None:
+            _BLOCKING_CLIENT = BlockingOpenAIClient(config)
+        return _BLOCKING_CLIENT
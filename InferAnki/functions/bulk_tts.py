@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+InferAnki Bulk TTS
+Voice many notes with one Speechify client, a bounded worker pool and a shared request rate limit
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .rate_limit import get_rate_limiter
+from .tts_handler import find_audio_field, has_audio
+
+DEFAULT_SPEECHIFY_URL = "https://api.sws.speechify.com"
+
+
+def note_tts_text(processor, note) -> Optional[str]:
+    """Text the note is voiced from, or None when it has no text or no audio field"""
+    if len(note.fields) <= processor.field_index or not find_audio_field(note):
+        return None
+    text = note.fields[processor.field_index]
+    if not text or not text.strip() or len(text) > processor.max_chars:
+        return None
+    return text
+
+
+def plan_notes(processor, notes: Iterable[Any], skip_existing: bool = True) -> Tuple[List[Tuple[Any, str]], List[int]]:
+    """Split notes into [(note, text), ...] to voice and the ids of notes to leave alone"""
+    items, skipped = [], []
+    for note in notes:
+        text = note_tts_text(processor, note)
+        if text is None or (skip_existing and has_audio(note)):
+            skipped.append(note.id)
+        else:
+            items.append((note, text))
+    return items, skipped
+
+
+def apply_note_audio(processor, note, audio_path: str, col=None) -> None:
+    """Add audio_path to the media folder and put its [sound:] tag in the note's audio field"""
+    media_name = processor.store_audio(audio_path, col)
+    note[find_audio_field(note)] = f"[sound:{media_name}]"
+    processor.discard_audio_file(audio_path)
+
+
+class TTSVoicer:
+    """
+    Voice texts from worker threads through the processor's shared Speechify client
+
+    Requests are paced to requests_per_minute across every voicer for the same
+    Speechify endpoint; audio served from the media cache does not count.
+    """
+
+    def __init__(self, processor, requests_per_minute: float = 60):
+        self.processor = processor
+        self.rate_limiter = get_rate_limiter(
+            f"speechify:{processor.base_url or DEFAULT_SPEECHIFY_URL}", requests_per_minute, 0
+        )
+
+    def _wait_for_slot(self):
+        self.rate_limiter.acquire(0)
+
+    def voice(self, text: str) -> str:
+        """Path of the audio for text; raises when Speechify fails"""
+        audio_path = self.processor.create_audio_file(text, raise_errors=True, before_request=self._wait_for_slot)
+        if not audio_path:
+            raise RuntimeError("Speechify returned no audio")
+        return audio_path
+
+    def voice_all(self, items: Iterable[Tuple[Any, str]], max_workers: int = 4) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+        """Yield (item, audio path or None, error or None) for (item, text) pairs as they finish"""
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="inferanki-tts") as executor:
+            futures = {executor.submit(self.voice, text): item for item, text in items}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, str(e)
+
+
+def voice_notes(col, note_ids: Iterable[int], processor, max_workers: int = 4, batch_size: int = 50,
+                requests_per_minute: float = 60, skip_existing: bool = True,
+                on_progress: Optional[Callable[[int, int, float], None]] = None) -> Dict[str, Any]:
+    """
+    Headless bulk TTS: voice the notes of col and write their audio fields in batches
+
+    Needs no GUI, so it can run from scripts against a closed profile's collection.
+    on_progress(done, total, elapsed_seconds) is called after every note.
+    Returns a report with voiced, skipped and failed note ids and the throughput.
+    """
+    started = time.monotonic()
+    notes, missing = [], []
+    for note_id in note_ids:
+        try:
+            notes.append(col.get_note(note_id))
+        except Exception:
+            missing.append(note_id)  # Deleted note
+    items, skipped = plan_notes(processor, notes, skip_existing)
+
+    report = {"voiced": [], "skipped": missing + skipped, "failed": {}}
+    pending = []
+
+    def flush():
+        if pending:
+            # One collection write per batch instead of per note
+            col.update_notes(pending)
+            report["voiced"].extend(note.id for note in pending)
+            pending.clear()
+
+    done = 0
+    for note, audio_path, error in TTSVoicer(processor, requests_per_minute).voice_all(items, max_workers):
+        done += 1
+        if audio_path:
+            # The collection is only touched from this thread
+            apply_note_audio(processor, note, audio_path, col)
+            pending.append(note)
+            if len(pending) >= batch_size:
+                flush()
+        else:
+            report["failed"][note.id] = error
+        if on_progress:
+            on_progress(done, len(items), time.monotonic() - started)
+    flush()
+
+    report["elapsed"] = time.monotonic() - started
+    report["notes_per_second"] = len(items) / report["elapsed"] if report["elapsed"] else 0.0
+    return report
@@ -3,9 +3,8 @@
 
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QApplication)  # type: ignore
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer     # type: ignore
-from PyQt6.QtGui import QFont, QKeySequence # type: ignore
-import json
-import os
+from PyQt6.QtGui import QFont, QKeySequence, QTextCursor, QTextCharFormat # type: ignore
+from dataclasses import replace
 
 try:
     from aqt.utils import showInfo, showCritical # type: ignore
@@ -17,16 +16,21 @@ except ImportError:
 
 # Import OpenAI client
 try:
-    from . import OpenAIClient
+    from . import OpenAIClient, RequestOptions
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     OpenAIClient = None
+    RequestOptions = None
+
+from .metrics import request_step
+from .prompt_registry import get_prompt_registry
 
 
 class ChatWorker(QThread):
     """Worker thread for ChatGPT API calls"""
     response_ready = pyqtSignal(str, dict)  # response, metadata
+    partial_text = pyqtSignal(str)  # streamed content fragment
     error_occurred = pyqtSignal(str)
     
     def __init__(self, message, config, prompts, max_tokens=None):
@@ -65,16 +69,23 @@ class ChatWorker(QThread):
             
             api_settings = chatbot_prompt.get("api_settings", {})
             
-            # Update client settings if provided
-            if api_settings:
-                openai_client.model = api_settings.get("model", "gpt-4")
-                openai_client.temperature = api_settings.get("temperature", 0.7)
-                # Use custom max_tokens if provided, otherwise use from api_settings
-                max_tokens = self.custom_max_tokens if self.custom_max_tokens else api_settings.get("max_tokens", 2000)
-                openai_client.max_tokens = max_tokens
+            # Request settings for this message only - the client itself is never modified
+            options = RequestOptions.from_api_settings(api_settings)
+            # Use custom max_tokens if provided, otherwise use from api_settings
+            if self.custom_max_tokens:
+                options = replace(options, max_tokens=self.custom_max_tokens)
             
-            # Make API request with usage info
-            response, usage_info = openai_client.simple_request_with_usage(self.message, system_message)
+            # Make API request with usage info - streamed tokens are shown as they arrive
+            time_to_first_token = None
+            with request_step("CHATBOT"):
+                if self.config.get("chatbot_streaming", True):
+                    response, usage_info, time_to_first_token = openai_client.stream_request_with_usage(
+                        self.message, system_message, on_delta=self.partial_text.emit, options=options
+                    )
+                else:
+                    response, usage_info = openai_client.simple_request_with_usage(
+                        self.message, system_message, options=options
+                    )
             
             # Calculate response time
             response_time = time.time() - start_time
@@ -83,6 +94,7 @@ class ChatWorker(QThread):
                 # Prepare metadata
                 metadata = {
                     "response_time": response_time,
+                    "time_to_first_token": time_to_first_token,
                     "usage": usage_info or {}
                 }
                 self.response_ready.emit(response, metadata)
@@ -103,6 +115,7 @@ class ChatBotDialog(QDialog):
         self.max_history = self.config.get("chatbot_max_history", 10)
         self.prompts = self.load_prompts()
         self.worker_thread = None
+        self.stream_start = None  # chat position where the streamed answer begins
         self.setWindowTitle("InferAnki ChatGPT Assistant")
         self.setMinimumSize(700, 600)
         self.resize(800, 700)
@@ -114,19 +127,8 @@ class ChatBotDialog(QDialog):
         self.add_welcome_message()
     
     def load_prompts(self):
-        """Load AI prompts from prompts.json"""
-        try:
-            # Get the directory where this file is located
-            current_dir = os.path.dirname(__file__)
-            prompts_path = os.path.join(current_dir, "..", "prompts.json")
-            
-            if os.path.exists(prompts_path):
-                with open(prompts_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            if ANKI_AVAILABLE:
-                showCritical(f"Error loading prompts: {e}")
-        return {}
+        """AI prompts from prompts.json, shared with CardCraft and re-read only when the file changes"""
+        return get_prompt_registry().prompts()
     
     def setup_quick_prompts(self, layout):
         """Setup quick prompt buttons with automatic wrapping"""
@@ -362,12 +364,43 @@ class ChatBotDialog(QDialog):
         # Start worker thread for API call
         self.worker_thread = ChatWorker(user_message, self.config, self.prompts, max_tokens)
         self.worker_thread.response_ready.connect(self.on_response_ready)
+        self.worker_thread.partial_text.connect(self.on_partial_text)
         self.worker_thread.error_occurred.connect(self.on_error_occurred)
         self.worker_thread.finished.connect(self.on_worker_finished)
         self.worker_thread.start()
         
+    def on_partial_text(self, text):
+        """Append a streamed fragment of the answer as plain text"""
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        
+        if self.stream_start is None:
+            # First token - show the sender header, the text follows in its own block
+            self.stream_start = cursor.position()
+            self.chat_display.append('<b style="color: #4CAF50;">☀️ ChatGPT:</b>')
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertBlock()
+            self.status_label.setText("Typing...")
+        
+        cursor.insertText(text, QTextCharFormat())
+        
+        scrollbar = self.chat_display.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+    
+    def clear_streamed_text(self):
+        """Remove the raw streamed answer so it can be replaced by the formatted one"""
+        if self.stream_start is None:
+            return
+        cursor = self.chat_display.textCursor()
+        cursor.setPosition(self.stream_start)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+    
     def on_response_ready(self, response, metadata):
         """Handle successful ChatGPT response"""
+        # Replace the streamed plain text with the Markdown-rendered answer
+        self.clear_streamed_text()
         self.add_to_chat("☀️ ChatGPT", response)
         
         # Copy to clipboard if requested
@@ -412,6 +445,7 @@ class ChatBotDialog(QDialog):
             
         usage = self.last_usage.get("usage", {})
         response_time = self.last_usage.get("response_time", 0)
+        time_to_first_token = self.last_usage.get("time_to_first_token")
         
         prompt_tokens = usage.get("prompt_tokens", 0)
         completion_tokens = usage.get("completion_tokens", 0)
@@ -419,6 +453,8 @@ class ChatBotDialog(QDialog):
         
         # Update status with usage info (like web ChatGPT)
         status_text = f"Response time: {response_time:.1f}s"
+        if time_to_first_token is not None:
+            status_text += f" • First token: {time_to_first_token:.1f}s"
         if total_tokens > 0:
             status_text += f" • Tokens: {prompt_tokens}↑ {completion_tokens}↓ = {total_tokens}"
         self.status_label.setText(status_text)
@@ -426,6 +462,8 @@ class ChatBotDialog(QDialog):
         
     def on_error_occurred(self, error_message):
         """Handle ChatGPT API errors"""
+        # Keep whatever was streamed before the error
+        self.stream_start = None
         self.add_to_chat("☀️ ChatGPT", f"❌ {error_message}")
           # Update status
         self.status_label.setText("Error occurred. Please try again.")
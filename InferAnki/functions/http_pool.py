@@ -0,0 +1,186 @@
+# HTTP Connection Pool for InferAnki
+# Keep-alive HTTP(S) transport shared by all API clients in the process
+
+import http.client
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+# SSL context is expensive to build (loads the system CA store), so it is
+# created once per process and shared by every pooled connection
+_SSL_CONTEXT = None
+_SSL_LOCK = threading.Lock()
+
+# Errors that mean a kept-alive connection was closed by the server while idle
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+def get_ssl_context():
+    """Return the process-wide default SSL context"""
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        with _SSL_LOCK:
+            if _SSL_CONTEXT is None:
+                _SSL_CONTEXT = ssl.create_default_context()
+    return _SSL_CONTEXT
+
+
+class PooledResponse:
+    """Fully read HTTP response returned by ConnectionPool.request"""
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers  # lower-cased header names
+        self.body = body
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections to a single host"""
+
+    def __init__(self, base_url, max_size=4, idle_timeout=60.0, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.max_size = max(0, int(max_size))
+        self.idle_timeout = float(idle_timeout)
+        self.timeout = timeout
+
+        self._idle = []  # stack of (connection, last_used) - most recent last
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        """Open a new connection (the TCP/TLS handshake happens on first request)"""
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=get_ssl_context()
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        """Get an idle connection if one is still fresh, otherwise a new one"""
+        now = time.monotonic()
+        expired = []
+        conn = None
+
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    conn = candidate
+                    break
+                expired.append(candidate)
+
+        for stale in expired:
+            stale.close()
+
+        if conn is not None:
+            return conn, True
+        return self._new_connection(), False
+
+    def _release(self, conn):
+        """Return a connection to the pool or close it if the pool is full"""
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def _send(self, method, path, body=None, headers=None):
+        """Send a request and return (connection, response) with the body still unread"""
+        full_path = f"{self.base_path}{path}"
+        conn, reused = self._acquire()
+
+        while True:
+            try:
+                conn.request(method, full_path, body=body, headers=headers or {})
+                return conn, conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # Server dropped the idle connection - retry once on a fresh one
+                conn, reused = self._new_connection(), False
+            except Exception:
+                conn.close()
+                raise
+
+    def _finish(self, conn, response):
+        """Keep the connection if the response was fully read and the server allows it"""
+        if response.isclosed() and not response.will_close:
+            self._release(conn)
+        else:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and return a PooledResponse with the full body read"""
+        conn, response = self._send(method, path, body, headers)
+        try:
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        self._finish(conn, response)
+
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        return PooledResponse(response.status, response.reason, response_headers, data)
+
+    @contextmanager
+    def stream(self, method, path, body=None, headers=None):
+        """Send a request and yield the live http.client response for incremental reading
+
+        The connection goes back to the pool only if the body was read to the end.
+        """
+        conn, response = self._send(method, path, body, headers)
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        self._finish(conn, response)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+# One pool per base URL, shared by all clients in the process
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(base_url, max_size=4, idle_timeout=60.0, timeout=30):
+    """Return the shared connection pool for base_url, creating it on first use"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(base_url)
+        if pool is None:
+            pool = ConnectionPool(base_url, max_size, idle_timeout, timeout)
+            _POOLS[base_url] = pool
+        else:
+            # Latest configuration wins so config.json edits apply without restart
+            pool.max_size = max(0, int(max_size))
+            pool.idle_timeout = float(idle_timeout)
+            pool.timeout = timeout
+        return pool
+
+
+def close_all_pools():
+    """Close every idle pooled connection (e.g. on profile close)"""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+InferAnki Job Journal
+Crash-safe record of bulk job progress so interrupted jobs resume where they stopped
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# Journals are per profile (note ids belong to one collection) and kept with other add-on data
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(__file__), "..", "user_files")
+
+# Note states
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Job states
+RUNNING = "running"
+FINISHED = "finished"
+
+
+class JobJournal:
+    """
+    SQLite write-ahead-logged journal of bulk jobs, notes and completed steps
+
+    Every completed step result is committed as soon as it arrives, so after a
+    crash, restart or API outage the job can be resumed without repeating any
+    paid request that already succeeded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: a committed step survives power loss, not just an application crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS job_notes ("
+            " job_id INTEGER NOT NULL,"
+            " note_id INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, note_id));"
+            "CREATE TABLE IF NOT EXISTS job_steps ("
+            " job_id INTEGER NOT NULL,"
+            " note_id INTEGER NOT NULL,"
+            " step TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (job_id, note_id, step));"
+        )
+
+    def create_job(self, kind: str, note_ids: Iterable[int]) -> int:
+        """Start a new job for note_ids and return its id"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (kind, status, created, updated) VALUES (?, ?, ?, ?)",
+                    (kind, RUNNING, now, now)
+                )
+                job_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO job_notes (job_id, note_id, status) VALUES (?, ?, ?)",
+                    [(job_id, int(note_id), PENDING) for note_id in note_ids]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def unfinished_jobs(self, kind: Optional[str] = None, exclude: Iterable[int] = ()) -> List[Dict[str, Any]]:
+        """Jobs that were not finished, with their number of remaining notes
+
+        exclude lists job ids still running in this process - they are not interrupted.
+        """
+        query = (
+            "SELECT j.job_id, j.kind, j.created,"
+            " COUNT(n.note_id), SUM(n.status != ?)"
+            " FROM jobs j JOIN job_notes n ON n.job_id = j.job_id"
+            " WHERE j.status = ?"
+        )
+        params: list = [DONE, RUNNING]
+        if kind:
+            query += " AND j.kind = ?"
+            params.append(kind)
+        query += " GROUP BY j.job_id ORDER BY j.created"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        exclude = set(exclude)
+        return [
+            {"job_id": row[0], "kind": row[1], "created": row[2], "total": row[3], "remaining": row[4] or 0}
+            for row in rows if row[0] not in exclude
+        ]
+
+    def remaining_notes(self, job_id: int) -> List[int]:
+        """Note ids of the job that are not done yet (pending or failed)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT note_id FROM job_notes WHERE job_id = ? AND status != ? ORDER BY note_id",
+                (job_id, DONE)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def completed_steps(self, job_id: int, note_id: int) -> Dict[str, Any]:
+        """Results of the steps already completed for a note"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT step, result FROM job_steps WHERE job_id = ? AND note_id = ?",
+                (job_id, note_id)
+            ).fetchall()
+        return {step: json.loads(result) for step, result in rows}
+
+    def record_step(self, job_id: int, note_id: int, step: str, result: Any) -> None:
+        """Durably record a completed step result (called from worker threads)"""
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_steps (job_id, note_id, step, result, updated) VALUES (?, ?, ?, ?, ?)",
+                (job_id, note_id, step, payload, time.time())
+            )
+
+    def mark_notes(self, job_id: int, note_ids: Iterable[int], status: str) -> None:
+        """Set the state of notes, e.g. DONE once their fields were written to the collection"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE job_notes SET status = ? WHERE job_id = ? AND note_id = ?",
+                [(status, job_id, int(note_id)) for note_id in note_ids]
+            )
+            self._conn.execute("UPDATE jobs SET updated = ? WHERE job_id = ?", (time.time(), job_id))
+
+    def finish_job(self, job_id: int) -> None:
+        """Mark the job finished and drop its stored step results"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, updated = ? WHERE job_id = ?", (FINISHED, time.time(), job_id)
+                )
+                self._conn.execute("DELETE FROM job_steps WHERE job_id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_JOURNALS: Dict[str, JobJournal] = {}
+_JOURNALS_LOCK = threading.Lock()
+
+
+def get_job_journal(profile_name: str, journal_dir: Optional[str] = None) -> JobJournal:
+    """Return the shared journal of an Anki profile"""
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in profile_name or "default")
+    path = os.path.abspath(os.path.join(journal_dir or DEFAULT_JOURNAL_DIR, f"jobs-{safe_name}.sqlite3"))
+    with _JOURNALS_LOCK:
+        journal = _JOURNALS.get(path)
+        if journal is None:
+            journal = JobJournal(path)
+            _JOURNALS[path] = journal
+        return journal
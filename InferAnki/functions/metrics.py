@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Request Metrics
+In-memory latency histograms and token totals per CardCraft step, with optional JSONL export
+"""
+
+import bisect
+import contextlib
+import contextvars
+import threading
+from typing import Any, Dict, List, Optional
+
+from .trace_log import TraceLogger, get_trace_logger
+
+
+# Upper bounds (seconds) of the latency buckets; the last bucket takes everything slower
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+# Step the current request is made for; run_pipeline copies it into step threads
+_CURRENT_STEP: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("inferanki_step", default=None)
+
+
+@contextlib.contextmanager
+def request_step(step: Optional[str]):
+    """Requests made inside the block are recorded under step"""
+    token = _CURRENT_STEP.set(step)
+    try:
+        yield
+    finally:
+        _CURRENT_STEP.reset(token)
+
+
+def current_step() -> Optional[str]:
+    return _CURRENT_STEP.get()
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are the upper bound of the bucket they fall in"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile, never above the largest value seen (0 when empty)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class StepStats:
+    """Everything recorded for one step"""
+
+    def __init__(self):
+        self.wall = Histogram()
+        self.queue = Histogram()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.statuses: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+
+
+class MetricsRegistry:
+    """
+    Per-step request metrics for the whole process
+
+    record() is called by the OpenAI client once per request, from any thread.
+    With an export logger every request is also appended to a JSONL file by
+    the trace log writer thread.
+    """
+
+    def __init__(self, export: Optional[TraceLogger] = None):
+        self.export = export
+        self._lock = threading.Lock()
+        self._steps: Dict[str, StepStats] = {}
+
+    def record(self, step: str, model: Optional[str], wall: float, queue: float = 0.0,
+               status: Optional[int] = None, retries: int = 0, usage: Optional[Dict[str, Any]] = None,
+               cached: bool = False, ok: bool = True) -> None:
+        """Add one request; usage is the API usage block (prompt/completion/cached tokens)"""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        status_key = "cache" if cached else str(status or "network error")
+
+        with self._lock:
+            stats = self._steps.get(step)
+            if stats is None:
+                stats = self._steps[step] = StepStats()
+            stats.wall.observe(wall)
+            stats.queue.observe(queue)
+            stats.requests += 1
+            stats.errors += 0 if ok else 1
+            stats.retries += retries
+            stats.cache_hits += 1 if cached else 0
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cached_tokens += cached_tokens
+            stats.statuses[status_key] = stats.statuses.get(status_key, 0) + 1
+            if model:
+                stats.models[model] = stats.models.get(model, 0) + 1
+
+        if self.export is not None:
+            self.export.log(
+                "request", step=step, model=model, wall=round(wall, 4), queue=round(queue, 4),
+                status=status, retries=retries, cached=cached, ok=ok, prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens, cached_tokens=cached_tokens
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """step -> counters, token totals and wall/queue percentiles in seconds"""
+        with self._lock:
+            return {
+                step: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "cache_hits": stats.cache_hits,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cached_tokens": stats.cached_tokens,
+                    "statuses": dict(stats.statuses),
+                    "models": dict(stats.models),
+                    "wall": {"mean": stats.wall.mean, "p50": stats.wall.percentile(50),
+                             "p95": stats.wall.percentile(95), "max": stats.wall.max},
+                    "queue": {"mean": stats.queue.mean, "p95": stats.queue.percentile(95)},
+                }
+                for step, stats in self._steps.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._steps.clear()
+
+    def report(self) -> str:
+        """Plain-text table of the snapshot, slowest step (by total wall time) first"""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "No requests recorded since Anki started."
+
+        header = (f"{'step':<28} {'req':>5} {'err':>4} {'retry':>5} {'cache':>5} "
+                  f"{'p50 s':>7} {'p95 s':>7} {'max s':>7} {'queue':>7} {'prompt':>8} {'compl':>7} {'cached':>7}")
+        lines: List[str] = [header, "-" * len(header)]
+        ordered = sorted(snapshot.items(), key=lambda item: item[1]["wall"]["mean"] * item[1]["requests"], reverse=True)
+        for step, stats in ordered:
+            lines.append(
+                f"{step[:28]:<28} {stats['requests']:>5} {stats['errors']:>4} {stats['retries']:>5} "
+                f"{stats['cache_hits']:>5} {stats['wall']['p50']:>7.2f} {stats['wall']['p95']:>7.2f} "
+                f"{stats['wall']['max']:>7.2f} {stats['queue']['p95']:>7.2f} {stats['prompt_tokens']:>8} "
+                f"{stats['completion_tokens']:>7} {stats['cached_tokens']:>7}"
+            )
+
+        lines.append("")
+        for step, stats in ordered:
+            statuses = ", ".join(f"{status}: {count}" for status, count in sorted(stats["statuses"].items()))
+            models = ", ".join(sorted(stats["models"]))
+            lines.append(f"{step}: {statuses}" + (f" ({models})" if models else ""))
+        lines.append("")
+        lines.append("p50/p95 are bucket upper bounds; queue is the p95 wait for the shared rate limit.")
+        return "\n".join(lines)
+
+
+_REGISTRY: Optional[MetricsRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_metrics(config: Dict[str, Any]) -> Optional[MetricsRegistry]:
+    """Return the shared metrics registry, or None if metrics_enabled is off in config.json"""
+    global _REGISTRY
+    if not config.get("metrics_enabled", True):
+        return None
+
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            export = None
+            path = config.get("metrics_export_path")
+            if path:
+                # Its own file, unsampled, written and rotated like the trace log
+                export = get_trace_logger(dict(config, trace_log_enabled=True, trace_log_sample_rate=1.0,
+                                               trace_log_path=path))
+            _REGISTRY = MetricsRegistry(export)
+        return _REGISTRY
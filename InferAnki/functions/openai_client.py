@@ -2,20 +2,106 @@
 # Simple HTTP-based OpenAI client without dependencies
 
 import json
-import urllib.request
-import urllib.parse
-import ssl
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
 
-try:
-    from aqt.utils import showInfo, showCritical # type: ignore
-    ANKI_AVAILABLE = True
-except ImportError:
-    ANKI_AVAILABLE = False
-    # Fallback functions for testing without Anki
-    def showInfo(text):
-        print(f"INFO: {text}")
-    def showCritical(text):
-        print(f"CRITICAL: {text}")
+from .http_pool import get_pool
+from .metrics import current_step, get_metrics
+from .rate_limit import RetryPolicy, estimate_tokens, get_rate_limiter
+from .response_cache import get_response_cache
+from .token_budget import get_token_budget
+from .ui_thread import showCritical
+
+
+# Steps of a request flow that block on the response cache (run off the event loop by AsyncOpenAIClient)
+CACHE_IO_STEPS = frozenset({"_cache_lookup", "_cache_store"})
+
+
+def _finish_reason(result):
+    """finish_reason of a successful chat completion result ("length" when max tokens cut it off)"""
+    try:
+        return result["data"]["choices"][0].get("finish_reason")
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+class SSEParser:
+    """Incremental parser for server-sent events (text/event-stream)
+    
+    Bytes can be fed in chunks of any size; complete events are returned as
+    soon as their terminating blank line has arrived.
+    """
+    
+    def __init__(self):
+        self._buffer = b""
+        self._data_lines = []
+    
+    def feed(self, chunk):
+        """Feed raw bytes and return the data payloads of completed events"""
+        self._buffer += chunk
+        events = []
+        while True:
+            newline = self._buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = self._buffer[:newline].rstrip(b"\r").decode("utf-8")
+            self._buffer = self._buffer[newline + 1:]
+            
+            if not line:
+                # Blank line ends the event
+                if self._data_lines:
+                    events.append("\n".join(self._data_lines))
+                    self._data_lines = []
+            elif line.startswith(":"):
+                continue  # Comment / keep-alive
+            else:
+                field, _, value = line.partition(":")
+                if field == "data":
+                    self._data_lines.append(value[1:] if value.startswith(" ") else value)
+        return events
+
+
+@dataclass(frozen=True)
+class RequestOptions:
+    """Generation settings of one request; fields left at None use the client defaults
+    
+    Options are passed with each call instead of being set on the client, so
+    one client can serve any number of threads. response_format must not be
+    changed after the options are created.
+    """
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    response_format: Optional[Dict[str, Any]] = None
+    cache: bool = False
+    
+    @classmethod
+    def from_api_settings(cls, api_settings: Optional[Dict[str, Any]]) -> "RequestOptions":
+        """Options for an api_settings block of prompts.json
+        
+        max_completion_tokens is preferred over the older max_tokens key. "cache"
+        is the add-on's response cache opt-in and is never sent to the API.
+        Settings that are left out use the client defaults.
+        """
+        api_settings = api_settings or {}
+        return cls(
+            model=api_settings.get("model"),
+            temperature=api_settings.get("temperature"),
+            max_tokens=api_settings.get("max_completion_tokens") or api_settings.get("max_tokens"),
+            response_format=api_settings.get("response_format"),
+            cache=bool(api_settings.get("cache", False))
+        )
+    
+    def with_defaults(self, defaults: "RequestOptions") -> "RequestOptions":
+        """These options with every unset field taken from defaults"""
+        return RequestOptions(
+            model=self.model or defaults.model,
+            temperature=self.temperature if self.temperature is not None else defaults.temperature,
+            max_tokens=self.max_tokens or defaults.max_tokens,
+            response_format=self.response_format or defaults.response_format,
+            cache=self.cache
+        )
 
 
 class OpenAIClient:
@@ -24,19 +110,69 @@ class OpenAIClient:
     def __init__(self, config):
         self.config = config
         self.api_key = config.get("openai_api_key", "")
-        self.model = config.get("openai_default_model", "gpt-4.1")  # Use default_model as fallback
-        self.temperature = config.get("ai_temperature", 0.3)
-        self.max_tokens = config.get("ai_max_tokens", 1500)
-        self.base_url = "https://api.openai.com/v1"
+        # Settings of requests that do not override them - read-only, per-call settings go in RequestOptions
+        self.defaults = RequestOptions(
+            model=config.get("openai_default_model", "gpt-4.1"),  # Use default_model as fallback
+            temperature=config.get("ai_temperature", 0.3),
+            max_tokens=config.get("ai_max_tokens", 1500)
+        )
+        self.base_url = config.get("openai_base_url") or "https://api.openai.com/v1"
+        
+        # Keep-alive connection pool shared by all clients for this base URL
+        self.pool = get_pool(
+            self.base_url,
+            max_size=config.get("openai_pool_size", 4),
+            idle_timeout=config.get("openai_pool_idle_timeout", 60),
+            timeout=config.get("openai_request_timeout", 30)
+        )
+        
+        # Retries for rate limits and transient errors, paced by a quota shared with every client
+        self.retry_policy = RetryPolicy(
+            max_retries=config.get("openai_max_retries", 4),
+            base_delay=config.get("openai_retry_base_delay", 1.0),
+            max_delay=config.get("openai_retry_max_delay", 30)
+        )
+        self.rate_limiter = get_rate_limiter(
+            self.base_url,
+            requests_per_minute=config.get("openai_requests_per_minute", 500),
+            tokens_per_minute=config.get("openai_tokens_per_minute", 200000)
+        )
+        
+        # Persistent response cache (None when disabled in config.json)
+        self.cache = get_response_cache(config)
+        
+        # Per-step latency and token metrics shared by every client (None when disabled)
+        self.metrics = get_metrics(config)
+        
+        # Per-step max tokens from observed completion lengths (None when disabled)
+        self.token_budget = get_token_budget(config)
         
         # Check availability
         self.enabled = self._check_availability()
     
-    def _prepare_request_data(self, messages, custom_model=None, custom_temperature=None, custom_max_tokens=None):
+    @property
+    def model(self):
+        return self.defaults.model
+    
+    @property
+    def temperature(self):
+        return self.defaults.temperature
+    
+    @property
+    def max_tokens(self):
+        return self.defaults.max_tokens
+    
+    def _options(self, options=None, **overrides):
+        """RequestOptions for one call: options with keyword overrides (model=..., cache=...) applied"""
+        options = options or RequestOptions()
+        return replace(options, **overrides) if overrides else options
+    
+    def _prepare_request_data(self, messages, options=None):
         """Prepare request data with model-specific parameters"""
-        model = custom_model or self.model
-        temperature = custom_temperature if custom_temperature is not None else self.temperature
-        max_tokens = custom_max_tokens or self.max_tokens
+        options = (options or RequestOptions()).with_defaults(self.defaults)
+        model = options.model
+        temperature = options.temperature
+        max_tokens = options.max_tokens
         
         data = {
             "model": model,
@@ -56,6 +192,9 @@ class OpenAIClient:
             data["max_tokens"] = max_tokens
             data["temperature"] = temperature
         
+        if options.response_format:
+            data["response_format"] = options.response_format
+        
         return data
     
     def _check_availability(self):
@@ -64,40 +203,219 @@ class OpenAIClient:
             return False
         return True
     
-    def _make_request(self, endpoint, data):
-        """Make HTTP request to OpenAI API"""
+    def _build_messages(self, prompt, system_message, examples=None):
+        """Build the chat messages list: system, few-shot examples, then the user prompt"""
+        messages = [{"role": "system", "content": system_message}]
+        
+        # Add few-shot examples if provided
+        if examples:
+            for example in examples:
+                if isinstance(example, dict) and "user" in example and "assistant" in example:
+                    messages.append({"role": "user", "content": example["user"]})
+                    messages.append({"role": "assistant", "content": example["assistant"]})
+        
+        # Add the actual user prompt
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def _request_headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}',
+            'User-Agent': 'InferAnki-CardCraft/1.0',
+            'Connection': 'keep-alive'
+        }
+    
+    def _error_details(self, status, error_body):
+        """Extract (message, code) from an API error response body"""
         try:
-            url = f"{self.base_url}/{endpoint}"
+            error = json.loads(error_body).get('error') or {}
+            return error.get('message', f'HTTP {status}'), error.get('code')
+        except:
+            return f'HTTP {status}: {error_body}', None
+    
+    def _backoff(self, attempt, status=None, headers=None):
+        """Wait before the next attempt; a 429 holds back every client sharing the quota"""
+        delay = self.retry_policy.delay(attempt, headers)
+        if status == 429:
+            self.rate_limiter.pause(delay)
+        time.sleep(delay)
+    
+    def _record_metrics(self, endpoint, data, result, started, stats, cached=False):
+        """Add one finished request to the metrics registry, under the current step"""
+        if self.metrics is None:
+            return
+        usage = (result.get("data") or {}).get("usage") if result.get("success") else None
+        self.metrics.record(
+            current_step() or endpoint, data.get("model"), time.monotonic() - started,
+            queue=stats["queue"], status=stats["status"], retries=stats["retries"],
+            usage=usage, cached=cached, ok=result.get("success", False)
+        )
+    
+    def _acquire(self, estimated_tokens, stats):
+        """Wait for the shared quota, counting the wait as time in queue"""
+        waited = time.monotonic()
+        self.rate_limiter.acquire(estimated_tokens)
+        stats["queue"] += time.monotonic() - waited
+    
+    def _make_request(self, endpoint, data):
+        """Make HTTP request to OpenAI API over a pooled keep-alive connection
+        
+        Rate limits (429), server errors and network failures are retried with
+        exponential backoff, honouring Retry-After and the x-ratelimit headers.
+        """
+        started = time.monotonic()
+        stats = {"queue": 0.0, "status": None, "retries": 0}
+        result = self._send_request(endpoint, data, stats)
+        self._record_metrics(endpoint, data, result, started, stats)
+        return result
+    
+    def _send_request(self, endpoint, data, stats):
+        headers = self._request_headers()
+        json_data = json.dumps(data).encode('utf-8')
+        estimated_tokens = estimate_tokens(data)
+        attempt = 0
+        
+        while True:
+            stats["retries"] = attempt
+            self._acquire(estimated_tokens, stats)
+            try:
+                response = self.pool.request("POST", f"/{endpoint}", body=json_data, headers=headers)
+            except Exception as e:
+                stats["status"] = None
+                self.rate_limiter.settle(estimated_tokens, 0)
+                if self.retry_policy.should_retry(attempt):
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                return {"success": False, "error": str(e)}
             
-            # Prepare headers
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}',
-                'User-Agent': 'InferAnki-CardCraft/1.0'
-            }
+            stats["status"] = response.status
+            self.rate_limiter.observe(response.headers)
             
-            # Prepare request
-            json_data = json.dumps(data).encode('utf-8')
-            req = urllib.request.Request(url, data=json_data, headers=headers)
+            if response.status >= 400:
+                self.rate_limiter.settle(estimated_tokens, 0)
+                error_body = response.body.decode('utf-8', errors='replace')
+                error_msg, error_code = self._error_details(response.status, error_body)
+                if self.retry_policy.should_retry(attempt, response.status, error_code):
+                    self._backoff(attempt, response.status, response.headers)
+                    attempt += 1
+                    continue
+                return {"success": False, "error": error_msg}
             
-            # Create SSL context (for HTTPS)
-            ssl_context = ssl.create_default_context()
+            try:
+                response_data = json.loads(response.body.decode('utf-8'))
+            except Exception as e:
+                self.rate_limiter.settle(estimated_tokens, 0)
+                return {"success": False, "error": str(e)}
             
-            # Make request
-            with urllib.request.urlopen(req, context=ssl_context, timeout=30) as response:
-                response_data = json.loads(response.read().decode('utf-8'))
-                return {"success": True, "data": response_data}
-                
-        except urllib.error.HTTPError as e: # type: ignore
-            error_body = e.read().decode('utf-8')
+            usage = response_data.get("usage") or {}
+            self.rate_limiter.settle(estimated_tokens, usage.get("total_tokens"))
+            return {"success": True, "data": response_data}
+    
+    def _cache_lookup(self, endpoint, data, key_data=None):
+        """(cache key, cached result or None) for a request; a hit is recorded in the metrics"""
+        started = time.monotonic()
+        key = self.cache.make_key({"endpoint": endpoint, "data": key_data or data})
+        try:
+            cached = self.cache.get(key)
+        except Exception:
+            cached = None
+        if cached is None:
+            return key, None
+        # No tokens were spent on a cache hit
+        self._record_metrics(endpoint, data, {"success": True}, started,
+                             {"queue": 0.0, "status": None, "retries": 0}, cached=True)
+        return key, {"success": True, "data": cached, "cached": True}
+    
+    def _cache_store(self, key, result):
+        """Cache a successful answer - truncated answers are never cached"""
+        if result["success"] and _finish_reason(result) != "length":
             try:
-                error_data = json.loads(error_body)
-                error_msg = error_data.get('error', {}).get('message', f'HTTP {e.code}')
-            except:
-                error_msg = f'HTTP {e.code}: {error_body}'
-            return {"success": False, "error": error_msg}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+                self.cache.put(key, result["data"])
+            except Exception:
+                pass  # A cache write failure must never fail the request
+    
+    def _run_flow(self, flow):
+        """Run a request flow (_cache_flow / _budget_flow) here, calling each step it yields"""
+        reply = None
+        while True:
+            try:
+                name, args = flow.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply = getattr(self, name)(*args)
+    
+    def _cache_flow(self, endpoint, data, use_cache=False, key_data=None):
+        """Steps of a request through the response cache, as (method name, args) to yield
+        
+        Shared with AsyncOpenAIClient, which awaits the same steps; the
+        _cache_lookup / _cache_store steps are blocking I/O (CACHE_IO_STEPS).
+        """
+        if not use_cache or self.cache is None:
+            return (yield "_make_request", (endpoint, data))
+        
+        key, result = yield "_cache_lookup", (endpoint, data, key_data)
+        if result is None:
+            result = yield "_make_request", (endpoint, data)
+            yield "_cache_store", (key, result)
+        return result
+    
+    def _cached_request(self, endpoint, data, use_cache=False, key_data=None):
+        """Make request through the response cache - cache hits skip the network entirely
+        
+        key_data is the request the answer is cached as, when data only differs
+        from it by a lower token limit. Truncated answers are never cached.
+        """
+        return self._run_flow(self._cache_flow(endpoint, data, use_cache, key_data))
+    
+    def _budget_limit(self, data):
+        """(step, data with the step's adaptive token limit) - the data is None when the configured limit applies"""
+        step = current_step()
+        if self.token_budget is None or step is None:
+            return step, None
+        limit_key = "max_completion_tokens" if "max_completion_tokens" in data else "max_tokens"
+        configured = data.get(limit_key)
+        limit = self.token_budget.limit(step, configured)
+        if limit == configured:
+            return step, None
+        return step, dict(data, **{limit_key: limit})
+    
+    def _budget_truncated(self, step, result):
+        """Whether an answer sent with the adaptive limit was cut off by it (and must be resent)"""
+        if result["success"] and _finish_reason(result) == "length":
+            self.token_budget.truncated(step)
+            return True
+        return False
+    
+    def _budget_observe(self, step, result):
+        """Feed the length of a complete, freshly generated answer to the step's percentiles"""
+        if self.token_budget is None or step is None:
+            return
+        if result["success"] and not result.get("cached") and _finish_reason(result) != "length":
+            usage = result["data"].get("usage") or {}
+            self.token_budget.observe(step, usage.get("completion_tokens"))
+    
+    def _budget_flow(self, endpoint, data, use_cache=False):
+        """Steps of _budgeted_request, shared with AsyncOpenAIClient (see _cache_flow)"""
+        step, limited = self._budget_limit(data)
+        result = None
+        if limited is not None:
+            result = yield "_cached_request", (endpoint, limited, use_cache, data)
+            if self._budget_truncated(step, result):
+                result = None
+        if result is None:
+            result = yield "_cached_request", (endpoint, data, use_cache)
+        self._budget_observe(step, result)
+        return result
+    
+    def _budgeted_request(self, endpoint, data, use_cache=False):
+        """_cached_request with the step's adaptive token limit
+        
+        An answer cut off by the adaptive limit is requested again with the
+        configured one; complete answers feed the step's length percentiles.
+        """
+        return self._run_flow(self._budget_flow(endpoint, data, use_cache))
     
     def test_connection(self):
         """Test basic connection to OpenAI"""
@@ -111,7 +429,7 @@ class OpenAIClient:
         ]
         
         # Use _prepare_request_data with custom max_tokens for quick test
-        data = self._prepare_request_data(messages, custom_max_tokens=10)
+        data = self._prepare_request_data(messages, RequestOptions(max_tokens=10))
         
         result = self._make_request("chat/completions", data)
         
@@ -127,63 +445,46 @@ class OpenAIClient:
                 return {"success": False, "error": f"Invalid response format: {e}"}
         else:
             return {"success": False, "error": result["error"]}
-    def simple_request(self, prompt, system_message="You are a helpful assistant.", examples=None):
-        """Make a simple request to OpenAI with optional few-shot examples"""
+    
+    def simple_request(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                       options=None, **overrides):
+        """Make a simple request to OpenAI with optional few-shot examples
+        
+        options (RequestOptions) override the client defaults for this call
+        only, so one client can be shared by concurrently running steps.
+        Keyword overrides (model=..., temperature=..., max_tokens=...,
+        cache=..., response_format=...) are applied on top of options.
+        cache=True serves identical requests from the persistent response cache.
+        response_format (e.g. {"type": "json_object"}) is passed through to the API.
+        """
         if not self.enabled:
             return None
         
-        # Build messages list
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add few-shot examples if provided
-        if examples:
-            for example in examples:
-                if isinstance(example, dict) and "user" in example and "assistant" in example:
-                    messages.append({"role": "user", "content": example["user"]})
-                    messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add the actual user prompt
-        messages.append({"role": "user", "content": prompt})
+        options = self._options(options, **overrides)
+        messages = self._build_messages(prompt, system_message, examples)
         
         # Use _prepare_request_data to handle model-specific parameters
-        data = self._prepare_request_data(messages)
-        
-        result = self._make_request("chat/completions", data)
+        data = self._prepare_request_data(messages, options)
         
-        if result["success"]:
-            try:
-                message = result["data"]["choices"][0]["message"]["content"]
-                return message.strip() if message else None
-            except (KeyError, IndexError):
-                return None
-        else:
-            if self.config.get("debug_mode", False):
-                showCritical(f"OpenAI request failed: {result['error']}")
-            return None
+        result = self._budgeted_request("chat/completions", data, use_cache=options.cache)
+        return self._answer(result)[0]
     
-    def simple_request_with_usage(self, prompt, system_message="You are a helpful assistant.", examples=None):
+    def simple_request_with_usage(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                                  options=None, **overrides):
         """Make a simple request to OpenAI with optional few-shot examples, return response and usage info"""
         if not self.enabled:
             return None, None
         
-        # Build messages list
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add few-shot examples if provided
-        if examples:
-            for example in examples:
-                if isinstance(example, dict) and "user" in example and "assistant" in example:
-                    messages.append({"role": "user", "content": example["user"]})
-                    messages.append({"role": "assistant", "content": example["assistant"]})
-        
-        # Add the actual user prompt
-        messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_message, examples)
         
         # Use _prepare_request_data to handle model-specific parameters
-        data = self._prepare_request_data(messages)
+        data = self._prepare_request_data(messages, self._options(options, **overrides))
         
         result = self._make_request("chat/completions", data)
-        
+        return self._answer(result)
+    
+    def _answer(self, result):
+        """(answer text, usage info) of a chat completion result - (None, None) if it failed"""
         if result["success"]:
             try:
                 response_data = result["data"]
@@ -197,3 +498,94 @@ class OpenAIClient:
             if self.config.get("debug_mode", False):
                 showCritical(f"OpenAI request failed: {result['error']}")
             return None, None
+    
+    def _read_stream(self, response, state, on_delta, started):
+        """Read an SSE chat completion stream, collecting deltas and usage into state"""
+        parser = SSEParser()
+        finished = False
+        while not finished:
+            line = response.readline()
+            if not line:
+                break
+            for payload in parser.feed(line):
+                if payload == "[DONE]":
+                    finished = True
+                    break
+                chunk = json.loads(payload)
+                if chunk.get("usage"):
+                    state["usage"] = chunk["usage"]
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if not delta:
+                        continue
+                    if state["time_to_first_token"] is None:
+                        state["time_to_first_token"] = time.monotonic() - started
+                    state["parts"].append(delta)
+                    if on_delta:
+                        on_delta(delta)
+        # Drain the terminating chunk so the connection can be reused
+        if finished:
+            response.read()
+    
+    def stream_request_with_usage(self, prompt, system_message="You are a helpful assistant.", examples=None,
+                                  on_delta=None, options=None, **overrides):
+        """Stream a chat completion, calling on_delta(text) for every content fragment
+        
+        Returns (text, usage_info, time_to_first_token) - text is None on failure.
+        on_delta runs in the calling thread. Failures are retried like
+        _make_request as long as no text has been delivered yet.
+        """
+        if not self.enabled:
+            return None, None, None
+        
+        messages = self._build_messages(prompt, system_message, examples)
+        data = self._prepare_request_data(messages, self._options(options, **overrides))
+        data["stream"] = True
+        data["stream_options"] = {"include_usage": True}
+        
+        json_data = json.dumps(data).encode('utf-8')
+        estimated_tokens = estimate_tokens(data)
+        state = {"parts": [], "usage": None, "time_to_first_token": None}
+        stats = {"queue": 0.0, "status": None, "retries": 0}
+        started = time.monotonic()
+        attempt = 0
+        
+        try:
+            while True:
+                stats["retries"] = attempt
+                self._acquire(estimated_tokens, stats)
+                try:
+                    with self.pool.stream("POST", "/chat/completions", body=json_data, headers=self._request_headers()) as response:
+                        stats["status"] = response.status
+                        response_headers = {name.lower(): value for name, value in response.getheaders()}
+                        self.rate_limiter.observe(response_headers)
+                        if response.status < 400:
+                            self._read_stream(response, state, on_delta, started)
+                            break
+                        error_body = response.read().decode('utf-8', errors='replace')
+                except Exception:
+                    self.rate_limiter.settle(estimated_tokens, 0)
+                    # Retrying after text was shown would repeat it
+                    if state["parts"] or not self.retry_policy.should_retry(attempt):
+                        raise
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                
+                self.rate_limiter.settle(estimated_tokens, 0)
+                error_msg, error_code = self._error_details(response.status, error_body)
+                if not self.retry_policy.should_retry(attempt, response.status, error_code):
+                    raise RuntimeError(error_msg)
+                self._backoff(attempt, response.status, response_headers)
+                attempt += 1
+        except Exception as e:
+            self._record_metrics("chat/completions", data, {"success": False}, started, stats)
+            if self.config.get("debug_mode", False):
+                showCritical(f"OpenAI request failed: {e}")
+            return None, None, state["time_to_first_token"]
+        
+        usage_info = state["usage"] or {}
+        self.rate_limiter.settle(estimated_tokens, usage_info.get("total_tokens"))
+        self._record_metrics("chat/completions", data, {"success": True, "data": {"usage": usage_info}}, started, stats)
+        text = "".join(state["parts"]).strip()
+        return (text or None), usage_info, state["time_to_first_token"]
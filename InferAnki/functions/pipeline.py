@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Pipeline Executor
+Runs CardCraft steps as a dependency graph so independent steps overlap
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+
+class PipelineStep:
+    """One unit of pipeline work and the steps whose results it consumes"""
+
+    def __init__(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+def _check_graph(steps: Dict[str, PipelineStep]) -> None:
+    """Reject unknown dependencies and cycles before anything is submitted"""
+    for step in steps.values():
+        for dep in step.depends_on:
+            if dep not in steps:
+                raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'")
+
+    resolved = set()
+    remaining = dict(steps)
+    while remaining:
+        ready = [name for name, step in remaining.items() if all(d in resolved for d in step.depends_on)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+        for name in ready:
+            resolved.add(name)
+            del remaining[name]
+
+
+def _start_ready(pending: Dict[str, PipelineStep], results: Dict[str, Any],
+                 start: Callable[[PipelineStep, list], None]) -> None:
+    """Start every step whose dependencies are done; skipping a step may unblock others"""
+    scheduled = True
+    while scheduled:
+        scheduled = False
+        for name, step in list(pending.items()):
+            if not all(dep in results for dep in step.depends_on):
+                continue
+            del pending[name]
+            scheduled = True
+            args = [results[dep] for dep in step.depends_on]
+            if any(arg is None for arg in args):
+                results[name] = None
+            else:
+                start(step, args)
+
+
+def run_pipeline(steps: Iterable[PipelineStep], max_workers: int = 4) -> Dict[str, Any]:
+    """
+    Run steps concurrently as soon as all of their dependencies are done
+
+    Each step is called with the results of its dependencies as positional
+    arguments, in the order given by depends_on. A step whose dependency
+    returned None (or raised) is skipped and its result is None as well.
+
+    Args:
+        steps: Pipeline steps with unique names
+        max_workers: Maximum number of steps running at the same time
+
+    Returns:
+        Dictionary mapping step name to its result
+
+    Raises:
+        The first exception raised by a step, after all running steps finished
+    """
+    pending = {step.name: step for step in steps}
+    _check_graph(pending)
+
+    results: Dict[str, Any] = {}
+    first_error: Optional[BaseException] = None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="cardcraft") as executor:
+        running = {}
+
+        def start(step, args):
+            # Steps see the caller's context variables (e.g. the trace being logged)
+            context = contextvars.copy_context()
+            running[executor.submit(context.run, step.func, *args)] = step.name
+
+        while pending or running:
+            _start_ready(pending, results, start)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = None
+                    if first_error is None:
+                        first_error = e
+
+    if first_error is not None:
+        raise first_error
+
+    return results
+
+
+async def run_pipeline_async(steps: Iterable[PipelineStep]) -> Dict[str, Any]:
+    """
+    run_pipeline for steps whose funcs are coroutine functions, on the running event loop
+
+    Same dependency, skipping and error rules; every ready step runs at once
+    (limits belong to what the steps await). Cancelling it cancels the running steps.
+    """
+    pending = {step.name: step for step in steps}
+    _check_graph(pending)
+
+    results: Dict[str, Any] = {}
+    first_error: Optional[BaseException] = None
+    running: Dict[asyncio.Future, str] = {}
+
+    def start(step, args):
+        # Each task runs in a copy of the caller's context
+        running[asyncio.ensure_future(step.func(*args))] = step.name
+
+    try:
+        while pending or running:
+            _start_ready(pending, results, start)
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    results[name] = task.result()
+                except Exception as e:
+                    results[name] = None
+                    if first_error is None:
+                        first_error = e
+    finally:
+        for task in running:
+            task.cancel()
+
+    if first_error is not None:
+        raise first_error
+
+    return results
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Prompt Registry
+prompts.json parsed once per process, validated, and re-read only when the file changes
+"""
+
+import json
+import os
+import string
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .openai_client import RequestOptions
+from .ui_thread import showCritical
+
+
+DEFAULT_PROMPTS_PATH = os.path.join(os.path.dirname(__file__), "..", "prompts.json")
+
+# Placeholders the code fills in for each prompt; a template using any other one
+# would only fail with a KeyError in the middle of a CardCraft run
+PLACEHOLDERS = {
+    "norwegian_word_stack": {"input_word"},
+    "english_word_stack": {"norwegian_json", "target_language"},
+    "norwegian_description": {"word_stack"},
+    "norwegian_examples_simple": {"word_stack_json"},
+    "norwegian_examples_sentences": {"word_stack_json", "user_context"},
+    "norwegian_examples_from_content": {"content", "user_context"},
+    "cardcraft_fused": {"input_word", "target_language", "user_context"},
+    "chatbot": {"user_message", "user_lang"},
+}
+QUICK_PROMPT_PLACEHOLDERS = {"expression", "user_lang"}
+
+# Few-shot examples as simple_request takes them: {"user": ..., "assistant": ...}
+Examples = Tuple[Dict[str, str], ...]
+
+
+def template_fields(template: str) -> set:
+    """Names of the {placeholders} in a str.format template; ValueError if it is malformed"""
+    fields = set()
+    for _, field, _, _ in string.Formatter().parse(template):
+        if field is not None:
+            fields.add(field.split(".")[0].split("[")[0])
+    return fields
+
+
+class CompiledPrompt:
+    """
+    One validated prompts.json entry
+
+    The system message and few-shot examples - the part of the request that is
+    the same for every word - are built once per set of values (e.g. the target
+    language) and shared; only the user message is formatted per call. The
+    returned tuples are shared between threads and must not be changed.
+
+    options holds the step's request settings (max_completion_tokens,
+    response_format, ...), resolved from api_settings once per prompts.json
+    version. Steps pass it with each call; the shared client is never modified.
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any], prompts: Dict[str, Any]):
+        self.name = name
+        self.config = config
+        self.prompts = prompts  # The whole file, for examples taken from another prompt
+        self.system_template = config.get("system_message", "")
+        self.user_template = config.get("user_template", "")
+        self.api_settings = config.get("api_settings", {})
+        self.options = RequestOptions.from_api_settings(self.api_settings)
+        self._system_fields = template_fields(self.system_template)
+        self._prefixes: Dict[Tuple, Tuple[str, Examples]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.config.get(key, default)
+
+    def user_message(self, **values: Any) -> str:
+        return self.user_template.format(**values)
+
+    def prefix(self, build_examples: Optional[Callable[..., Iterable[Dict[str, str]]]] = None,
+               **values: Any) -> Tuple[str, Examples]:
+        """
+        System message and few-shot examples for values, built on first use
+
+        build_examples(prompt, **values) returns the examples; it is called
+        once per distinct values for as long as prompts.json is unchanged.
+        """
+        key = tuple(sorted(values.items()))
+        with self._lock:
+            cached = self._prefixes.get(key)
+        if cached is not None:
+            return cached
+
+        if self._system_fields:
+            system_message = self.system_template.format(**values)
+        else:
+            system_message = self.system_template
+        examples = tuple(build_examples(self, **values)) if build_examples else ()
+        with self._lock:
+            return self._prefixes.setdefault(key, (system_message, examples))
+
+
+class PromptRegistry:
+    """
+    prompts.json for the whole process
+
+    Every lookup compares the file's mtime and size with the parsed version,
+    so an edited file is picked up without restarting Anki, but the file is
+    read and validated only when it changed. Prompts whose templates use
+    placeholders the code does not fill in are reported and left out.
+    """
+
+    def __init__(self, path: str = DEFAULT_PROMPTS_PATH,
+                 report: Callable[[str], None] = showCritical):
+        self.path = os.path.abspath(path)
+        self.report = report
+        self.loads = 0
+        self.problems: List[str] = []
+        self._version: Optional[Tuple[int, int]] = None
+        self._prompts: Dict[str, Any] = {}
+        self._compiled: Dict[str, CompiledPrompt] = {}
+        self._lock = threading.Lock()
+
+    def prompts(self) -> Dict[str, Any]:
+        """The parsed prompts.json (shared - do not modify)"""
+        self._refresh()
+        return self._prompts
+
+    def prompt(self, name: str) -> Optional[CompiledPrompt]:
+        """The compiled prompt called name, or None if it is missing or invalid"""
+        self._refresh()
+        return self._compiled.get(name)
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        if version == self._version and self.loads:
+            return
+
+        with self._lock:
+            if version == self._version and self.loads:
+                return
+            prompts, problems = self._load(version)
+            self._compiled = self._compile(prompts, problems)
+            self._prompts = prompts
+            self._version = version
+            self.problems = problems
+            self.loads += 1
+        for problem in problems:
+            self.report(problem)
+
+    def _load(self, version: Optional[Tuple[int, int]]) -> Tuple[Dict[str, Any], List[str]]:
+        if version is None:
+            return {}, ["prompts.json not found"]
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                prompts = json.load(f)
+        except (OSError, ValueError) as e:
+            return {}, [f"Error loading prompts: {e}"]
+        if not isinstance(prompts, dict):
+            return {}, ["Error loading prompts: prompts.json must contain an object"]
+        return prompts, []
+
+    def _compile(self, prompts: Dict[str, Any], problems: List[str]) -> Dict[str, CompiledPrompt]:
+        compiled = {}
+        for name, config in prompts.items():
+            if not isinstance(config, dict):
+                continue
+            problem = self._validate(name, config)
+            if problem:
+                problems.append(f"prompts.json: {name}: {problem}")
+                continue
+            compiled[name] = CompiledPrompt(name, config, prompts)
+        return compiled
+
+    def _validate(self, name: str, config: Dict[str, Any]) -> Optional[str]:
+        """Why the templates of a prompt cannot be used, or None if they can"""
+        allowed = PLACEHOLDERS.get(name)
+        templates = [("system_message", config.get("system_message", "")),
+                     ("user_template", config.get("user_template", ""))]
+        for prompt_id, quick in (config.get("quick_prompts") or {}).items():
+            if isinstance(quick, dict):
+                templates.append((f"quick prompt {prompt_id}", quick.get("prompt_template", "")))
+
+        for field, template in templates:
+            if not isinstance(template, str):
+                return f"{field} is not a string"
+            try:
+                fields = template_fields(template)
+            except ValueError as e:
+                return f"{field} is not a valid template ({e})"
+            expected = QUICK_PROMPT_PLACEHOLDERS if field.startswith("quick prompt") else allowed
+            unknown = fields - expected if expected is not None else set()
+            if unknown:
+                names = ", ".join("{" + field_name + "}" for field_name in sorted(unknown))
+                return f"{field} uses unknown placeholder {names}"
+        return None
+
+
+_REGISTRY: Optional[PromptRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Return the shared registry of the add-on's prompts.json"""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = PromptRegistry()
+        return _REGISTRY
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+InferAnki Rate Limiting
+Retry policy with backoff and a process-wide token bucket for API quotas
+"""
+
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# OpenAI reset headers look like "1s", "6m0s", "20ms" or "1h2m3.5s"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse an OpenAI reset duration ("6m0s", "20ms") or plain seconds into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds the server asked us to wait (retry-after-ms, Retry-After seconds or HTTP date)"""
+    if not headers:
+        return None
+    millis = headers.get("retry-after-ms")
+    if millis:
+        try:
+            return max(0.0, float(millis) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - (now if now is not None else time.time()))
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that defers to the server's Retry-After"""
+
+    def __init__(self, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._random = rng or random.Random()
+
+    def should_retry(self, attempt: int, status: Optional[int] = None, error_code: Optional[str] = None) -> bool:
+        """Whether a failed attempt (0-based) should be retried; status None means a network error"""
+        if attempt >= self.max_retries:
+            return False
+        if error_code == "insufficient_quota":
+            return False  # Billing problem - waiting will not help
+        return status is None or status in RETRYABLE_STATUSES
+
+    def delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Seconds to wait before retry number attempt + 1"""
+        retry_after = parse_retry_after(headers or {})
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return self._random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.blocked_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take amount tokens, waiting until they are available; returns the time waited"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(amount)
+            if not wait:
+                return waited
+            self._sleep(wait)
+            waited += wait
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take amount tokens if they are available now and return 0, else the seconds to wait first
+
+        The non-blocking half of acquire(), for callers that wait in their own way (asyncio).
+        """
+        if self.capacity <= 0:
+            return 0.0
+        # A request larger than the whole bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.level >= amount:
+                self.level -= amount
+                return 0.0
+            return (amount - self.level) / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens that were reserved but not used"""
+        if amount <= 0 or self.capacity <= 0:
+            return
+        with self._lock:
+            self._refill(self._clock())
+            self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining: Optional[float], reset_after: Optional[float]) -> None:
+        """Align the bucket with the server's view of the quota (x-ratelimit-* headers)"""
+        if remaining is None or self.capacity <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset_after:
+                self.blocked_until = max(self.blocked_until, now + reset_after)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by all clients of an API"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock, sleep)
+        self.tokens = TokenBucket(tokens_per_minute, clock, sleep)
+
+    def acquire(self, estimated_tokens: float) -> float:
+        """Wait for one request slot and estimated_tokens tokens; returns the time waited"""
+        return self.requests.acquire(1) + self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: float, used_tokens: Optional[float]) -> None:
+        """Refund the difference when a response used fewer tokens than reserved"""
+        if used_tokens is not None:
+            self.tokens.refund(estimated_tokens - used_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every client, e.g. after a 429 with Retry-After"""
+        if seconds and seconds > 0:
+            self.requests.sync(0, seconds)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Update both buckets from x-ratelimit-remaining-* / x-ratelimit-reset-* headers"""
+        if not headers:
+            return
+        for bucket, name in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            bucket.sync(remaining, parse_duration(headers.get(f"x-ratelimit-reset-{name}")))
+
+    def configure(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """Apply new quotas, keeping the current fill level"""
+        for bucket, rate in ((self.requests, requests_per_minute), (self.tokens, tokens_per_minute)):
+            with bucket._lock:
+                bucket.capacity = float(rate)
+                bucket.rate = bucket.capacity / 60.0
+                bucket.level = min(bucket.level, bucket.capacity)
+
+
+def estimate_tokens(data: Dict) -> int:
+    """Rough upper bound of the tokens a chat request will use: prompt (~4 chars/token) plus output budget"""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in data.get("messages", []))
+    output = data.get("max_completion_tokens") or data.get("max_tokens") or 0
+    return prompt_chars // 4 + int(output)
+
+
+# One limiter per API base URL - the quota belongs to the account, not to a client
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(key: str, requests_per_minute: float = 0, tokens_per_minute: float = 0) -> RateLimiter:
+    """Return the shared rate limiter for key, creating it on first use (0 disables a bucket)"""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _LIMITERS[key] = limiter
+        else:
+            limiter.configure(requests_per_minute, tokens_per_minute)
+        return limiter
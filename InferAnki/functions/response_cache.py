@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Response Cache
+SQLite-backed cache of chat completion responses with TTL and LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# Default cache location - Anki keeps user_files when the add-on is updated
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "user_files")
+
+
+class ResponseCache:
+    """Persistent request -> response cache shared by all OpenAI clients"""
+
+    def __init__(self, path: str, ttl_seconds: float = 30 * 86400, max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+
+    @staticmethod
+    def make_key(request_data: Dict[str, Any]) -> str:
+        """Canonical hash of model, messages and generation parameters"""
+        canonical = json.dumps(request_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response and evict least recently used entries above max_entries"""
+        now = time.time()
+        payload = json.dumps(response, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+# One cache per database file, shared by all clients in the process
+_CACHES: Dict[str, ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(config: Dict[str, Any]) -> Optional[ResponseCache]:
+    """Return the shared response cache configured in config.json, or None if disabled"""
+    if not config.get("openai_cache_enabled", True):
+        return None
+
+    path = config.get("openai_cache_path") or os.path.join(DEFAULT_CACHE_DIR, "response_cache.sqlite3")
+    path = os.path.abspath(path)
+    ttl_seconds = float(config.get("openai_cache_ttl_days", 30)) * 86400
+    max_entries = int(config.get("openai_cache_max_entries", 5000))
+
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            try:
+                cache = ResponseCache(path, ttl_seconds, max_entries)
+            except (OSError, sqlite3.Error):
+                # Read-only add-on folder or broken database - run without a cache
+                return None
+            _CACHES[path] = cache
+        else:
+            cache.ttl_seconds = ttl_seconds
+            cache.max_entries = max_entries
+        return cache
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+InferAnki Speculative CardCraft
+Run the first CardCraft steps for the word being typed, before the ✨ button is pressed
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .metrics import request_step
+from .trace_log import trace_context
+from .ui_thread import quiet_errors
+
+# (step boundary name, func(word, results so far) -> result or None, or a Future of it)
+SpeculativeStep = Tuple[str, Callable[[str, Dict[str, Any]], Any]]
+
+
+class Speculation:
+    """One background run for one word"""
+
+    def __init__(self, word: str):
+        self.word = word
+        self.results: Dict[str, Any] = {}
+        self.started = False
+        self.future: Optional[Future] = None  # The step in flight, when it was handed to a Future
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+
+class SpeculativeCardCraft:
+    """
+    Debounced background runs of the leading CardCraft steps for the latest text
+
+    text_changed(word) is called whenever the Norsk field may have changed. Once the
+    word stays the same for delay seconds, steps run in order on a background thread,
+    each getting the results of the ones before, until one returns None.
+
+    A new word cancels the pending or running speculation: its result is dropped
+    and no further step is started. A step may return a concurrent.futures.Future
+    (e.g. from BlockingOpenAIClient.submit) instead of its result - cancelling
+    then cancels that future, and with it the request in flight.
+    Dialogs are suppressed for the speculation - the user did not ask for it.
+    """
+
+    def __init__(self, steps: Sequence[SpeculativeStep], delay: float = 1.0, max_words: int = 20):
+        self.steps = list(steps)
+        self.delay = delay
+        self.max_words = max_words
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._current: Optional[Speculation] = None
+        self._finished: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def text_changed(self, word: str) -> None:
+        """Schedule a speculation for word, cancelling the one for the previous text"""
+        word = (word or "").strip()
+        with self._lock:
+            if self._current and self._current.word == word:
+                return  # Another field changed - the speculation is still current
+            self._cancel_current()
+            if not word or word in self._finished:
+                return
+            speculation = Speculation(word)
+            self._current = speculation
+            self._timer = threading.Timer(self.delay, self._run, (speculation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self) -> None:
+        """Drop the pending or running speculation"""
+        with self._lock:
+            self._cancel_current()
+
+    def _cancel_current(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._current:
+            self._current.cancelled.set()
+            if self._current.future:
+                self._current.future.cancel()
+            self._current.done.set()
+            self._current = None
+
+    def _run(self, speculation: Speculation) -> None:
+        with self._lock:
+            if speculation.cancelled.is_set():
+                return
+            speculation.started = True
+        try:
+            with quiet_errors(), trace_context(speculation.word):
+                for boundary, func in self.steps:
+                    with request_step(boundary):
+                        result = self._result(speculation, func(speculation.word, dict(speculation.results)))
+                    if speculation.cancelled.is_set() or result is None:
+                        break
+                    speculation.results[boundary] = result
+        except Exception as e:
+            print(f"Speculative CardCraft error: {e}")
+        finally:
+            with self._lock:
+                if not speculation.cancelled.is_set() and speculation.results:
+                    self._finished[speculation.word] = speculation.results
+                    self._finished.move_to_end(speculation.word)
+                    while len(self._finished) > self.max_words:
+                        self._finished.popitem(last=False)
+                if self._current is speculation:
+                    self._current = None
+                    self._timer = None
+            speculation.done.set()
+
+    def _result(self, speculation: Speculation, result: Any) -> Any:
+        """A step's result, waiting for it (cancellably) if the step returned a Future"""
+        if not isinstance(result, Future):
+            return result
+        with self._lock:
+            speculation.future = result
+            if speculation.cancelled.is_set():
+                result.cancel()  # Cancelled while the step was being submitted
+        try:
+            return result.result()
+        except CancelledError:
+            return None
+        finally:
+            speculation.future = None
+
+    def results_for(self, word: str, timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        Step results already computed for word, by boundary name ({} if none)
+
+        A speculation still running for word is waited for (up to timeout), since
+        the same requests would otherwise be sent twice; one that has not started
+        yet is cancelled and left to the caller.
+        """
+        word = (word or "").strip()
+        with self._lock:
+            if word in self._finished:
+                return dict(self._finished[word])
+            speculation = self._current if self._current and self._current.word == word else None
+            if speculation is None:
+                return {}
+            if not speculation.started:
+                self._cancel_current()
+                return {}
+        speculation.done.wait(timeout)
+        with self._lock:
+            return dict(self._finished.get(word, {}))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Adaptive Token Budget
+Per-step max tokens from the completion lengths recently observed for that step
+"""
+
+import collections
+import math
+import threading
+from typing import Any, Deque, Dict, Optional
+
+
+class TokenBudget:
+    """
+    Completion-length percentiles per CardCraft step, used to cap max tokens
+
+    Once a step has min_samples completions, its requests are sent with
+    max tokens = percentile of the last window lengths * headroom (at least
+    floor, never above the configured limit). A runaway generation is then
+    cut short instead of running to the configured limit. The client resends
+    an answer that hit the lower cap with the configured limit, so a long
+    but genuine answer costs one extra request and is never lost.
+    """
+
+    def __init__(self, percentile: float = 99, headroom: float = 1.5, min_samples: int = 20,
+                 floor: int = 256, window: int = 200):
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.floor = floor
+        self.window = window
+        self._lock = threading.Lock()
+        self._lengths: Dict[str, Deque[int]] = {}
+        self._truncated: Dict[str, int] = {}
+
+    def limit(self, step: Optional[str], configured: int) -> int:
+        """max tokens to send for step; configured until the step has enough samples"""
+        if not step or not configured:
+            return configured
+        with self._lock:
+            lengths = self._lengths.get(step)
+            if lengths is None or len(lengths) < self.min_samples:
+                return configured
+            ordered = sorted(lengths)
+        rank = max(1, math.ceil(len(ordered) * self.percentile / 100))
+        budget = math.ceil(ordered[rank - 1] * self.headroom)
+        return min(configured, max(self.floor, budget))
+
+    def observe(self, step: Optional[str], completion_tokens: Optional[int]) -> None:
+        """Add the length of a complete (not truncated) answer"""
+        if not step or not completion_tokens:
+            return
+        with self._lock:
+            lengths = self._lengths.get(step)
+            if lengths is None:
+                lengths = self._lengths[step] = collections.deque(maxlen=self.window)
+            lengths.append(completion_tokens)
+
+    def truncated(self, step: Optional[str]) -> None:
+        """Count an answer cut off by the adaptive limit (it is resent with the configured one)"""
+        if not step:
+            return
+        with self._lock:
+            self._truncated[step] = self._truncated.get(step, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """step -> samples, current adaptive limit (None until min_samples) and truncation count"""
+        with self._lock:
+            steps = {step: len(lengths) for step, lengths in self._lengths.items()}
+            truncated = dict(self._truncated)
+        return {
+            step: {
+                "samples": samples,
+                "limit": self.limit(step, math.inf) if samples >= self.min_samples else None,
+                "truncated": truncated.get(step, 0),
+            }
+            for step, samples in steps.items()
+        }
+
+
+_BUDGET: Optional[TokenBudget] = None
+_BUDGET_LOCK = threading.Lock()
+
+
+def get_token_budget(config: Dict[str, Any]) -> Optional[TokenBudget]:
+    """Return the shared token budget, or None if adaptive_max_tokens is off in config.json"""
+    global _BUDGET
+    if not config.get("adaptive_max_tokens", True):
+        return None
+
+    with _BUDGET_LOCK:
+        if _BUDGET is None:
+            _BUDGET = TokenBudget(
+                percentile=float(config.get("adaptive_max_tokens_percentile", 99)),
+                headroom=float(config.get("adaptive_max_tokens_headroom", 1.5)),
+                min_samples=int(config.get("adaptive_max_tokens_min_samples", 20)),
+                floor=int(config.get("adaptive_max_tokens_floor", 256)),
+            )
+        return _BUDGET
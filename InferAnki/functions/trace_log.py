@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Trace Log
+Structured JSON-lines tracing written by a background thread, with size-based gzip rotation
+"""
+
+import atexit
+import contextlib
+import contextvars
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+
+# Add-on logs folder (ignored by git, kept next to the add-on code)
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
+
+# Records the writer takes from the queue before one write() and flush()
+_BATCH_SIZE = 256
+
+# Trace (word) the current code works for; run_pipeline copies it into step threads
+_CURRENT_TRACE: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("inferanki_trace", default=None)
+
+
+@contextlib.contextmanager
+def trace_context(trace: Optional[str]):
+    """Records logged inside the block without an explicit trace belong to trace"""
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+def trace_sampled(trace: Optional[str], sample_rate: float) -> bool:
+    """Whether records of trace are kept - the same answer for every record of one trace"""
+    if sample_rate >= 1.0:
+        return True
+    if sample_rate <= 0.0:
+        return False
+    return zlib.crc32((trace or "").encode("utf-8")) / 0xFFFFFFFF < sample_rate
+
+
+class NullTraceLogger:
+    """Disabled tracing: log() returns at once and callers skip building payloads"""
+
+    enabled = False
+    dropped = 0
+
+    def sampled(self, trace: Optional[str]) -> bool:
+        return False
+
+    def log(self, event: str, trace: Optional[str] = None, **data: Any) -> None:
+        pass
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        pass
+
+
+class TraceLogger:
+    """
+    JSON-lines trace file fed through a bounded queue
+
+    log() only enqueues the record: the writer thread serializes it, appends
+    it in batches and rotates the file once it grows past max_bytes, gzipping
+    the old file into name.1.gz (older ones move up to name.{backups}.gz).
+    Data passed to log() must not be changed afterwards.
+
+    When the queue is full the record is dropped rather than blocking the
+    caller; the number of dropped records is written with the next batch.
+    sample_rate keeps that fraction of traces (a trace is one word), so
+    the records of a kept trace are always complete.
+    """
+
+    enabled = True
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, backups: int = 3,
+                 sample_rate: float = 1.0, queue_size: int = 1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self.closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="InferAnki trace log", daemon=True)
+        self._thread.start()
+
+    def sampled(self, trace: Optional[str]) -> bool:
+        """Whether log() keeps records of trace - check it before building a costly payload"""
+        return trace_sampled(trace, self.sample_rate)
+
+    def log(self, event: str, trace: Optional[str] = None, **data: Any) -> None:
+        """Queue one record (trace defaults to the trace_context one); never blocks"""
+        if trace is None:
+            trace = _CURRENT_TRACE.get()
+        if self.closed or not self.sampled(trace):
+            return
+        record = {"time": time.time(), "event": event, "thread": threading.current_thread().name}
+        if trace is not None:
+            record["trace"] = trace
+        record.update(data)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is on disk; False on timeout"""
+        if self.closed:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the writer thread"""
+        if self.closed:
+            return
+        self.flush(timeout)
+        self.closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch: List[Any] = [self._queue.get()]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [item for item in batch if isinstance(item, dict)]
+            if records or self.dropped != self._reported_dropped:
+                self._write(records)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is None for item in batch):
+                return
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        lines = []
+        dropped = self.dropped
+        if dropped != self._reported_dropped:
+            lines.append(json.dumps({"time": time.time(), "event": "trace_dropped",
+                                     "count": dropped - self._reported_dropped}))
+            self._reported_dropped = dropped
+        for record in records:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+            except (TypeError, ValueError) as e:
+                lines.append(json.dumps({"time": record.get("time"), "event": record.get("event"),
+                                         "error": f"unserializable record: {e}"}))
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                size = f.tell()
+            if self.max_bytes and size >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            print(f"Trace log error: {e}")
+
+    def _rotate(self) -> None:
+        """name -> name.1.gz, name.1.gz -> name.2.gz, ...; the oldest beyond backups is removed"""
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}.gz"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}.gz")
+        partial = f"{self.path}.1.gz.part"
+        with open(self.path, "rb") as src, gzip.open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(partial, f"{self.path}.1.gz")
+        os.remove(self.path)
+
+
+# One logger per file, shared by the add-on and the analyzers
+_LOGGERS: Dict[str, TraceLogger] = {}
+_LOGGERS_LOCK = threading.Lock()
+_NULL_LOGGER = NullTraceLogger()
+
+
+def get_trace_logger(config: Dict[str, Any]):
+    """Return the shared trace logger configured in config.json, or a NullTraceLogger if disabled"""
+    sample_rate = float(config.get("trace_log_sample_rate", 1.0))
+    if not config.get("trace_log_enabled", True) or sample_rate <= 0:
+        return _NULL_LOGGER
+
+    path = config.get("trace_log_path") or os.path.join(DEFAULT_LOG_DIR, "cardcraft-trace.jsonl")
+    path = os.path.abspath(path)
+
+    with _LOGGERS_LOCK:
+        logger = _LOGGERS.get(path)
+        if logger is None or logger.closed:
+            try:
+                logger = TraceLogger(
+                    path,
+                    max_bytes=int(float(config.get("trace_log_max_mb", 5)) * 1024 * 1024),
+                    backups=int(config.get("trace_log_backups", 3)),
+                    sample_rate=sample_rate,
+                    queue_size=int(config.get("trace_log_queue_size", 1000)),
+                )
+            except OSError:
+                # Read-only add-on folder - tracing is off
+                return _NULL_LOGGER
+            _LOGGERS[path] = logger
+        return logger
+
+
+@atexit.register
+def _close_loggers() -> None:
+    with _LOGGERS_LOCK:
+        loggers = list(_LOGGERS.values())
+    for logger in loggers:
+        logger.close(timeout=2.0)
@@ -1,32 +1,426 @@
 import os
 import re
 import tempfile
+import threading
 import json
 import base64
-from datetime import datetime
+import binascii
+import hashlib
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Anki imports - make optional for testing
 try:
-    from aqt.utils import showInfo, showCritical # type: ignore
     from aqt import mw # type: ignore
     from anki.utils import stripHTML # type: ignore
     ANKI_AVAILABLE = True
 except ImportError:
-    # Mock functions for testing outside Anki
-    def showInfo(msg): print(f"INFO: {msg}")
-    def showCritical(msg): print(f"CRITICAL: {msg}")
     def stripHTML(text): return re.sub(r'<[^>]+>', '', text)
     mw = None
     ANKI_AVAILABLE = False
 
-# Speechify API imports
+# Audio may be created in a background thread - dialogs are shown on the main thread
 try:
-    from speechify import Speechify
-    from speechify.tts import GetSpeechOptionsRequest
-    SPEECHIFY_AVAILABLE = True
+    from .ui_thread import showCritical, showInfo
 except ImportError:
-    SPEECHIFY_AVAILABLE = False
+    # Loaded on its own from the file (tests, benchmarks)
+    def showInfo(msg): print(f"INFO: {msg}")
+    def showCritical(msg): print(f"CRITICAL: {msg}")
+
+# Speechify SDK classes, imported by speechify_available() on first use -
+# loading the SDK is slow and most Anki sessions never voice anything
+Speechify = None
+GetSpeechOptionsRequest = None
+_speechify_imported = False
+_speechify_lock = threading.Lock()
+
+
+def speechify_available():
+    """Import the Speechify SDK if that was not tried yet; False if it is not installed"""
+    global Speechify, GetSpeechOptionsRequest, _speechify_imported
+    with _speechify_lock:
+        if not _speechify_imported:
+            _speechify_imported = True
+            try:
+                from speechify import Speechify as client_class
+                from speechify.tts import GetSpeechOptionsRequest as options_class
+            except ImportError:
+                pass
+            else:
+                # Keep classes that were already set (tests replace them)
+                Speechify = Speechify or client_class
+                GetSpeechOptionsRequest = GetSpeechOptionsRequest or options_class
+        return Speechify is not None
+
+# Voiced audio is stored under a name derived from its content: inferanki-tts-<key>.<format>
+_TTS_MEDIA_NAME = re.compile(r"^inferanki-tts-([0-9a-f]{40})\.([A-Za-z0-9]+)$")
+
+# Audio of long-text chunks - Anki keeps user_files when the add-on is updated
+DEFAULT_CHUNK_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "user_files", "tts_chunks")
+
+# Note fields that receive the [sound:...] tag, first match wins
+AUDIO_FIELDS = ['Audio', 'audio', 'Sound', 'sound']
+
+
+def find_audio_field(note):
+    """Name of the note's audio field, or None"""
+    for field in AUDIO_FIELDS:
+        if field in note:
+            return field
+    return None
+
+
+def has_audio(note):
+    """True if the note's audio field already references a sound file"""
+    field = find_audio_field(note)
+    return bool(field) and "[sound:" in note[field]
+
+
+# Base64 characters decoded per step (a multiple of 4) - about 48 KiB of audio
+_BASE64_CHUNK = 64 * 1024
+
+
+def write_base64(data, f):
+    """Decode base64 data (str or bytes) into the binary file f one chunk at a time
+    
+    Only one decoded chunk is held in memory at any time instead of the whole clip.
+    Returns the number of bytes written.
+    """
+    if not isinstance(data, str):
+        data = memoryview(data)  # Slices of a memoryview are not copies
+    start = f.tell()
+    try:
+        for offset in range(0, len(data), _BASE64_CHUNK):
+            f.write(binascii.a2b_base64(data[offset:offset + _BASE64_CHUNK]))
+    except binascii.Error:
+        # Line breaks or other padding inside the payload shift the 4-character groups
+        f.seek(start)
+        f.truncate()
+        f.write(base64.b64decode(data))
+    return f.tell() - start
+
+
+def write_file_atomically(path, write):
+    """Call write(f) on a partial file next to path and move it into place when it succeeds
+    
+    The same text may be voiced concurrently, and a failed request must not leave a truncated file.
+    """
+    partial_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{threading.get_ident()}.part")
+    try:
+        with open(partial_path, 'wb') as f:
+            write(f)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+# MPEG audio frame headers - enough to join MP3 streams at frame boundaries without re-encoding.
+# Bitrates in kbit/s by (MPEG-1, layer) and bitrate index.
+_MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = (44100, 48000, 32000)
+
+
+def _mp3_frame_length(data, i):
+    """Length of the MPEG audio frame whose header starts at i, or 0 if there is none"""
+    if i + 4 > len(data) or data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+        return 0
+    version = (data[i + 1] >> 3) & 3  # 0 = MPEG-2.5, 1 = reserved, 2 = MPEG-2, 3 = MPEG-1
+    layer = 4 - ((data[i + 1] >> 1) & 3)
+    bitrate_index = data[i + 2] >> 4
+    rate_index = (data[i + 2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0  # Reserved values, or free format which has no length in the header
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[rate_index] >> (0 if mpeg1 else 1 if version == 2 else 2)
+    padding = (data[i + 2] >> 1) & 1
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def _is_info_frame(data, i):
+    """True for a Xing/Info/VBRI header frame - it describes the length of its own stream only"""
+    mono = data[i + 3] >> 6 == 3
+    if (data[i + 1] >> 3) & 3 == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    tag = bytes(data[i + 4 + side_info:i + 8 + side_info])
+    return tag in (b'Xing', b'Info') or bytes(data[i + 36:i + 40]) == b'VBRI'
+
+
+def mp3_frame_spans(data):
+    """[start, end] of each run of consecutive audio frames in MP3 data
+    
+    ID3 tags, the encoder's info frame, junk and a truncated last frame are left out.
+    """
+    i = 0
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        i = 10 + size + (10 if data[5] & 0x10 else 0)  # Header, tag and optional footer
+    spans = []
+    first = True
+    while i + 4 <= len(data):
+        length = _mp3_frame_length(data, i)
+        if not length or i + length > len(data):
+            i += 1  # Resync
+            continue
+        if not (first and _is_info_frame(data, i)):
+            if spans and spans[-1][1] == i:
+                spans[-1][1] = i + length
+            else:
+                spans.append([i, i + length])
+        first = False
+        i += length
+    return spans
+
+
+def concat_mp3(paths, f):
+    """Write the audio frames of the MP3 files in paths to the binary file f as one stream
+    
+    Frames are copied byte for byte, so nothing is re-encoded. Returns the number of bytes written.
+    """
+    written = 0
+    for path in paths:
+        with open(path, 'rb') as part:
+            data = part.read()
+        spans = mp3_frame_spans(data)
+        if not spans:
+            raise ValueError(f"No MP3 audio in {os.path.basename(path)}")
+        view = memoryview(data)
+        for start, end in spans:
+            written += f.write(view[start:end])
+    return written
+
+
+# Long text is cut at sentence ends and pauses first, then at clauses, then between words
+_TEXT_BREAKS = (re.compile(r'(?<=[.!?])\s+'), re.compile(r'(?<=[,;:])\s+'), re.compile(r'\s+'))
+
+
+def _text_pieces(text, max_chars, breaks=_TEXT_BREAKS):
+    """Pieces of text of at most max_chars, each cut at the coarsest break that makes it fit"""
+    if len(text) <= max_chars:
+        yield text
+    elif not breaks:
+        for start in range(0, len(text), max_chars):
+            yield text[start:start + max_chars]
+    else:
+        for part in breaks[0].split(text):
+            if part:
+                yield from _text_pieces(part, max_chars, breaks[1:])
+
+
+def split_tts_text(text, max_chars):
+    """Normalized TTS text cut into chunks of at most max_chars
+    
+    ' '.join(chunks) gives the text back, unless a single word is longer than max_chars.
+    Besides the size limit, a chunk ends after any sentence whose hash has its two low bits
+    clear, once the chunk holds a quarter of max_chars. Cut points then depend on the
+    sentences around them rather than on all text before, so editing one sentence changes
+    its own chunk and rarely the ones after it.
+    """
+    if len(text) <= max_chars:
+        return [text] if text else []
+    chunks = []
+    current, size = [], 0
+    for piece in _text_pieces(text, max_chars):
+        if current and size + 1 + len(piece) > max_chars:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+        size += len(piece) + (1 if current else 0)
+        current.append(piece)
+        if size >= max_chars // 4 and zlib.crc32(piece.encode('utf-8')) & 3 == 0:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+class TTSAudioCache:
+    """Index of voiced audio in the media folder, keyed by a hash of text and voice settings
+    
+    The key is part of the file name, so the index is rebuilt by scanning the
+    media folder and needs no database of its own.
+    """
+    
+    def __init__(self, media_dir):
+        self.media_dir = os.path.abspath(media_dir)
+        self._index = {}
+        self._lock = threading.Lock()
+        self.rebuild()
+    
+    @staticmethod
+    def make_key(text, voice_id, model, language_code, audio_format, options=None):
+        """Hash of everything that changes the audio"""
+        payload = json.dumps(
+            [text, voice_id, model, language_code, audio_format, options or {}],
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+    
+    @staticmethod
+    def media_name(key, audio_format):
+        return f"inferanki-tts-{key}.{audio_format}"
+    
+    def rebuild(self):
+        """Re-index every content-addressed audio file in the media folder"""
+        index = {}
+        try:
+            with os.scandir(self.media_dir) as entries:
+                for entry in entries:
+                    match = _TTS_MEDIA_NAME.match(entry.name)
+                    if match and entry.is_file():
+                        index[match.group(1)] = entry.name
+        except OSError:
+            pass
+        with self._lock:
+            self._index = index
+    
+    def lookup(self, key):
+        """Path of the cached audio for key, or None"""
+        with self._lock:
+            name = self._index.get(key)
+        if not name:
+            return None
+        path = os.path.join(self.media_dir, name)
+        if os.path.exists(path):
+            return path
+        # Removed by "Check Media" or by hand
+        with self._lock:
+            self._index.pop(key, None)
+        return None
+    
+    def add(self, key, media_name):
+        with self._lock:
+            self._index[key] = media_name
+    
+    def prune(self, max_bytes):
+        """Delete the least recently used files until the indexed audio fits in max_bytes"""
+        files = []
+        try:
+            with os.scandir(self.media_dir) as entries:
+                for entry in entries:
+                    match = _TTS_MEDIA_NAME.match(entry.name)
+                    if match and entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path, match.group(1)))
+        except OSError:
+            return
+        total = sum(size for _, size, _, _ in files)
+        for _, size, path, key in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._index.pop(key, None)
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+
+# TTS text normalizer - the old regex cascade (benchmarks/tts_normalizer_legacy.py) with
+# its patterns compiled once, and each group of rules skipped when its trigger character
+# is absent. The rules run in the old order, so the output stays identical;
+# test_tts_normalizer.py holds the golden corpus.
+
+_BULLET_BLOCK = re.compile(r'(?:<[^>]*>)?🔸.*?<br\s*/?>\s*<br\s*/?>', re.IGNORECASE | re.DOTALL)
+_BULLET_TAIL = re.compile(r'(?:<[^>]*>)?🔸.*$', re.IGNORECASE | re.DOTALL)
+
+# &nbsp; and &amp; first, so "&amp;quot;" becomes '"' but "&amp;nbsp;" stays literal.
+# &lt; and &gt; are decoded only after the tags are gone.
+_ENTITIES = (
+    ('&nbsp;', ' '), ('&amp;', '&'), ('&quot;', '"'), ('&apos;', "'"), ('&#39;', "'"),
+    ('&mdash;', '—'), ('&ndash;', '–'), ('&hellip;', '...'), ('&rsquo;', "'"), ('&lsquo;', "'"),
+    ('&rdquo;', '"'), ('&ldquo;', '"'),
+)
+
+# Line breaks, list items and divs become pauses; any other tag is removed
+_TAG_RULES = tuple((re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in (
+    (r'<br\s*/?>\s*<br\s*/?>', ' ... '),
+    (r'<br\s*/?>', ' .. '),
+    (r'</li>\s*<li[^>]*>', ' .. '),
+    (r'</?li[^>]*>', ' '),
+    (r'</?ul[^>]*>', ' '),
+    (r'</?ol[^>]*>', ' '),
+    (r'</div>\s*<div[^>]*>', ' .. '),
+    (r'</?div[^>]*>', ' '),
+))
+_OTHER_TAG = re.compile(r'<[^>]+>')
+
+# Word stack separators (| < > and spaced dashes) become commas
+_SEPARATORS = (
+    ('|', re.compile(r'\s*\|\s*')),
+    ('-', re.compile(r'\s+-\s+')),
+    ('<', re.compile(r'\s*<\s*')),
+    ('>', re.compile(r'\s*>\s*')),
+)
+_LINE_BREAKS = re.compile(r'\r?\n+')
+
+# Dot runs become pauses last: two dots a medium pause, three or more a long one
+_PAUSES = re.compile(r'\.{2,}|⟨(?:LONG|MED)_PAUSE⟩')
+_MEDIUM_PAUSES = {'..': ' .. ', '⟨MED_PAUSE⟩': ' .. '}
+
+
+def _pause(match):
+    return _MEDIUM_PAUSES.get(match.group(), ' ... ')
+
+
+def _strip_markup(text):
+    """Decode entities and replace tags with pauses"""
+    if '&' in text:
+        for entity, replacement in _ENTITIES:
+            text = text.replace(entity, replacement)
+    if '<' in text:
+        for pattern, replacement in _TAG_RULES:
+            text = pattern.sub(replacement, text)
+        text = _OTHER_TAG.sub('', text)
+    if '&' in text:
+        text = text.replace('&lt;', '<').replace('&gt;', '>')
+    return text
+
+
+def _normalize_punctuation(text):
+    """Turn separators into commas, line breaks and dot runs into pauses, and collapse whitespace"""
+    for char, pattern in _SEPARATORS:
+        if char in text:
+            text = pattern.sub(', ', text)
+    if '\n' in text:
+        text = _LINE_BREAKS.sub(' ... ', text)
+    if '..' in text or '⟨' in text:
+        text = _PAUSES.sub(_pause, text)
+    return ' '.join(text.split())
+
+
+def normalize_tts_text(text):
+    """Plain text for Speechify from field HTML, with dots as pauses and separators as commas
+
+    🔸 descriptions are dropped, <br>, list and div tags become pauses, other tags are removed.
+    """
+    text = text.strip()
+    if '🔸' in text:
+        text = _BULLET_BLOCK.sub('', text)
+        text = _BULLET_TAIL.sub('', text)
+    return _normalize_punctuation(_strip_markup(text))
+
 
 class SpeechifyTTSProcessor:
     """Handle Speechify TTS processing for Anki cards with Norwegian optimization"""
@@ -45,11 +439,28 @@ class SpeechifyTTSProcessor:
         self.model = config.get("speechify_model", "simba-multilingual")  # Multilingual model for Norwegian support
         self.language_code = config.get("speechify_language_code", "nb-NO")  # Norwegian Bokmål
         self.audio_format = config.get("speechify_audio_format", "mp3")
+        self.base_url = config.get("speechify_base_url")  # None = official Speechify API
         
         # Speechify advanced options
         self.loudness_normalization = config.get("speechify_loudness_normalization", True)
         self.text_normalization = config.get("speechify_text_normalization", True)
         
+        # Reuse audio already in the media folder for identical text and voice settings
+        self.cache_enabled = config.get("tts_cache_enabled", True)
+        self._audio_cache = None
+        self._audio_cache_lock = threading.Lock()
+        
+        # Long text is voiced in chunks, concurrently, and joined into one clip (MP3 only)
+        self.chunk_chars = config.get("tts_chunk_chars", 1500)  # 0 = always one request
+        self.chunk_concurrency = config.get("tts_chunk_concurrency", 4)
+        self.chunk_cache_max_mb = config.get("tts_chunk_cache_max_mb", 200)
+        self._chunk_cache = None
+        self._chunk_cache_lock = threading.Lock()
+        
+        # One Speechify client (and its HTTP connections) for all requests
+        self._client = None
+        self._client_lock = threading.Lock()
+        
         # Backward compatibility with ElevenLabs settings
         self.speech_rate = config.get("elevenlabs_speech_rate", 0.8)  # Speech rate: 0.5-2.0 (0.8 = 20% slower)
         
@@ -73,11 +484,8 @@ class SpeechifyTTSProcessor:
             else:
                 self.voice_id = "scott"  # Default to scott
         
-        # Check API availability
-        if not SPEECHIFY_AVAILABLE:
-            showCritical("Speechify TTS requires 'speechify-api' library")
-            self.enabled = False
-        elif not self.api_key or self.api_key == "your-api-key-here":
+        # Check API availability (the SDK itself is checked when audio is requested)
+        if not self.api_key or self.api_key == "your-api-key-here":
             if config.get("debug_mode", False):
                 showInfo("Speechify API key not configured in config.json")
     
@@ -85,103 +493,7 @@ class SpeechifyTTSProcessor:
         """Process text with comprehensive HTML cleaning for Norwegian TTS"""
         if not text or not isinstance(text, str):
             return ""
-        input_text = text.strip()
-        
-        # DEBUG: Add version marker to logs to confirm new code is running
-        debug_marker = " [v0.6.0-SPEECHIFY]"
-        
-        # FIRST: Remove 🔸 bullet content (improved logic)
-        # Pattern 1: 🔸 content with <br><br> ending
-        input_text = re.sub(r'(?:<[^>]*>)?🔸.*?<br\s*/?>\s*<br\s*/?>', '', input_text, flags=re.IGNORECASE | re.DOTALL)
-        # Pattern 2: 🔸 content at end of text
-        input_text = re.sub(r'(?:<[^>]*>)?🔸.*$', '', input_text, flags=re.IGNORECASE | re.DOTALL)
-        
-        # SECOND: Convert HTML entities BEFORE tag removal (but keep &lt; and &gt; for now)
-        html_entities = {
-            '&nbsp;': ' ',
-            '&amp;': '&',
-            '&quot;': '"',
-            '&apos;': "'",
-            '&#39;': "'",
-            '&mdash;': '—',
-            '&ndash;': '–',
-            '&hellip;': '...',
-            '&rsquo;': "'",
-            '&lsquo;': "'",
-            '&rdquo;': '"',
-            '&ldquo;': '"'
-        }
-        
-        for entity, replacement in html_entities.items():
-            input_text = input_text.replace(entity, replacement)
-        
-        # THIRD: Handle HTML tags with content preservation
-        # Replace <br><br> (double) with longer pause for clear separation
-        input_text = re.sub(r'<br\s*/?>\s*<br\s*/?>', ' ... ', input_text, flags=re.IGNORECASE)
-        # Replace single <br> with medium pause for word separation
-        input_text = re.sub(r'<br\s*/?>', ' .. ', input_text, flags=re.IGNORECASE)
-        
-        # Handle list items - add pause between list items
-        input_text = re.sub(r'</li>\s*<li[^>]*>', ' .. ', input_text, flags=re.IGNORECASE)
-        input_text = re.sub(r'</?li[^>]*>', ' ', input_text, flags=re.IGNORECASE)
-        input_text = re.sub(r'</?ul[^>]*>', ' ', input_text, flags=re.IGNORECASE)
-        input_text = re.sub(r'</?ol[^>]*>', ' ', input_text, flags=re.IGNORECASE)
-        
-        # Handle div tags - add spacing between divs
-        input_text = re.sub(r'</div>\s*<div[^>]*>', ' .. ', input_text, flags=re.IGNORECASE)
-        input_text = re.sub(r'</?div[^>]*>', ' ', input_text, flags=re.IGNORECASE)
-        
-        # FOURTH: Strip remaining HTML tags (comprehensive approach)
-        # Remove all HTML tags but preserve content
-        input_text = re.sub(r'<[^>]+>', '', input_text)
-        
-        # FIFTH: Now convert remaining HTML entities that could interfere with text
-        input_text = input_text.replace('&lt;', '<')
-        input_text = input_text.replace('&gt;', '>')
-        
-        # SIXTH: Norwegian text processing
-        # Handle pipe-separated words (Norwegian learning) - convert all | to commas
-        input_text = re.sub(r'\s*\|\s*', ', ', input_text)
-        
-        # Handle dashes - convert to commas ONLY when surrounded by spaces (preserve within words like "PC-en")
-        input_text = re.sub(r'\s+-\s+', ', ', input_text)
-        
-        # Handle angle brackets (< >) - convert to commas as well  
-        input_text = re.sub(r'\s*<\s*', ', ', input_text)
-        input_text = re.sub(r'\s*>\s*', ', ', input_text)
-        
-        # Force pause after every real linebreak
-        input_text = re.sub(r'\r?\n+', ' ... ', input_text)
-        
-        # Convert multiple dots to pauses (use placeholders to prevent interference)
-        input_text = re.sub(r'\.{4,}', '⟨LONG_PAUSE⟩', input_text)
-        input_text = re.sub(r'\.{3}', '⟨LONG_PAUSE⟩', input_text)
-        input_text = re.sub(r'\.{2}', '⟨MED_PAUSE⟩', input_text)
-        
-        # Convert placeholders to final pause format
-        input_text = re.sub(r'⟨LONG_PAUSE⟩', ' ... ', input_text)
-        input_text = re.sub(r'⟨MED_PAUSE⟩', ' .. ', input_text)
-        
-        # SEVENTH: Clean up spacing and whitespace
-        input_text = re.sub(r'\s+', ' ', input_text)  # Multiple spaces to single
-        input_text = input_text.strip()
-        
-        # LOG: Record processed text with version marker
-        if self.config.get("debug_mode", False):
-            try:
-                logs_dir = r"a:\KODEKRAFT\PROJECTS\InferAnki\logs"
-                os.makedirs(logs_dir, exist_ok=True)
-                log_file = os.path.join(logs_dir, "convert.log")
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                with open(log_file, "a", encoding="utf-8") as f:
-                    f.write(f"[{timestamp}] ORIGINAL: {repr(text)}\n")
-                    f.write(f"[{timestamp}] PROCESSED{debug_marker}: {input_text}\n")
-            except:
-                pass
-
-        # Apply speech rate control using SSML (if not default rate)
-        if hasattr(self, 'speech_rate') and self.speech_rate != 1.0:
-            input_text = f'<prosody rate="{self.speech_rate}">{input_text}</prosody>'
+        input_text = self.wrap_prosody(normalize_tts_text(text))
         
         # Final check - if result is empty, return empty
         if not input_text:
@@ -189,9 +501,82 @@ class SpeechifyTTSProcessor:
       
         return input_text
     
-    def create_audio_file(self, text):
-        """Create MP3 audio file using Speechify TTS"""
-        if not self.enabled or not SPEECHIFY_AVAILABLE:
+    def wrap_prosody(self, text):
+        """Apply speech rate control using SSML (if not default rate)"""
+        if hasattr(self, 'speech_rate') and self.speech_rate != 1.0:
+            return f'<prosody rate="{self.speech_rate}">{text}</prosody>'
+        return text
+    
+    def speech_chunks(self, text, processed_text):
+        """Processed text of each Speechify request for text - just processed_text unless it is long"""
+        if not self.chunk_chars or self.audio_format != "mp3" or len(processed_text) <= self.chunk_chars:
+            return [processed_text]
+        return [self.wrap_prosody(chunk) for chunk in split_tts_text(normalize_tts_text(text), self.chunk_chars)]
+    
+    def get_media_dir(self):
+        """Anki media folder of the open collection (tts_media_dir overrides it)"""
+        media_dir = self.config.get("tts_media_dir")
+        if media_dir:
+            return media_dir
+        if mw and getattr(mw, 'col', None):
+            return mw.col.media.dir()
+        return None
+    
+    def get_audio_cache(self):
+        """Audio cache for the current media folder, rebuilt when the profile changes"""
+        if not self.cache_enabled:
+            return None
+        media_dir = self.get_media_dir()
+        if not media_dir:
+            return None
+        with self._audio_cache_lock:
+            if self._audio_cache is None or self._audio_cache.media_dir != os.path.abspath(media_dir):
+                self._audio_cache = TTSAudioCache(media_dir)
+            return self._audio_cache
+    
+    def get_chunk_cache(self):
+        """Audio cache of long-text chunks in tts_chunk_cache_dir, or None when caching is off"""
+        if not self.cache_enabled:
+            return None
+        with self._chunk_cache_lock:
+            if self._chunk_cache is None:
+                chunk_dir = self.config.get("tts_chunk_cache_dir") or DEFAULT_CHUNK_CACHE_DIR
+                os.makedirs(chunk_dir, exist_ok=True)
+                self._chunk_cache = TTSAudioCache(chunk_dir)
+            return self._chunk_cache
+    
+    def audio_key(self, processed_text):
+        """Cache key of the audio Speechify would return for processed_text"""
+        return TTSAudioCache.make_key(
+            processed_text, self.voice_id, self.model, self.language_code, self.audio_format,
+            {"loudness_normalization": self.loudness_normalization, "text_normalization": self.text_normalization}
+        )
+    
+    def is_media_file(self, path):
+        """True if path already lives in the media folder (cached or decoded there)"""
+        media_dir = self.get_media_dir()
+        return bool(media_dir) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(media_dir)
+    
+    def get_client(self):
+        """Shared Speechify client, created on first use"""
+        with self._client_lock:
+            if self._client is None:
+                if self.base_url:
+                    self._client = Speechify(token=self.api_key, base_url=self.base_url)
+                else:
+                    self._client = Speechify(token=self.api_key)
+            return self._client
+    
+    def create_audio_file(self, text, raise_errors=False, before_request=None):
+        """Create MP3 audio file using Speechify TTS
+        
+        New audio is written to the media folder under a content-hash name; without
+        an open collection it goes to a temporary file that add_audio_to_note adds.
+        Text longer than tts_chunk_chars is voiced in concurrent chunks joined into one MP3.
+        Errors are shown to the user, or raised when raise_errors is set (bulk jobs).
+        before_request() is called right before a Speechify request, not on cache hits.
+        """
+        if not self.enabled:
             return None
             
         try:
@@ -200,44 +585,104 @@ class SpeechifyTTSProcessor:
             if not processed_text or not processed_text.strip():
                 return None
             
-            # Initialize Speechify client
-            client = Speechify(token=self.api_key)
-            
-            # Prepare options
-            options = GetSpeechOptionsRequest(
-                loudness_normalization=self.loudness_normalization,
-                text_normalization=self.text_normalization
-            )
+            key = self.audio_key(processed_text)
+            audio_cache = self.get_audio_cache()
+            if audio_cache is not None:
+                cached_path = audio_cache.lookup(key)
+                if cached_path:
+                    return cached_path
             
-            # Make TTS request
-            audio_response = client.tts.audio.speech(
-                audio_format=self.audio_format,
-                input=processed_text,
-                language=self.language_code,
-                model=self.model,
-                options=options,
-                voice_id=self.voice_id
-            )
+            if not speechify_available():
+                return None
             
-            # Decode audio data
-            audio_bytes = base64.b64decode(audio_response.audio_data)
+            client = self.get_client()
             
-            # Create temporary file
-            now = datetime.now().strftime('%y%m%d-%H%M%S')
-            filename = f"inferanki-speechify-tts-{now}.{self.audio_format}"
-            temp_dir = tempfile.gettempdir()
-            temp_path = os.path.join(temp_dir, filename)
+            # Name the file after its content so identical audio is stored only once.
+            # Decode straight into the media folder - addFile then has nothing to copy.
+            filename = TTSAudioCache.media_name(key, self.audio_format)
+            media_dir = self.get_media_dir()
+            audio_path = os.path.join(media_dir or tempfile.gettempdir(), filename)
             
-            # Save audio file
-            with open(temp_path, 'wb') as f:
-                f.write(audio_bytes)
+            chunks = self.speech_chunks(text, processed_text)
+            if len(chunks) > 1:
+                self.create_chunked_audio(client, chunks, audio_path, before_request)
+            else:
+                if before_request:
+                    before_request()
+                audio_response = self.request_speech(client, processed_text)
+                write_file_atomically(audio_path, lambda f: write_base64(audio_response.audio_data, f))
             
-            return temp_path
+            if media_dir and audio_cache is not None:
+                audio_cache.add(key, filename)
+            return audio_path
             
         except Exception as e:
+            if raise_errors:
+                raise
             showCritical(f"Error creating Speechify TTS audio: {str(e)}")
             return None
     
+    def request_speech(self, client, processed_text):
+        """One Speechify request; the response carries base64 audio_data"""
+        # Prepare options
+        options = GetSpeechOptionsRequest(
+            loudness_normalization=self.loudness_normalization,
+            text_normalization=self.text_normalization
+        )
+        
+        # Make TTS request
+        return client.tts.audio.speech(
+            audio_format=self.audio_format,
+            input=processed_text,
+            language=self.language_code,
+            model=self.model,
+            options=options,
+            voice_id=self.voice_id
+        )
+    
+    def create_chunked_audio(self, client, chunks, audio_path, before_request=None):
+        """Voice chunks concurrently and join their MP3 frames into audio_path
+        
+        Chunk audio is cached on its own, so after an edit or a failed request only
+        the chunks that changed or failed are requested again.
+        """
+        chunk_cache = self.get_chunk_cache()
+        temp_dir = tempfile.mkdtemp(prefix="inferanki-tts-") if chunk_cache is None else None
+        chunk_dir = temp_dir or chunk_cache.media_dir
+        
+        def voice_chunk(chunk):
+            key = self.audio_key(chunk)
+            if chunk_cache is not None:
+                cached_path = chunk_cache.lookup(key)
+                if cached_path:
+                    try:
+                        os.utime(cached_path)  # Recently used - pruned last
+                    except OSError:
+                        pass
+                    return cached_path
+            if before_request:
+                before_request()
+            audio_response = self.request_speech(client, chunk)
+            filename = TTSAudioCache.media_name(key, self.audio_format)
+            chunk_path = os.path.join(chunk_dir, filename)
+            write_file_atomically(chunk_path, lambda f: write_base64(audio_response.audio_data, f))
+            if chunk_cache is not None:
+                chunk_cache.add(key, filename)
+            return chunk_path
+        
+        try:
+            workers = max(1, min(len(chunks), int(self.chunk_concurrency)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inferanki-tts-chunk") as executor:
+                # Every chunk finishes (and is cached) before the first error is raised
+                futures = [executor.submit(voice_chunk, chunk) for chunk in chunks]
+            chunk_paths = [future.result() for future in futures]
+            write_file_atomically(audio_path, lambda f: concat_mp3(chunk_paths, f))
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        if chunk_cache is not None and self.chunk_cache_max_mb:
+            chunk_cache.prune(self.chunk_cache_max_mb * 1024 * 1024)
+    
     def get_field_content(self, editor):
         """Get raw HTML content from field index 1 (second field)"""
         try:
@@ -253,39 +698,51 @@ class SpeechifyTTSProcessor:
         """Clear audio field without questions"""
         try:
             if hasattr(editor, 'note') and editor.note:
-                audio_fields = ['Audio', 'audio', 'Sound', 'sound']
-                for field in audio_fields:
-                    if field in editor.note:
-                        editor.note[field] = ""
-                        break
+                audio_field = find_audio_field(editor.note)
+                if audio_field:
+                    editor.note[audio_field] = ""
         except Exception as e:
             pass
     
+    def store_audio(self, audio_path, col=None):
+        """Add audio to the media folder of col (default: the open collection) and return its media name"""
+        filename = os.path.basename(audio_path)
+        if self.is_media_file(audio_path):
+            return filename  # Already in the media folder - nothing to copy
+        
+        col = col or (mw.col if mw and hasattr(mw, 'col') else None)
+        if not col:
+            showInfo(f"TEST MODE: Would add audio file {filename}")
+            return filename
+        
+        media_name = col.media.addFile(audio_path)
+        match = _TTS_MEDIA_NAME.match(filename)
+        audio_cache = self.get_audio_cache()
+        if match and audio_cache is not None:
+            audio_cache.add(match.group(1), media_name)
+        return media_name
+    
+    def discard_audio_file(self, audio_path):
+        """Remove a temporary audio file once it was added to the media folder"""
+        if audio_path and not self.is_media_file(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+    
     def add_audio_to_note(self, editor, audio_path):
         """Add audio file to note"""
         try:
             if not os.path.exists(audio_path):
                 showCritical("Audio file not found")
                 return False
-                
-            filename = os.path.basename(audio_path)
             
             # Add file to Anki media collection (only if in Anki environment)
-            if mw and hasattr(mw, 'col') and mw.col:
-                media_name = mw.col.media.addFile(audio_path)
-            else:
-                media_name = filename
-                showInfo(f"TEST MODE: Would add audio file {filename}")
+            media_name = self.store_audio(audio_path)
             
             # Add audio reference to note
             if hasattr(editor, 'note') and editor.note:
-                audio_fields = ['Audio', 'audio', 'Sound', 'sound']
-                audio_field = None
-                
-                for field in audio_fields:
-                    if field in editor.note:
-                        audio_field = field
-                        break
+                audio_field = find_audio_field(editor.note)
                 
                 if audio_field:
                     audio_tag = f"[sound:{media_name}]"
@@ -301,59 +758,68 @@ class SpeechifyTTSProcessor:
             showCritical(f"Error adding audio to note: {str(e)}")
             return False
     
-    def process_text(self, editor):
-        """Main TTS processing function"""
+    def prepare_text(self, editor):
+        """Validate configuration and return field text to voice, or None (user is notified)"""
         if not self.enabled:
             showInfo("Speechify TTS is disabled in configuration")
-            return False
+            return None
             
-        if not SPEECHIFY_AVAILABLE:
+        if not speechify_available():
             showCritical("Speechify TTS requires 'speechify-api' library")
-            return False
+            return None
         
         if not self.api_key or self.api_key == "your-api-key-here":
             showCritical("Speechify API key not configured. Please add 'speechify_api_key' to config.json")
-            return False
+            return None
+        
+        # Get text from field index 1 (second field)
+        text = self.get_field_content(editor)
+        
+        if not text or not text.strip():
+            showInfo(f"Field 2 (index 1) is empty. Please add text to generate TTS audio.")
+            return None
             
+        # Check character limit
+        if len(text) > self.max_chars:
+            showCritical(f"Text too long ({len(text)} chars). Max allowed: {self.max_chars}")
+            return None
+        
+        return text
+    
+    def attach_audio(self, editor, audio_path):
+        """Replace the note's audio with audio_path and refresh the editor (main thread only)"""
+        if not audio_path:
+            showCritical("Failed to create audio file")
+            return False
+        
+        # Clear existing audio (silent processing)
+        self.clear_audio_field(editor)
+        
+        # Add audio to note
+        success = self.add_audio_to_note(editor, audio_path)
+        
+        # Clean up temporary file (cached audio in the media folder stays)
+        self.discard_audio_file(audio_path)
+        
+        if success:
+            # Update editor display (only if in Anki environment)
+            if ANKI_AVAILABLE and hasattr(editor, 'loadNote'):
+                editor.loadNote()
+            return True
+        else:
+            showCritical("Failed to add audio to note")
+            return False
+    
+    def process_text(self, editor):
+        """Main TTS processing function (blocking)"""
         try:
-            # Get text from field index 1 (second field)
-            text = self.get_field_content(editor)
-            
-            if not text or not text.strip():
-                showInfo(f"Field 2 (index 1) is empty. Please add text to generate TTS audio.")
+            text = self.prepare_text(editor)
+            if not text:
                 return False
-                
-            # Check character limit
-            if len(text) > self.max_chars:
-                showCritical(f"Text too long ({len(text)} chars). Max allowed: {self.max_chars}")
-                return False
-            
-            # Clear existing audio (silent processing)
-            self.clear_audio_field(editor)
             
-            # Create audio file
+            # Create audio file and add it to the note
             audio_path = self.create_audio_file(text)
-            if not audio_path:
-                showCritical("Failed to create audio file")
-                return False
-                
-            # Add audio to note
-            success = self.add_audio_to_note(editor, audio_path)
-            if success:
-                # Update editor display (only if in Anki environment)
-                if ANKI_AVAILABLE and hasattr(editor, 'loadNote'):
-                    editor.loadNote()
-                
-                # Clean up temporary file
-                try:
-                    os.remove(audio_path)
-                except:
-                    pass
-                    
-                return True
-            else:
-                showCritical("Failed to add audio to note")
-                return False
+            return self.attach_audio(editor, audio_path)
                 
         except Exception as e:
             showCritical(f"Speechify TTS processing error: {str(e)}")
@@ -0,0 +1,53 @@
+# UI Thread Helpers
+# Qt dialogs that are safe to show from worker threads
+
+import contextvars
+import threading
+from contextlib import contextmanager
+
+try:
+    from aqt import mw # type: ignore
+    from aqt.utils import showInfo as _showInfo, showCritical as _showCritical # type: ignore
+    ANKI_AVAILABLE = True
+except ImportError:
+    ANKI_AVAILABLE = False
+    mw = None
+    # Fallback functions for testing without Anki
+    def _showInfo(text): print(f"INFO: {text}")
+    def _showCritical(text): print(f"CRITICAL: {text}")
+
+# Background work the user did not ask for (speculative CardCraft) must not pop up dialogs.
+# A context variable, so it follows the work onto the request event loop and its worker threads.
+_QUIET = contextvars.ContextVar("inferanki_quiet", default=False)
+
+
+@contextmanager
+def quiet_errors():
+    """Print errors instead of showing dialogs for requests made inside the block"""
+    token = _QUIET.set(True)
+    try:
+        yield
+    finally:
+        _QUIET.reset(token)
+
+
+def errors_are_quiet():
+    return _QUIET.get()
+
+
+def _show(dialog, label, text):
+    """Show a dialog - requests, steps and audio may run in worker threads, Qt only on the main thread"""
+    if errors_are_quiet():
+        print(f"{label}: {text}")
+    elif threading.current_thread() is threading.main_thread() or not mw:
+        dialog(text)
+    else:
+        mw.taskman.run_on_main(lambda: dialog(text))
+
+
+def showInfo(text):
+    _show(_showInfo, "INFO", text)
+
+
+def showCritical(text):
+    _show(_showCritical, "CRITICAL", text)
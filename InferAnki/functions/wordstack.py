@@ -5,21 +5,93 @@ Norwegian Bokmål word analysis using OpenAI GPT-4.1
 """
 
 import json
-import os
 import re
-from typing import Dict, Optional, Any
-from datetime import datetime
+from typing import Any, Dict, Generator, Optional, Tuple
 
-try:
-    from aqt.utils import showInfo, showCritical # type: ignore
-    ANKI_AVAILABLE = True
-except ImportError:
-    ANKI_AVAILABLE = False
+from .openai_client import OpenAIClient
+from .wordstack_store import get_wordstack_store
+from .trace_log import get_trace_logger
+from .prompt_registry import get_prompt_registry
+from .ui_thread import showCritical, showInfo
 
-    def showInfo(text): print(f"INFO: {text}")
-    def showCritical(text): print(f"CRITICAL: {text}")
+# "steps": five requests as a dependency graph; "fused": one JSON-mode request for all fields
+CARDCRAFT_MODES = ("steps", "fused")
+
+# A step's code as a generator: yields its request as (prompt, system_message, examples, options),
+# receives the answer text (or None) and returns the step's result
+StepFlow = Generator[Tuple[str, str, Any, Any], Optional[str], Any]
 
-from .openai_client import OpenAIClient
+
+# Few-shot examples of each step, built once per prompts.json version by the prompt registry
+
+def _word_stack_examples(prompt):
+    for example_word, expected_result in prompt.get("examples", {}).items():
+        yield {
+            "user": prompt.user_message(input_word=example_word),
+            "assistant": json.dumps(expected_result, ensure_ascii=False)
+        }
+
+
+def _translation_examples(prompt, target_language):
+    for example_input, expected_result in prompt.get("examples", {}).items():
+        yield {
+            "user": prompt.user_message(
+                norwegian_json=json.dumps(example_input, ensure_ascii=False, indent=2),
+                target_language=target_language
+            ),
+            "assistant": json.dumps(expected_result, ensure_ascii=False)
+        }
+
+
+def _description_examples(prompt):
+    for example_input, expected_result in prompt.get("examples", {}).items():
+        yield {
+            "user": prompt.user_message(word_stack=example_input),
+            "assistant": "\n".join(expected_result) if isinstance(expected_result, list) else str(expected_result)
+        }
+
+
+def _examples_simple_examples(prompt):
+    examples_data = prompt.get("examples", [])
+    # Handle both old dict format {"word": "result"} and new array format [{"input": "word", "output": "result"}]
+    if isinstance(examples_data, list):
+        pairs = [(example["input"], example["output"]) for example in examples_data
+                 if isinstance(example, dict) and "input" in example and "output" in example]
+    else:
+        pairs = list(examples_data.items())
+    # Example inputs are the word stacks of the norwegian_word_stack examples
+    norwegian_examples = prompt.prompts.get("norwegian_word_stack", {}).get("examples", {})
+    for example_word, expected_result in pairs:
+        if example_word in norwegian_examples:
+            yield {
+                "user": prompt.user_message(
+                    word_stack_json=json.dumps(norwegian_examples[example_word], ensure_ascii=False, indent=2)
+                ),
+                "assistant": str(expected_result)
+            }
+
+
+def _sentence_examples(prompt):
+    for example in prompt.get("examples", []):
+        yield {
+            "user": prompt.user_message(
+                word_stack_json=json.dumps({"example": example.get("input", "")}, ensure_ascii=False),
+                user_context=example.get("user_context", [])
+            ),
+            "assistant": example.get("output", "")
+        }
+
+
+def _fused_examples(prompt, target_language):
+    for example in prompt.get("examples", []):
+        yield {
+            "user": prompt.user_message(
+                input_word=example.get("input", ""),
+                target_language=example.get("target_language", target_language),
+                user_context=example.get("user_context", [])
+            ),
+            "assistant": json.dumps(example.get("output", {}), ensure_ascii=False)
+        }
 
 
 class NorwegianWordAnalyzer:
@@ -27,49 +99,62 @@ class NorwegianWordAnalyzer:
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.openai_client = OpenAIClient(config)
-        self.prompts = self._load_prompts()
+        if config.get("openai_async_client", False):
+            # Requests of every analyzer share one event loop thread and its connections
+            from .async_openai_client import get_blocking_client
+            self.openai_client = get_blocking_client(config)
+        else:
+            self.openai_client = OpenAIClient(config)
+        
+        # prompts.json, parsed once per process and re-read when it changes
+        self.prompt_registry = get_prompt_registry()
         
-        # Setup logging
-        self.log_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..", "KODEKRAFT", "PROJECTS", "InferAnki", "logs")
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir, exist_ok=True)
+        # Lemma-keyed store of analyzed word stacks (None when disabled)
+        self.store = get_wordstack_store(config)
+        
+        # Shared trace log (a no-op logger when tracing is disabled)
+        self.trace = get_trace_logger(config)
     
     def _log_api_call(self, request_data, response_data, step_name=""):
-        """Log API request and response to convert-datetime.log"""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            log_file = os.path.join(self.log_dir, f"convert-{timestamp}.log")
-            
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n{'='*60}\n")
-                f.write(f"TIMESTAMP: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"STEP: {step_name}\n")
-                f.write(f"{'='*60}\n")
-                f.write("API-REQUEST:\n")
-                f.write(json.dumps(request_data, indent=2, ensure_ascii=False))
-                f.write(f"\n{'-'*60}\n")
-                f.write("API-RESPONSE:\n")
-                f.write(str(response_data))
-                f.write(f"\n{'='*60}\n\n")
-        except Exception as e:
-            print(f"Logging error: {e}")
+        """Trace an API request and its raw response; the trace log thread writes it"""
+        self.trace.log("api_call", step=step_name, request=request_data, response=response_data)
     
-    def _load_prompts(self) -> Dict[str, Any]:
-        """Load AI prompts from prompts.json"""
-        try:
-            prompts_file = os.path.join(os.path.dirname(__file__), "..", "prompts.json")
-            
-            if os.path.exists(prompts_file):
-                with open(prompts_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                showCritical("prompts.json not found")
-                return {}
-                
-        except Exception as e:
-            showCritical(f"Error loading prompts: {e}")
-            return {}
+    @property
+    def prompts(self) -> Dict[str, Any]:
+        """AI prompts from prompts.json (shared - do not modify)"""
+        return self.prompt_registry.prompts()
+    
+    def step_flow(self, step: str, *args: Any) -> StepFlow:
+        """The step flow of a CardCraft pipeline step ("analysis", ..., "sentences", or "fused")"""
+        flows = {
+            "analysis": self._analyze_word_flow,
+            "translation": self._translate_to_language_flow,
+            "description": self._get_description_flow,
+            "examples_simple": self._get_examples_simple_flow,
+            "sentences": self._get_examples_sentences_flow,
+            "fused": self._craft_fused_flow,
+        }
+        return flows[step](*args)
+    
+    def run_step_flow(self, flow: StepFlow) -> Any:
+        """
+        Run a step flow in this thread, sending its requests with this analyzer's client
+        
+        The steps are written as flows so that AsyncOpenAIClient.run_step_flow can
+        run the same code with its requests awaited on an event loop instead.
+        A request that raises is thrown into the flow, like a failed call would.
+        """
+        send, value = flow.send, None
+        while True:
+            try:
+                prompt, system_message, examples, options = send(value)
+            except StopIteration as done:
+                return done.value
+            try:
+                value = self.openai_client.simple_request(prompt, system_message, examples, options=options)
+                send = flow.send
+            except Exception as e:
+                send, value = flow.throw, e
     
     def analyze_word(self, word: str) -> Optional[Dict[str, Any]]:
         """
@@ -81,45 +166,38 @@ class NorwegianWordAnalyzer:
         Returns:
             Dictionary with word analysis or None if failed
         """
+        return self.run_step_flow(self._analyze_word_flow(word))
+    
+    def _analyze_word_flow(self, word: str) -> StepFlow:
+        """Step flow of analyze_word() - yields its request (see run_step_flow)"""
         if not word or not word.strip():
             return None
         
         word = word.strip().lower()
         
+        # Stored lemma or unambiguous form - reuse the stored word stack without any request
+        stored = self._lookup_stored_analysis(word)
+        if stored:
+            return stored
+        
         # Get prompt template
-        analyzer_prompt = self.prompts.get("norwegian_word_stack", {})
+        analyzer_prompt = self.prompt_registry.prompt("norwegian_word_stack")
         
         if not analyzer_prompt:
             showCritical("Norwegian word stack prompt not found")
             return None
-          # Build user message with Norwegian template
-        user_template = analyzer_prompt.get("user_template", "")
-        user_message = user_template.format(input_word=word)
-        
-        # Get system message
-        system_message = analyzer_prompt.get("system_message", "")
-        
-        # Build few-shot examples from examples field
-        examples_list = []
-        examples_data = analyzer_prompt.get("examples", {})
-        if examples_data:
-            for example_word, expected_result in examples_data.items():
-                example_user = user_template.format(input_word=example_word)
-                example_assistant = json.dumps(expected_result, ensure_ascii=False)
-                examples_list.append({
-                    "user": example_user,
-                    "assistant": example_assistant
-                })
-        
-        # Update OpenAI client settings
-        api_settings = analyzer_prompt.get("api_settings", {})
-        if api_settings:
-            self.openai_client.model = api_settings.get("model", "gpt-4.1")
-            self.openai_client.temperature = api_settings.get("temperature", 0.1)
-            self.openai_client.max_tokens = api_settings.get("max_tokens", 1000)
+        
+        # Build user message with Norwegian template
+        user_message = analyzer_prompt.user_message(input_word=word)
+        
+        # System message and few-shot examples are built once per prompts.json version
+        system_message, examples_list = analyzer_prompt.prefix(_word_stack_examples)
+        
+        api_settings = analyzer_prompt.api_settings
+        options = analyzer_prompt.options
         try:
             # Make API request with examples
-            response = self.openai_client.simple_request(user_message, system_message, examples_list)
+            response = yield user_message, system_message, examples_list, options
             
             # Log the API call
             request_data = {
@@ -128,7 +206,7 @@ class NorwegianWordAnalyzer:
                 "user_message": user_message,
                 "api_settings": api_settings
             }
-            self._log_api_call(request_data, response, f"STEP1_NORWEGIAN_ANALYSIS_{word}")
+            self._log_api_call(request_data, response, "STEP1_NORWEGIAN_ANALYSIS")
             
             if response:
                 # Parse JSON response
@@ -137,6 +215,7 @@ class NorwegianWordAnalyzer:
                     
                     # Validate response structure
                     if self._validate_analysis(analysis):
+                        self._store_analysis(word, analysis)
                         return analysis
                     else:
                         showCritical("Invalid analysis structure received")
@@ -152,6 +231,26 @@ class NorwegianWordAnalyzer:
         except Exception as e:
                         showCritical(f"Error analyzing word '{word}': {e}")
         return None
+    def _lookup_stored_analysis(self, word: str) -> Optional[Dict[str, Any]]:
+        """Return the stored word stack for word or one of its forms, if any"""
+        if not self.store:
+            return None
+        try:
+            _, analysis = self.store.lookup(word)
+            return analysis
+        except Exception as e:
+            print(f"Word stack store error: {e}")
+            return None
+    
+    def _store_analysis(self, word: str, analysis: Dict[str, Any]) -> None:
+        """Remember a validated word stack under its lemma"""
+        if not self.store:
+            return
+        try:
+            self.store.store_analysis(word, analysis)
+        except Exception as e:
+            print(f"Word stack store error: {e}")
+    
     def _validate_analysis(self, analysis: Dict[str, Any]) -> bool:        
         """Validate the structure of word analysis"""
         # Check for new format fields including partisipp
@@ -257,6 +356,10 @@ class NorwegianWordAnalyzer:
             
     def translate_to_language(self, norwegian_json: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Translate Norwegian word forms JSON to target language from config"""
+        return self.run_step_flow(self._translate_to_language_flow(norwegian_json))
+    
+    def _translate_to_language_flow(self, norwegian_json: Dict[str, Any]) -> StepFlow:
+        """Step flow of translate_to_language() - yields its request (see run_step_flow)"""
         try:
             if not self.openai_client.enabled:
                 showCritical("OpenAI client not enabled")
@@ -265,8 +368,17 @@ class NorwegianWordAnalyzer:
             # Get target language from config
             target_language = self.config.get("field_1_response_lang", "English")
             
+            # Translation of a known word stack is reused from the store
+            if self.store:
+                try:
+                    stored_translation = self.store.get_translation(norwegian_json, target_language)
+                    if stored_translation:
+                        return stored_translation
+                except Exception as e:
+                    print(f"Word stack store error: {e}")
+            
             # Get translator prompt
-            translator_prompt = self.prompts.get("english_word_stack", {})
+            translator_prompt = self.prompt_registry.prompt("english_word_stack")
             
             if not translator_prompt:
                 showCritical("Target language word stack prompt not found")
@@ -276,39 +388,21 @@ class NorwegianWordAnalyzer:
             norwegian_json_str = json.dumps(norwegian_json, ensure_ascii=False, indent=2)
             
             # Build user message with target language substitution
-            user_template = translator_prompt.get("user_template", "")
-            user_message = user_template.format(
+            user_message = translator_prompt.user_message(
                 norwegian_json=norwegian_json_str,
                 target_language=target_language
             )
             
-            # Get system message with target language substitution
-            system_message = translator_prompt.get("system_message", "")
-            system_message = system_message.format(target_language=target_language)
-              # Build few-shot examples from examples field
-            examples_list = []
-            examples_data = translator_prompt.get("examples", {})
-            if examples_data:
-                for example_input, expected_result in examples_data.items():
-                    example_user = user_template.format(
-                        norwegian_json=json.dumps(example_input, ensure_ascii=False, indent=2),
-                        target_language=target_language
-                    )
-                    example_assistant = json.dumps(expected_result, ensure_ascii=False)
-                    examples_list.append({
-                        "user": example_user,
-                        "assistant": example_assistant
-                    })
-            
-            # Update OpenAI client settings
-            api_settings = translator_prompt.get("api_settings", {})            
-            if api_settings:
-                self.openai_client.model = api_settings.get("model", "gpt-4.1")
-                self.openai_client.temperature = api_settings.get("temperature", 0)
-                self.openai_client.max_tokens = api_settings.get("max_tokens", 300)
+            # System message and few-shot examples for the target language, built once
+            system_message, examples_list = translator_prompt.prefix(
+                _translation_examples, target_language=target_language
+            )
+            
+            api_settings = translator_prompt.api_settings
+            options = translator_prompt.options
             
             # Make the API call using simple_request with examples
-            response = self.openai_client.simple_request(user_message, system_message, examples_list)
+            response = yield user_message, system_message, examples_list, options
             
             # Log the API call
             request_data = {
@@ -320,18 +414,13 @@ class NorwegianWordAnalyzer:
             
             if response:
                 try:
-                    english_result = json.loads(response)
+                    english_result = self._clean_translation(json.loads(response))
                     
-                    # Clean null patterns from English translation result
-                    if english_result:
-                        for field_name, field_value in english_result.items():
-                            if isinstance(field_value, str) and field_value:
-                                english_result[field_name] = self._clean_null_patterns(field_value)
-                            elif isinstance(field_value, list):
-                                english_result[field_name] = [
-                                    self._clean_null_patterns(item) if isinstance(item, str) else item
-                                    for item in field_value
-                                ]
+                    if self.store and english_result:
+                        try:
+                            self.store.store_translation(norwegian_json, target_language, english_result)
+                        except Exception as e:
+                            print(f"Word stack store error: {e}")
                     
                     return english_result
                 except json.JSONDecodeError as e:
@@ -344,6 +433,19 @@ class NorwegianWordAnalyzer:
         except Exception as e:
             showCritical(f"Translation error: {str(e)}")
             return None
+    def _clean_translation(self, english_result):
+        """Clean null patterns from a translated word stack"""
+        if english_result:
+            for field_name, field_value in english_result.items():
+                if isinstance(field_value, str) and field_value:
+                    english_result[field_name] = self._clean_null_patterns(field_value)
+                elif isinstance(field_value, list):
+                    english_result[field_name] = [
+                        self._clean_null_patterns(item) if isinstance(item, str) else item
+                        for item in field_value
+                    ]
+        return english_result
+    
     def get_description(self, word_stack: str) -> Optional[list]:
         """
         Get Norwegian description of the core concept(s) represented by the word stack
@@ -354,47 +456,31 @@ class NorwegianWordAnalyzer:
         Returns:
             List of description strings starting with 🔸 or None if failed
         """
+        return self.run_step_flow(self._get_description_flow(word_stack))
+    
+    def _get_description_flow(self, word_stack: str) -> StepFlow:
+        """Step flow of get_description() - yields its request (see run_step_flow)"""
         try:
             if not self.openai_client.enabled:
                 showCritical("OpenAI client not enabled")
                 return None
               # Get description prompt
-            description_prompt = self.prompts.get("norwegian_description", {})
+            description_prompt = self.prompt_registry.prompt("norwegian_description")
             
             if not description_prompt:
                 showCritical("Norwegian description prompt not found")
                 return None
               # Build user message
-            user_template = description_prompt.get("user_template", "")
-            user_message = user_template.format(word_stack=word_stack)
-            
-            # Get system message
-            system_message = description_prompt.get("system_message", "")
-            
-            # Build few-shot examples from examples field
-            examples_list = []
-            examples_data = description_prompt.get("examples", {})
-            if examples_data:
-                for example_input, expected_result in examples_data.items():
-                    example_user = user_template.format(word_stack=example_input)
-                    if isinstance(expected_result, list):
-                        example_assistant = "\n".join(expected_result)
-                    else:
-                        example_assistant = str(expected_result)
-                    examples_list.append({
-                        "user": example_user,
-                        "assistant": example_assistant
-                    })
-            
-            # Update OpenAI client settings
-            api_settings = description_prompt.get("api_settings", {})            
-            if api_settings:
-                self.openai_client.model = api_settings.get("model", "gpt-4.1")
-                self.openai_client.temperature = api_settings.get("temperature", 0.1)
-                self.openai_client.max_tokens = api_settings.get("max_tokens", 100)
+            user_message = description_prompt.user_message(word_stack=word_stack)
+            
+            # System message and few-shot examples are built once per prompts.json version
+            system_message, examples_list = description_prompt.prefix(_description_examples)
+            
+            api_settings = description_prompt.api_settings
+            options = description_prompt.options
             
             # Make the API call with examples
-            response = self.openai_client.simple_request(user_message, system_message, examples_list)
+            response = yield user_message, system_message, examples_list, options
             
             # Log the API call
             request_data = {
@@ -405,25 +491,7 @@ class NorwegianWordAnalyzer:
             }
             self._log_api_call(request_data, response, "STEP3_NORWEGIAN_DESCRIPTION")
             if response:
-                # Parse response as text and split by lines starting with 🔸
-                description_lines = []
-                for line in response.strip().split('\n'):
-                    line = line.strip()
-                    if line.startswith('🔸'):
-                        # Clean null patterns from each description line
-                        cleaned_line = self._clean_null_patterns(line)
-                        if cleaned_line:  # Only add if something remains after cleaning
-                            description_lines.append(cleaned_line)
-                
-                # If no 🔸 lines found, but we have response text, add it with 🔸
-                if not description_lines and response.strip():
-                    response_text = self._clean_null_patterns(response.strip())
-                    if response_text and not response_text.startswith('🔸'):
-                        response_text = f"🔸 {response_text}"
-                    if response_text:
-                        description_lines.append(response_text)
-                
-                return description_lines if description_lines else None
+                return self._parse_description(response)
             else:
                 showCritical("No response from description API")
                 return None
@@ -431,6 +499,28 @@ class NorwegianWordAnalyzer:
         except Exception as e:
             showCritical(f"Description error: {str(e)}")
             return None
+    def _parse_description(self, response: str) -> Optional[list]:
+        """Description lines starting with 🔸 from the response text"""
+        # Parse response as text and split by lines starting with 🔸
+        description_lines = []
+        for line in response.strip().split('\n'):
+            line = line.strip()
+            if line.startswith('🔸'):
+                # Clean null patterns from each description line
+                cleaned_line = self._clean_null_patterns(line)
+                if cleaned_line:  # Only add if something remains after cleaning
+                    description_lines.append(cleaned_line)
+        
+        # If no 🔸 lines found, but we have response text, add it with 🔸
+        if not description_lines and response.strip():
+            response_text = self._clean_null_patterns(response.strip())
+            if response_text and not response_text.startswith('🔸'):
+                response_text = f"🔸 {response_text}"
+            if response_text:
+                description_lines.append(response_text)
+        
+        return description_lines if description_lines else None
+    
     def get_examples_simple(self, norwegian_json: Dict[str, Any]) -> Optional[str]:
         """
         Generate simple usage examples for each word form in the Norwegian word stack
@@ -441,13 +531,17 @@ class NorwegianWordAnalyzer:
         Returns:
             String with usage examples or None if failed
         """
+        return self.run_step_flow(self._get_examples_simple_flow(norwegian_json))
+    
+    def _get_examples_simple_flow(self, norwegian_json: Dict[str, Any]) -> StepFlow:
+        """Step flow of get_examples_simple() - yields its request (see run_step_flow)"""
         try:
             if not self.openai_client.enabled:
                 showCritical("OpenAI client not enabled")
                 return None
             
             # Get examples prompt
-            examples_prompt = self.prompts.get("norwegian_examples_simple", {})
+            examples_prompt = self.prompt_registry.prompt("norwegian_examples_simple")
             
             if not examples_prompt:
                 showCritical("Norwegian examples simple prompt not found")
@@ -456,70 +550,16 @@ class NorwegianWordAnalyzer:
             # Convert Norwegian JSON to clean string for template
             norwegian_json_str = json.dumps(norwegian_json, ensure_ascii=False, indent=2)
               # Build user message
-            user_template = examples_prompt.get("user_template", "")
-            user_message = user_template.format(word_stack_json=norwegian_json_str)
-            
-            # Get system message
-            system_message = examples_prompt.get("system_message", "")            # Build few-shot examples from examples field
-            examples_list = []
-            examples_data = examples_prompt.get("examples", [])
-            if examples_data:
-                # Handle both old dict format and new array format
-                if isinstance(examples_data, list):
-                    # New format: [{"input": "word", "output": "result"}]
-                    for example in examples_data:
-                        if isinstance(example, dict) and "input" in example and "output" in example:
-                            example_word = example["input"]
-                            expected_result = example["output"]
-                            
-                            # Look up the word in norwegian_word_stack examples
-                            norwegian_examples = self.prompts.get("norwegian_word_stack", {}).get("examples", {})
-                            if example_word in norwegian_examples:
-                                example_input_json = norwegian_examples[example_word]
-                                example_input_str = json.dumps(example_input_json, ensure_ascii=False, indent=2)
-                                example_user = user_template.format(word_stack_json=example_input_str)
-                                example_assistant = str(expected_result)
-                                examples_list.append({
-                                    "user": example_user,
-                                    "assistant": example_assistant
-                                })
-                else:
-                    # Old format: {"word": "result"}
-                    for example_word, expected_result in examples_data.items():
-                        # Look up the word in norwegian_word_stack examples
-                        norwegian_examples = self.prompts.get("norwegian_word_stack", {}).get("examples", {})
-                        if example_word in norwegian_examples:
-                            example_input_json = norwegian_examples[example_word]
-                            example_input_str = json.dumps(example_input_json, ensure_ascii=False, indent=2)
-                            example_user = user_template.format(word_stack_json=example_input_str)
-                            example_assistant = str(expected_result)
-                            examples_list.append({
-                                "user": example_user,
-                                "assistant": example_assistant
-                            })
-            
-            # Update OpenAI client settings
-            api_settings = examples_prompt.get("api_settings", {})
-            if api_settings:
-                self.openai_client.model = api_settings.get("model", "gpt-4.1")
-                self.openai_client.temperature = api_settings.get("temperature", 0.2)
-                self.openai_client.max_tokens = api_settings.get("max_tokens", 300)
+            user_message = examples_prompt.user_message(word_stack_json=norwegian_json_str)
+            
+            # System message and few-shot examples are built once per prompts.json version
+            system_message, examples_list = examples_prompt.prefix(_examples_simple_examples)
+            
+            options = examples_prompt.options
               # Make the API call with examples
-            response = self.openai_client.simple_request(user_message, system_message, examples_list)
+            response = yield user_message, system_message, examples_list, options
             if response:
-                # Apply hardcoded processing: make noen, ens, noe italic
-                processed_response = response.strip()
-                
-                # Clean null patterns first
-                processed_response = self._clean_null_patterns(processed_response)
-                
-                # Replace specific words with italic formatting (case-insensitive)
-                import re
-                processed_response = re.sub(r'\bnoen\b', r'<i>noen</i>', processed_response, flags=re.IGNORECASE)
-                processed_response = re.sub(r'\bens\b', r'<i>ens</i>', processed_response, flags=re.IGNORECASE)
-                processed_response = re.sub(r'\bnoe\b', r'<i>noe</i>', processed_response, flags=re.IGNORECASE)
-                
-                return processed_response
+                return self._format_examples_simple(response)
             else:
                 showCritical("No response from examples API")
                 return None
@@ -528,6 +568,20 @@ class NorwegianWordAnalyzer:
             showCritical(f"Examples error: {str(e)}")
             return None
 
+    def _format_examples_simple(self, response: str) -> str:
+        """Apply hardcoded processing: make noen, ens, noe italic"""
+        processed_response = response.strip()
+        
+        # Clean null patterns first
+        processed_response = self._clean_null_patterns(processed_response)
+        
+        # Replace specific words with italic formatting (case-insensitive)
+        processed_response = re.sub(r'\bnoen\b', r'<i>noen</i>', processed_response, flags=re.IGNORECASE)
+        processed_response = re.sub(r'\bens\b', r'<i>ens</i>', processed_response, flags=re.IGNORECASE)
+        processed_response = re.sub(r'\bnoe\b', r'<i>noe</i>', processed_response, flags=re.IGNORECASE)
+        
+        return processed_response
+    
     def get_examples_sentences(self, norwegian_json: Dict[str, Any], user_context: Optional[list] = None) -> Optional[str]:
         """
         Generate complete Norwegian sentences for each word form in the Norwegian word stack
@@ -539,13 +593,17 @@ class NorwegianWordAnalyzer:
         Returns:
             String with example sentences or None if failed
         """
+        return self.run_step_flow(self._get_examples_sentences_flow(norwegian_json, user_context))
+    
+    def _get_examples_sentences_flow(self, norwegian_json: Dict[str, Any], user_context: Optional[list] = None) -> StepFlow:
+        """Step flow of get_examples_sentences() - yields its request (see run_step_flow)"""
         try:
             if not self.openai_client.enabled:
                 showCritical("OpenAI client not enabled")
                 return None
             
             # Get examples sentences prompt
-            sentences_prompt = self.prompts.get("norwegian_examples_sentences", {})
+            sentences_prompt = self.prompt_registry.prompt("norwegian_examples_sentences")
             
             if not sentences_prompt:
                 showCritical("Norwegian examples sentences prompt not found")
@@ -559,43 +617,19 @@ class NorwegianWordAnalyzer:
                 user_context = sentences_prompt.get("user_context", [])
             
             # Build user message
-            user_template = sentences_prompt.get("user_template", "")
-            user_message = user_template.format(
+            user_message = sentences_prompt.user_message(
                 word_stack_json=norwegian_json_str,
                 user_context=user_context
             )
             
-            # Get system message
-            system_message = sentences_prompt.get("system_message", "")
-            
-            # Build examples list
-            examples_list = []
-            examples_data = sentences_prompt.get("examples", [])
-            if examples_data:
-                for example in examples_data:
-                    example_input = example.get("input", "")
-                    example_context = example.get("user_context", [])
-                    expected_output = example.get("output", "")
-                    
-                    example_user = user_template.format(
-                        word_stack_json=json.dumps({"example": example_input}, ensure_ascii=False),
-                        user_context=example_context
-                    )
-                    
-                    examples_list.append({
-                        "user": example_user,
-                        "assistant": expected_output
-                    })
-            
-            # Update OpenAI client settings
-            api_settings = sentences_prompt.get("api_settings", {})
-            if api_settings:
-                self.openai_client.model = api_settings.get("model", "gpt-4.1")
-                self.openai_client.temperature = api_settings.get("temperature", 0.3)
-                self.openai_client.max_tokens = api_settings.get("max_tokens", 400)
+            # System message and few-shot examples are built once per prompts.json version
+            system_message, examples_list = sentences_prompt.prefix(_sentence_examples)
+            
+            api_settings = sentences_prompt.api_settings
+            options = sentences_prompt.options
             
             # Make the API call with examples
-            response = self.openai_client.simple_request(user_message, system_message, examples_list)
+            response = yield user_message, system_message, examples_list, options
             
             # Log the API call
             request_data = {
@@ -617,3 +651,124 @@ class NorwegianWordAnalyzer:
         except Exception as e:
             showCritical(f"Sentences error: {str(e)}")
             return None
+
+    def craft_fused(self, word: str, user_context: Optional[list] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run all five CardCraft steps as one JSON-mode request (the "fused" CardCraft mode)
+        
+        Args:
+            word: Norwegian word to analyze
+            user_context: List of context words/topics to influence sentence generation
+            
+        Returns:
+            Results by pipeline step name, cleaned like the five separate steps,
+            or None if the request failed or returned no usable word stack
+        """
+        return self.run_step_flow(self._craft_fused_flow(word, user_context))
+    
+    def _craft_fused_flow(self, word: str, user_context: Optional[list] = None) -> StepFlow:
+        """Step flow of craft_fused() - yields its request (see run_step_flow)"""
+        if not word or not word.strip():
+            return None
+        word = word.strip().lower()
+        
+        try:
+            if not self.openai_client.enabled:
+                showCritical("OpenAI client not enabled")
+                return None
+            
+            fused_prompt = self.prompt_registry.prompt("cardcraft_fused")
+            if not fused_prompt:
+                showCritical("Fused CardCraft prompt not found")
+                return None
+            
+            target_language = self.config.get("field_1_response_lang", "English")
+            if user_context is None:
+                user_context = fused_prompt.get("user_context", [])
+            
+            user_message = fused_prompt.user_message(
+                input_word=word, target_language=target_language, user_context=user_context
+            )
+            system_message, examples_list = fused_prompt.prefix(_fused_examples, target_language=target_language)
+            
+            api_settings = fused_prompt.api_settings
+            options = fused_prompt.options
+            response = yield user_message, system_message, examples_list, options
+            
+            # Log the API call
+            request_data = {
+                "system_message": system_message,
+                "examples": examples_list,
+                "user_message": user_message,
+                "user_context": user_context,
+                "api_settings": api_settings
+            }
+            self._log_api_call(request_data, response, "FUSED_CARDCRAFT")
+            
+            if not response:
+                showCritical("No response from fused CardCraft API")
+                return None
+            try:
+                fused = json.loads(response)
+            except json.JSONDecodeError as e:
+                showCritical(f"Failed to parse fused CardCraft JSON: {e}")
+                return None
+            return self._split_fused_result(word, fused, target_language)
+            
+        except Exception as e:
+            showCritical(f"Fused CardCraft error: {str(e)}")
+            return None
+    
+    def _split_fused_result(self, word: str, fused: Any, target_language: str) -> Optional[Dict[str, Any]]:
+        """Results by pipeline step name from a fused answer, stored like the separate steps' results"""
+        analysis = fused.get("word_stack") if isinstance(fused, dict) else None
+        if not isinstance(analysis, dict) or not self._validate_analysis(analysis):
+            showCritical("Invalid analysis structure received")
+            return None
+        self._store_analysis(word, analysis)
+        
+        def text(value):
+            # Line lists are accepted for the free-text parts
+            if isinstance(value, list):
+                value = "\n".join(str(item) for item in value if item)
+            return value.strip() if isinstance(value, str) and value.strip() else None
+        
+        translation = fused.get("translation")
+        if isinstance(translation, dict) and translation:
+            translation = self._clean_translation(translation)
+            if self.store:
+                try:
+                    self.store.store_translation(analysis, target_language, translation)
+                except Exception as e:
+                    print(f"Word stack store error: {e}")
+        else:
+            translation = None
+        
+        description = text(fused.get("description"))
+        examples_simple = text(fused.get("examples_simple"))
+        sentences = text(fused.get("sentences"))
+        return {
+            "analysis": analysis,
+            "translation": translation,
+            "description": self._parse_description(description) if description else None,
+            "examples_simple": self._format_examples_simple(examples_simple) if examples_simple else None,
+            "sentences": self._clean_null_patterns(sentences) if sentences else None,
+        }
+
+
+def resolve_cardcraft_mode(config: Dict[str, Any], deck_name: Optional[str] = None) -> str:
+    """
+    CardCraft mode for a note in deck_name: "steps" (five requests) or "fused" (one request)
+    
+    cardcraft_deck_modes maps deck names to modes; a deck without an entry uses its
+    closest parent deck's entry, and cardcraft_mode applies when no deck matches.
+    """
+    deck_modes = config.get("cardcraft_deck_modes") or {}
+    if deck_name and deck_modes:
+        parts = deck_name.split("::")
+        for depth in range(len(parts), 0, -1):
+            mode = deck_modes.get("::".join(parts[:depth]))
+            if mode in CARDCRAFT_MODES:
+                return mode
+    mode = config.get("cardcraft_mode", "steps")
+    return mode if mode in CARDCRAFT_MODES else "steps"
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+CardCraft Word Stack Store
+Persistent lemma-keyed store of validated word stacks and their translations
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Add-on user_files is shared by every Anki profile on the machine
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "user_files")
+
+# Articles and infinitive marker that prefix forms in the word stack ("en hvisking", "å anta")
+_FORM_PREFIX = re.compile(r"^(?:en|ei|et|å)\s+", re.IGNORECASE)
+# Separators used inside word stack values ("hviske | hvisket | hvisket", "god < bedre < best")
+_FORM_SEPARATORS = re.compile(r"[|<>,;/]")
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[^\w]+$")
+
+# 1: a form may belong to several stacks (homographs, shared inflections like "bedre")
+_SCHEMA_VERSION = 1
+
+
+def normalize_lemma(word: str) -> str:
+    """Normalize a word for lookup: NFC, lowercase, single spaces, no edge punctuation"""
+    if not word:
+        return ""
+    text = unicodedata.normalize("NFC", word).strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return _EDGE_PUNCTUATION.sub("", text)
+
+
+def normalize_form(form: str) -> str:
+    """normalize_lemma for a form of a word stack, without its article ("en hvisking" -> "hvisking")"""
+    text = normalize_lemma(form)
+    return _EDGE_PUNCTUATION.sub("", _FORM_PREFIX.sub("", text)) or text
+
+
+def _stack_entries(analysis: Dict[str, Any]) -> Iterable[List[str]]:
+    """Normalized forms of each entry of a step 1 analysis, base form first"""
+    for value in analysis.values():
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if not isinstance(item, str) or item == "null":
+                continue
+            forms = [form for form in map(normalize_form, _FORM_SEPARATORS.split(item)) if form and form != "null"]
+            if forms:
+                yield forms
+
+
+def stack_forms(analysis: Dict[str, Any]) -> Iterable[str]:
+    """Yield every normalized word form contained in a step 1 analysis"""
+    for forms in _stack_entries(analysis):
+        yield from forms
+
+
+def analysis_lemma(word: str, analysis: Dict[str, Any]) -> str:
+    """The lemma a stack is stored under: the base form of the entry the typed word belongs to"""
+    typed, form = normalize_lemma(word), normalize_form(word)
+    entries = list(_stack_entries(analysis))
+    for forms in entries:
+        if forms[0] in (typed, form):
+            return forms[0]
+    for forms in entries:
+        if form in forms:
+            return forms[0]
+    return entries[0][0] if entries else typed
+
+
+def stack_hash(analysis: Dict[str, Any]) -> str:
+    """Identity of a word stack, used to find the lemma for a translation request"""
+    canonical = json.dumps(analysis, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class WordStackStore:
+    """Lemma -> step 1 JSON and per-language translations, shared across notes and profiles"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS stacks ("
+            " lemma TEXT PRIMARY KEY,"
+            " analysis TEXT NOT NULL,"
+            " stack_hash TEXT NOT NULL,"
+            " updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS stacks_hash ON stacks(stack_hash);"
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " lemma TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (lemma, language));"
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Rebuild the forms index, which used to keep only the first owner of each form"""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("DROP TABLE IF EXISTS forms")
+            self._conn.execute(
+                "CREATE TABLE forms ("
+                " form TEXT NOT NULL,"
+                " lemma TEXT NOT NULL,"
+                " PRIMARY KEY (form, lemma))"
+            )
+            for lemma, payload in self._conn.execute("SELECT lemma, analysis FROM stacks").fetchall():
+                self._index_forms(lemma, json.loads(payload))
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _index_forms(self, lemma: str, analysis: Dict[str, Any]) -> None:
+        forms = set(stack_forms(analysis))
+        forms.add(lemma)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO forms (form, lemma) VALUES (?, ?)",
+            [(form, lemma) for form in forms]
+        )
+
+    def lookup(self, word: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Return (lemma, analysis) for a word that is a stored lemma or an unambiguous form of one
+
+        A form of several stacks (a homograph like "leser", or "bedre" of both
+        "god" and "bra") is not answered from the store.
+        """
+        key = normalize_lemma(word)
+        if not key:
+            return None, None
+        form = normalize_form(word)
+        with self._lock:
+            row = self._conn.execute("SELECT lemma, analysis FROM stacks WHERE lemma = ?", (key,)).fetchone()
+            if row is None:
+                owners = self._conn.execute(
+                    "SELECT lemma FROM forms WHERE form = ? LIMIT 2", (form,)
+                ).fetchall()
+                if len(owners) == 1:
+                    row = self._conn.execute(
+                        "SELECT lemma, analysis FROM stacks WHERE lemma = ?", (owners[0][0],)
+                    ).fetchone()
+        if row is None:
+            return None, None
+        analysis = json.loads(row[1])
+        if row[0] != key and form not in set(stack_forms(analysis)):
+            return None, None
+        return row[0], analysis
+
+    def store_analysis(self, word: str, analysis: Dict[str, Any]) -> str:
+        """Store a validated step 1 analysis under its own lemma and index its forms"""
+        lemma = analysis_lemma(word, analysis)
+        payload = json.dumps(analysis, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO stacks (lemma, analysis, stack_hash, updated) VALUES (?, ?, ?, ?)",
+                    (lemma, payload, stack_hash(analysis), time.time())
+                )
+                self._conn.execute("DELETE FROM forms WHERE lemma = ?", (lemma,))
+                self._index_forms(lemma, analysis)
+                # The stack changed, so older translations no longer match it
+                self._conn.execute("DELETE FROM translations WHERE lemma = ?", (lemma,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return lemma
+
+    def _lemma_for_stack(self, analysis: Dict[str, Any]) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT lemma FROM stacks WHERE stack_hash = ? LIMIT 1", (stack_hash(analysis),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_translation(self, analysis: Dict[str, Any], language: str) -> Optional[Dict[str, Any]]:
+        """Return the stored translation of a known word stack into language"""
+        with self._lock:
+            lemma = self._lemma_for_stack(analysis)
+            if lemma is None:
+                return None
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE lemma = ? AND language = ?",
+                (lemma, language.strip().lower())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_translation(self, analysis: Dict[str, Any], language: str, translation: Dict[str, Any]) -> None:
+        """Store a translation for a known word stack (ignored for unknown stacks)"""
+        with self._lock:
+            lemma = self._lemma_for_stack(analysis)
+            if lemma is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (lemma, language, translation, updated) VALUES (?, ?, ?, ?)",
+                (lemma, language.strip().lower(), json.dumps(translation, ensure_ascii=False), time.time())
+            )
+
+
+# One store per database file, shared by all analyzers in the process
+_STORES: Dict[str, WordStackStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_wordstack_store(config: Dict[str, Any]) -> Optional[WordStackStore]:
+    """Return the shared word stack store configured in config.json, or None if disabled"""
+    if not config.get("wordstack_store_enabled", True):
+        return None
+
+    path = config.get("wordstack_store_path") or os.path.join(DEFAULT_STORE_DIR, "wordstack.sqlite3")
+    path = os.path.abspath(path)
+
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            try:
+                store = WordStackStore(path)
+            except (OSError, sqlite3.Error):
+                # Read-only add-on folder or broken database - always ask the API
+                return None
+            _STORES[path] = store
+        return store
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time to import the add-on package, as Anki does when a profile loads
+Each run is a fresh interpreter; reports the median import time and the heavy modules it loaded
+
+Anki itself is not measured: aqt (and PyQt6 when it is not installed) is replaced by
+a stand-in that accepts whatever the add-on touches at import (hooks, menus, Qt
+classes), since Anki has loaded those long before any add-on.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 9 --budget-ms 150 --addon-dir path/to/InferAnki
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "InferAnki")
+
+# Modules that must wait until a feature is first used
+DEFERRED_MODULES = [
+    "speechify",
+    "InferAnki.functions.tts_handler",
+    "InferAnki.functions.wordstack",
+    "InferAnki.functions.prompt_registry",
+    "InferAnki.functions.openai_client",
+    "InferAnki.functions.async_openai_client",
+    "InferAnki.functions.chatbot_ui",
+]
+
+# Runs in the child interpreter: argv[1] is the add-on folder
+_CHILD = r'''
+import importlib.util, json, os, sys, threading, time, types
+
+class HostType(type):
+    def __getattr__(cls, name):
+        return HostObject()
+
+class HostObject(metaclass=HostType):
+    """Any class, attribute or call of Anki or Qt the add-on uses while it is imported"""
+    def __init__(self, *args, **kwargs):
+        pass
+    def __getattr__(self, name):
+        return HostObject()
+    def __call__(self, *args, **kwargs):
+        return HostObject()
+
+def host_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__getattr__ = lambda attr: HostObject
+    module.__path__ = []
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+aqt = host_module("aqt", mw=HostObject(), gui_hooks=HostObject())
+for sub in ("editor", "utils", "qt", "operations", "operations.note"):
+    host_module("aqt." + sub)
+host_module("anki"); host_module("anki.utils")
+try:
+    import PyQt6.QtWidgets  # Part of Anki - already loaded when add-ons are
+except ImportError:
+    for name in ("PyQt6", "PyQt6.QtWidgets", "PyQt6.QtCore", "PyQt6.QtGui"):
+        host_module(name)
+
+addon_dir = os.path.abspath(sys.argv[1])
+entries_before = set(os.listdir(addon_dir))
+threads_before = threading.active_count()
+
+spec = importlib.util.spec_from_file_location(
+    "InferAnki", os.path.join(addon_dir, "__init__.py"), submodule_search_locations=[addon_dir]
+)
+package = importlib.util.module_from_spec(spec)
+sys.modules["InferAnki"] = package
+started = time.perf_counter()
+spec.loader.exec_module(package)
+elapsed = time.perf_counter() - started
+
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": sorted(name for name in sys.modules if name.startswith(("InferAnki", "speechify", "PyQt"))),
+    "threads_started": threading.active_count() - threads_before,
+    "created": sorted(set(os.listdir(addon_dir)) - entries_before),
+}))
+'''
+
+
+def measure_once(addon_dir):
+    """Import the add-on in a fresh interpreter and return the child's report"""
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, addon_dir],
+        capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(addon_dir=ADDON_DIR, runs=5):
+    """Median import time over runs, plus what the first run loaded and started"""
+    reports = [measure_once(addon_dir) for _ in range(runs)]
+    first = reports[0]
+    return {
+        "median_ms": statistics.median(report["seconds"] for report in reports) * 1000,
+        "max_ms": max(report["seconds"] for report in reports) * 1000,
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in first["modules"]],
+        "threads_started": first["threads_started"],
+        "created": first["created"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add-on import time benchmark")
+    parser.add_argument("--addon-dir", default=ADDON_DIR, help="Add-on folder to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Exit with status 1 above this median")
+    args = parser.parse_args(argv)
+
+    report = run(args.addon_dir, args.runs)
+    print(f"import median {report['median_ms']:.1f} ms, max {report['max_ms']:.1f} ms over {args.runs} runs")
+    print(f"deferred modules loaded at import: {', '.join(report['deferred_loaded']) or 'none'}")
+    print(f"threads started: {report['threads_started']}, files created: {', '.join(report['created']) or 'none'}")
+    if args.budget_ms is not None and report["median_ms"] > args.budget_ms:
+        print(f"over budget ({args.budget_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: TTS text normalizer against the old regex cascade
+Checks both give the same output for every field, then reports time per field
+
+Usage:
+    python benchmarks/bench_tts_normalizer.py
+    python benchmarks/bench_tts_normalizer.py --fields 20000 --repeat 5
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+from tts_normalizer_legacy import legacy_normalize
+
+
+TTS_HANDLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "InferAnki", "functions",
+                                "tts_handler.py")
+
+# Typical second fields as written by CardCraft and by hand in the editor
+FIELD_TEMPLATES = [
+    "en hvisking | å hviske | hvisket | hvisket<br><br>🔸 Å snakke svært lavt.<br><br>"
+    "Hun <b>hvisket</b> navnet hans... Barna <b>hvisket</b> sammen i mørket.",
+    "god &lt; bedre &lt; best<br>Maten var <i>god</i>.<br>Det er <b>bedre</b> å vente.",
+    "<div>å løpe - løp - har løpt</div><div>Han løper hver morgen.</div>",
+    "<ul><li>et arbeid</li><li>arbeidet</li><li>arbeider</li></ul>&nbsp;Hun har mye arbeid.",
+    "sterk &amp; klar&nbsp;&mdash; &quot;Han er sterk.&quot;<br />Hun var klar..",
+    "å vurdere | vurderte | har vurdert\nVi må vurdere saken.\n\nDe vurderte alt.",
+    "<span style=\"color: rgb(0, 0, 0);\">å glede seg</span> <br>Jeg gleder meg til ferien!",
+]
+
+
+def load_normalizer():
+    spec = importlib.util.spec_from_file_location("tts_handler", TTS_HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.normalize_tts_text
+
+
+def make_fields(count, seed):
+    rng = random.Random(seed)
+    return [f"{rng.choice(FIELD_TEMPLATES)} ({i})" for i in range(count)]
+
+
+def best_time(func, fields, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for field in fields:
+            func(field)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TTS normalizer microbenchmark")
+    parser.add_argument("--fields", type=int, default=10000, help="fields per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation (best is reported)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    normalize = load_normalizer()
+    fields = make_fields(args.fields, args.seed)
+    mismatches = sum(1 for field in fields if normalize(field) != legacy_normalize(field))
+
+    legacy = best_time(legacy_normalize, fields, args.repeat)
+    current = best_time(normalize, fields, args.repeat)
+    print(f"{'implementation':<16} {'total s':>8} {'us/field':>9}")
+    print(f"{'regex cascade':<16} {legacy:>8.3f} {legacy / len(fields) * 1e6:>9.1f}")
+    print(f"{'normalizer':<16} {current:>8.3f} {current / len(fields) * 1e6:>9.1f}")
+    print(f"speedup x{legacy / current:.2f}, output mismatches: {mismatches}")
+    return {"legacy_s": legacy, "normalizer_s": current, "mismatches": mismatches}
+
+
+if __name__ == "__main__":
+    main()
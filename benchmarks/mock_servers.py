@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the OpenAI and Speechify APIs used by the benchmarks
+Serves canned responses built from prompts.json with configurable latency and failures
+"""
+
+import base64
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PROMPTS_PATH = os.path.join(os.path.dirname(__file__), "..", "InferAnki", "prompts.json")
+
+# Answers for prompts that have no examples in prompts.json
+FALLBACK_ANSWERS = {
+    "norwegian_description": "🔸 Å si noe med svært lav stemme, nesten uten lyd.",
+    "chatbot": "**Hviske** betyr å snakke veldig lavt. Eksempel: *Hun hvisket navnet hans.*",
+}
+
+# One silent MPEG-1 Layer III frame: 128 kbit/s, 44.1 kHz, no padding (417 bytes)
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+
+class MockSettings:
+    """Latency and failure behaviour of the mock servers"""
+
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, rate_limit_rate=0.0,
+                 tokens_per_second=200.0, chars_per_frame=5, speech_chars_per_second=0.0,
+                 generation_tokens_per_second=0.0, seed=None):
+        self.latency = latency                  # seconds before the first byte
+        self.jitter = jitter                    # +/- uniform jitter added to latency
+        self.error_rate = error_rate            # fraction of requests answered with 500
+        self.rate_limit_rate = rate_limit_rate  # fraction answered with 429 + Retry-After
+        self.tokens_per_second = tokens_per_second  # streaming speed
+        self.generation_tokens_per_second = generation_tokens_per_second  # non-streaming answers, 0 = instant
+        self.chars_per_frame = chars_per_frame  # audio length per character of TTS input
+        self.speech_chars_per_second = speech_chars_per_second  # synthesis speed, 0 = instant
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def failure(self):
+        """Return 500, 429 or None for this request"""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 429
+        return None
+
+
+class CannedResponses:
+    """Pick a realistic answer for a chat request by recognising its prompts.json system message"""
+
+    def __init__(self, prompts=None):
+        if prompts is None:
+            with open(PROMPTS_PATH, "r", encoding="utf-8") as f:
+                prompts = json.load(f)
+        self.answers = {}
+        self.prefixes = []
+        for key, prompt in prompts.items():
+            system_message = prompt.get("system_message", "")
+            if system_message:
+                # Placeholders such as {target_language} are filled in at request time
+                self.prefixes.append((system_message.split("{", 1)[0][:200], key))
+            answer = self._answer_from_examples(prompt.get("examples"))
+            if answer is None:
+                answer = FALLBACK_ANSWERS.get(key)
+            if answer is not None:
+                self.answers[key] = answer
+
+        # A translation has the word stack structure - reuse the first word stack example
+        if "english_word_stack" not in self.answers and "norwegian_word_stack" in self.answers:
+            self.answers["english_word_stack"] = self.answers["norwegian_word_stack"]
+
+    @staticmethod
+    def _answer_from_examples(examples):
+        if isinstance(examples, dict) and examples:
+            return json.dumps(next(iter(examples.values())), ensure_ascii=False)
+        if isinstance(examples, list):
+            for example in examples:
+                if isinstance(example, dict) and "output" in example:
+                    output = example["output"]
+                    return output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+        return None
+
+    def prompt_key(self, messages):
+        system_message = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        for prefix, key in self.prefixes:
+            if prefix and system_message.startswith(prefix):
+                return key
+        return None
+
+    def answer(self, messages):
+        return self.answers.get(self.prompt_key(messages), "OK")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+        server.count(self.path)
+
+        time.sleep(server.settings.delay())
+        failure = server.settings.failure()
+        if failure == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "code": "rate_limit_exceeded"}},
+                            {"Retry-After": "0.05"})
+            return
+        if failure == 500:
+            self._send_json(500, {"error": {"message": "Internal server error (mock)", "code": None}})
+            return
+
+        if self.path.endswith("/chat/completions"):
+            self._chat_completion(request)
+        elif self.path.endswith("/audio/speech"):
+            self._speech(request)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+    def _chat_completion(self, request):
+        messages = request.get("messages", [])
+        answer = self.server.canned.answer(messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = max(1, len(answer) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        model = request.get("model", "gpt-4.1")
+        self.server.count_tokens(usage["total_tokens"])
+
+        if not request.get("stream"):
+            if self.server.settings.generation_tokens_per_second:
+                time.sleep(completion_tokens / self.server.settings.generation_tokens_per_second)
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pause = 1.0 / self.server.settings.tokens_per_second if self.server.settings.tokens_per_second else 0.0
+        for start in range(0, len(answer), 4):
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": answer[start:start + 4]}}]}
+            self._send_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            if pause:
+                time.sleep(pause)
+        final = {"object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage}
+        self._send_chunk(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self._send_chunk(b"")
+
+    def _speech(self, request):
+        text = request.get("input", "")
+        if self.server.settings.speech_chars_per_second:
+            time.sleep(len(text) / self.server.settings.speech_chars_per_second)
+        frames = max(1, len(text) // max(1, self.server.settings.chars_per_frame))
+        audio = MP3_FRAME * frames
+        self._send_json(200, {
+            "audio_data": base64.b64encode(audio).decode("ascii"),
+            "audio_format": request.get("audio_format", "mp3"),
+            "billable_characters_count": len(text),
+            "speech_marks": {},
+        })
+
+
+class MockServer(ThreadingHTTPServer):
+    """Mock OpenAI (/v1/chat/completions) and Speechify (/v1/audio/speech) server on localhost"""
+
+    daemon_threads = True
+
+    def __init__(self, settings=None, canned=None, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.settings = settings or MockSettings()
+        self.canned = canned or CannedResponses()
+        self.requests = {}
+        self.tokens = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    @property
+    def speechify_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count(self, path):
+        with self._count_lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def total_requests(self):
+        with self._count_lock:
+            return sum(self.requests.values())
+
+    def count_tokens(self, tokens):
+        with self._count_lock:
+            self.tokens += tokens
+
+    def total_tokens(self):
+        with self._count_lock:
+            return self.tokens
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = MockServer(port=8765).start()
+    print(f"Mock OpenAI:    {server.base_url}")
+    print(f"Mock Speechify: {server.speechify_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
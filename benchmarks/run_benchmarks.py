@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the CardCraft pipeline, TTS and bulk paths
+Runs the add-on code against the local mock servers and reports latency, throughput and memory
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --items 50 --latency 0.4 --error-rate 0.05 --json results.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_servers import MockServer, MockSettings
+
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "InferAnki", "functions")
+
+WORDS = [
+    "hviske", "anta", "god", "løpe", "forklare", "glede", "vurdere", "bestemme", "ro", "lys",
+    "tenke", "skrive", "arbeid", "sterk", "forsøke", "våkne", "erfaring", "klar", "bygge", "lære",
+]
+
+TTS_TEXT = (
+    "en hvisking | å hviske | hvisket | hvisket<br><br>"
+    "🔸 Å snakke svært lavt.<br><br>"
+    "Hun <b>hvisket</b> navnet hans... Barna <b>hvisket</b> sammen i mørket."
+)
+
+# About 6000 characters of example sentences, voiced in chunks
+LONG_TTS_SENTENCES = 60
+
+
+def load_functions():
+    """Import the add-on modules without functions/__init__.py (which needs Qt)"""
+    package = sys.modules.get("inferanki_functions")
+    if package is None:
+        package = types.ModuleType("inferanki_functions")
+        package.__path__ = [FUNCTIONS_DIR]
+        sys.modules["inferanki_functions"] = package
+    return types.SimpleNamespace(
+        wordstack=importlib.import_module("inferanki_functions.wordstack"),
+        pipeline=importlib.import_module("inferanki_functions.pipeline"),
+        tts=importlib.import_module("inferanki_functions.tts_handler"),
+        bulk_tts=importlib.import_module("inferanki_functions.bulk_tts"),
+        trace_log=importlib.import_module("inferanki_functions.trace_log"),
+    )
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+
+def benchmark_config(server, work_dir, concurrency):
+    """config.json equivalent pointing every client at the mock server"""
+    return {
+        "debug_mode": False,
+        "user_lang": "English",
+        "field_1_response_lang": "English",
+        "openai_api_key": "benchmark-key",
+        "openai_base_url": server.base_url,
+        "openai_pool_size": concurrency * 5,
+        "openai_max_retries": 4,
+        "openai_retry_base_delay": 0.05,
+        "openai_retry_max_delay": 0.5,
+        "openai_requests_per_minute": 0,
+        "openai_tokens_per_minute": 0,
+        # Measure the network path - no response cache or word stack store hits
+        "openai_cache_enabled": False,
+        "wordstack_store_enabled": False,
+        "trace_log_path": os.path.join(work_dir, "logs", "cardcraft-trace.jsonl"),
+        "cardcraft_max_parallel_steps": 4,
+        "openai_async_max_in_flight": concurrency * 5,
+        "speechify_api_key": "benchmark-key",
+        "speechify_base_url": server.speechify_url,
+        "speechify_requests_per_minute": 0,
+        "tts_media_dir": os.path.join(work_dir, "media"),
+        "tts_chunk_cache_dir": os.path.join(work_dir, "tts_chunks"),
+    }
+
+
+def cardcraft_steps(modules, analyzer, word):
+    """The CardCraft step graph used by the editor and bulk paths"""
+    PipelineStep = modules.pipeline.PipelineStep
+    return [
+        PipelineStep("analysis", lambda: analyzer.analyze_word(word)),
+        PipelineStep("translation", analyzer.translate_to_language, ["analysis"]),
+        PipelineStep(
+            "description",
+            lambda analysis: analyzer.get_description(json.dumps(analysis, ensure_ascii=False)),
+            ["analysis"]
+        ),
+        PipelineStep("examples_simple", analyzer.get_examples_simple, ["analysis"]),
+        PipelineStep("sentences", analyzer.get_examples_sentences, ["analysis"]),
+    ]
+
+
+def timed(func, item):
+    """Run func(item) and return (seconds, succeeded)"""
+    started = time.perf_counter()
+    try:
+        ok = func(item) is not None
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_items(func, items, concurrency=1):
+    if concurrency <= 1:
+        return [timed(func, item) for item in items]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda item: timed(func, item), items))
+
+
+def make_scenarios(modules, config, work_dir, items, concurrency):
+    """name -> (description, zero-argument runner returning [(seconds, ok), ...])"""
+    words = [WORDS[i % len(WORDS)] for i in range(items)]
+    analyzer = modules.wordstack.NorwegianWordAnalyzer(config)
+
+    def cardcraft(word):
+        results = modules.pipeline.run_pipeline(
+            cardcraft_steps(modules, analyzer, word), max_workers=config["cardcraft_max_parallel_steps"]
+        )
+        return results if results.get("analysis") else None
+
+    scenarios = {
+        "analyzer": ("Step 1 word stack per word", lambda: run_items(analyzer.analyze_word, words)),
+        "cardcraft": ("Full 5-step CardCraft per note", lambda: run_items(cardcraft, words)),
+        "fused": ("Fused single-request CardCraft per note", lambda: run_items(analyzer.craft_fused, words)),
+        "bulk": (
+            f"Bulk CardCraft, {concurrency} notes in flight",
+            lambda: run_items(cardcraft, words, concurrency)
+        ),
+    }
+
+    if modules.tts.speechify_available():
+        processor = modules.tts.SpeechifyTTSProcessor(config)
+        voicer = modules.bulk_tts.TTSVoicer(processor, config["speechify_requests_per_minute"])
+        texts = [f"{TTS_TEXT} ({i})" for i in range(items)]
+        scenarios["tts"] = ("Speechify audio per note", lambda: run_items(processor.create_audio_file, texts))
+        scenarios["bulk_tts"] = (
+            f"Bulk TTS, {concurrency} notes in flight",
+            lambda: run_items(voicer.voice, texts, concurrency)
+        )
+        # Every sentence differs per item, so no chunk comes from the chunk cache
+        long_texts = [
+            "<br>".join(f"Setning {n} i tekst {i}: Barna {WORDS[n % len(WORDS)]} sammen i mørket, "
+                        f"og hun {WORDS[(n + i) % len(WORDS)]} navnet hans igjen." for n in range(LONG_TTS_SENTENCES))
+            for i in range(items)
+        ]
+        scenarios["long_tts"] = (
+            f"Speechify audio for ~{len(long_texts[0]) // 1000}k characters per note, chunked",
+            lambda: run_items(processor.create_audio_file, long_texts)
+        )
+    return scenarios
+
+
+def measure(server, runner):
+    """Run a scenario and collect latency percentiles, throughput and memory"""
+    requests_before = server.total_requests()
+    tokens_before = server.total_tokens()
+    tracemalloc.start()
+    started = time.perf_counter()
+    samples = runner()
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [seconds for seconds, _ in samples]
+    tokens = server.total_tokens() - tokens_before
+    return {
+        "items": len(samples),
+        "failed": sum(1 for _, ok in samples if not ok),
+        "wall_s": wall,
+        "items_per_s": len(samples) / wall if wall else 0.0,
+        "requests": server.total_requests() - requests_before,
+        "requests_per_s": (server.total_requests() - requests_before) / wall if wall else 0.0,
+        "tokens": tokens,
+        "tokens_per_item": tokens / len(samples) if samples else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_mem_mib": peak / (1024 * 1024),
+    }
+
+
+def print_report(results, skipped):
+    header = f"{'scenario':<10} {'items':>5} {'fail':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'items/s':>8} {'req/s':>7} {'tok/item':>8} {'mem MiB':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<10} {r['items']:>5} {r['failed']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['items_per_s']:>8.2f} {r['requests_per_s']:>7.1f} {r['tokens_per_item']:>8.0f} {r['peak_mem_mib']:>8.2f}")
+    for name, reason in skipped.items():
+        print(f"{name:<10} skipped: {reason}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="InferAnki offline benchmarks")
+    parser.add_argument("--scenarios", default="analyzer,cardcraft,fused,bulk,tts,bulk_tts,long_tts",
+                        help="comma-separated scenario names")
+    parser.add_argument("--items", type=int, default=20, help="notes/words per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="notes in flight for bulk scenarios")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of HTTP 429 responses")
+    parser.add_argument("--generation-tps", type=float, default=80.0,
+                        help="mock completion speed in tokens per second for non-streamed answers (0 = instant)")
+    parser.add_argument("--speech-cps", type=float, default=2000.0,
+                        help="mock Speechify synthesis speed in characters per second (0 = instant)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for jitter and failures")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    settings = MockSettings(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate,
+                            speech_chars_per_second=args.speech_cps,
+                            generation_tokens_per_second=args.generation_tps, seed=args.seed)
+    server = MockServer(settings).start()
+    modules = load_functions()
+
+    results, skipped = {}, {}
+    with tempfile.TemporaryDirectory(prefix="inferanki-bench-") as work_dir:
+        config = benchmark_config(server, work_dir, args.concurrency)
+        scenarios = make_scenarios(modules, config, work_dir, args.items, args.concurrency)
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in scenarios:
+                skipped[name] = "speechify SDK not installed" if "tts" in name else "unknown scenario"
+                continue
+            description, runner = scenarios[name]
+            print(f"Running {name}: {description}...", file=sys.stderr)
+            results[name] = measure(server, runner)
+        # The trace writer must be done with work_dir before it is removed
+        modules.trace_log.get_trace_logger(config).close()
+    server.stop()
+
+    print_report(results, skipped)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results, "skipped": skipped}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Reference copy of the regex cascade process_text_for_tts used up to v0.6
+Kept for the normalizer equivalence tests and bench_tts_normalizer.py - not used by the add-on
+"""
+
+import re
+
+
+def legacy_normalize(text):
+    """Clean text for TTS exactly as the old cascade did (without the prosody wrapper)"""
+    input_text = text.strip()
+
+    # FIRST: Remove 🔸 bullet content
+    input_text = re.sub(r'(?:<[^>]*>)?🔸.*?<br\s*/?>\s*<br\s*/?>', '', input_text, flags=re.IGNORECASE | re.DOTALL)
+    input_text = re.sub(r'(?:<[^>]*>)?🔸.*$', '', input_text, flags=re.IGNORECASE | re.DOTALL)
+
+    # SECOND: Convert HTML entities BEFORE tag removal (but keep &lt; and &gt; for now)
+    html_entities = {
+        '&nbsp;': ' ',
+        '&amp;': '&',
+        '&quot;': '"',
+        '&apos;': "'",
+        '&#39;': "'",
+        '&mdash;': '—',
+        '&ndash;': '–',
+        '&hellip;': '...',
+        '&rsquo;': "'",
+        '&lsquo;': "'",
+        '&rdquo;': '"',
+        '&ldquo;': '"'
+    }
+    for entity, replacement in html_entities.items():
+        input_text = input_text.replace(entity, replacement)
+
+    # THIRD: Handle HTML tags with content preservation
+    input_text = re.sub(r'<br\s*/?>\s*<br\s*/?>', ' ... ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'<br\s*/?>', ' .. ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</li>\s*<li[^>]*>', ' .. ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</?li[^>]*>', ' ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</?ul[^>]*>', ' ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</?ol[^>]*>', ' ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</div>\s*<div[^>]*>', ' .. ', input_text, flags=re.IGNORECASE)
+    input_text = re.sub(r'</?div[^>]*>', ' ', input_text, flags=re.IGNORECASE)
+
+    # FOURTH: Strip remaining HTML tags
+    input_text = re.sub(r'<[^>]+>', '', input_text)
+
+    # FIFTH: Now convert remaining HTML entities that could interfere with text
+    input_text = input_text.replace('&lt;', '<')
+    input_text = input_text.replace('&gt;', '>')
+
+    # SIXTH: Norwegian text processing
+    input_text = re.sub(r'\s*\|\s*', ', ', input_text)
+    input_text = re.sub(r'\s+-\s+', ', ', input_text)
+    input_text = re.sub(r'\s*<\s*', ', ', input_text)
+    input_text = re.sub(r'\s*>\s*', ', ', input_text)
+    input_text = re.sub(r'\r?\n+', ' ... ', input_text)
+
+    input_text = re.sub(r'\.{4,}', '⟨LONG_PAUSE⟩', input_text)
+    input_text = re.sub(r'\.{3}', '⟨LONG_PAUSE⟩', input_text)
+    input_text = re.sub(r'\.{2}', '⟨MED_PAUSE⟩', input_text)
+    input_text = re.sub(r'⟨LONG_PAUSE⟩', ' ... ', input_text)
+    input_text = re.sub(r'⟨MED_PAUSE⟩', ' .. ', input_text)
+
+    # SEVENTH: Clean up spacing and whitespace
+    input_text = re.sub(r'\s+', ' ', input_text)
+    return input_text.strip()
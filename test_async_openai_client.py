@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Test suite for the asyncio OpenAI client and its blocking facade
+Runs without Anki dependencies against a local HTTP server
+"""
+
+import unittest
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests_support import load_functions_module
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion with its prompt, after a short delay"""
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    requests_seen = []
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = json.loads(self.rfile.read(length))
+        prompt = data["messages"][-1]["content"]
+        cls = CompletionHandler
+        with cls.lock:
+            cls.requests_seen.append(data)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(5 if prompt == "slow" else 0.2)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+        body = json.dumps({
+            "choices": [{"message": {"content": f"svar: {prompt}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+        }).encode("utf-8")
+        if prompt == "garbled":
+            body = b"<html>Bad gateway</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if prompt in ("chunked", "trickle"):
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            size = 7 if prompt == "chunked" else len(body) // 4 + 1
+            for start in range(0, len(body), size):
+                part = body[start:start + size]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+                if prompt == "trickle":
+                    self.wfile.flush()
+                    time.sleep(0.3)  # Each piece in time, the whole answer not
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CompletionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Room for every connection of a fan-out at once
+
+    def handle_error(self, request, client_address):
+        pass  # Cancelled requests leave the handler writing to a closed connection
+
+
+class AsyncClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.module = load_functions_module("async_openai_client")
+        CompletionHandler.requests_seen = []
+        CompletionHandler.max_in_flight = 0
+        self.server = CompletionServer(("127.0.0.1", 0), CompletionHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.config = {
+            "openai_api_key": "test",
+            "openai_base_url": f"http://127.0.0.1:{self.server.server_address[1]}/v1",
+            "openai_cache_enabled": False,
+            "metrics_enabled": False,
+            "adaptive_max_tokens": False,
+            "openai_max_retries": 0,
+            "openai_requests_per_minute": 0,
+            "openai_tokens_per_minute": 0,
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestAsyncOpenAIClient(AsyncClientTestCase):
+    """Requests run concurrently on one thread over reused connections"""
+
+    def test_fan_out_on_one_thread(self):
+        client = self.module.AsyncOpenAIClient(self.config)
+        threads = []
+
+        async def run_round(offset):
+            async def one(index):
+                threads.append(threading.get_ident())
+                return await client.simple_request(f"ord {index}")
+            return await asyncio.gather(*(one(offset + index) for index in range(60)))
+
+        async def main():
+            first = await run_round(0)
+            second = await run_round(60)
+            await client.close()
+            return first + second
+
+        started = time.monotonic()
+        answers = asyncio.run(main())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(answers, [f"svar: ord {index}" for index in range(120)])
+        self.assertEqual(set(threads), {threading.get_ident()})
+        self.assertGreaterEqual(CompletionHandler.max_in_flight, 50)
+        self.assertLess(elapsed, 5.0)  # 120 requests of 0.2 s one after another would take 24 s
+        self.assertEqual(client.pool.opened, 60)  # The second round reused every connection
+
+    def test_request_data_matches_blocking_client(self):
+        client = self.module.AsyncOpenAIClient(self.config)
+        request_options = load_functions_module("openai_client").RequestOptions(
+            model="gpt-5-chat-latest", temperature=0, max_tokens=300, response_format={"type": "json_object"}
+        )
+        examples = [{"user": "hund", "assistant": "{}"}]
+
+        async def main():
+            answer = await client.simple_request("katt", "System", examples, options=request_options)
+            await client.close()
+            return answer
+
+        self.assertEqual(asyncio.run(main()), "svar: katt")
+        blocking = self.module.OpenAIClient(self.config)
+        expected = blocking._prepare_request_data(
+            blocking._build_messages("katt", "System", examples), request_options
+        )
+        self.assertEqual(CompletionHandler.requests_seen, [expected])
+
+    def test_cache_is_shared_and_read_off_the_loop(self):
+        """Cached answers follow OpenAIClient's rules; the SQLite calls run in worker threads"""
+        cache_module = load_functions_module("response_cache")
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        client = self.module.AsyncOpenAIClient(self.config)
+        client.base.cache = cache_module.ResponseCache(os.path.join(temp_dir.name, "cache.sqlite3"))
+        cache_threads = []
+        get = client.base.cache.get
+
+        def recording_get(key):
+            cache_threads.append(threading.get_ident())
+            return get(key)
+
+        client.base.cache.get = recording_get
+
+        async def main():
+            first = await client.simple_request("katt", cache=True)
+            second = await client.simple_request("katt", cache=True)
+            await client.close()
+            return first, second
+
+        self.assertEqual(asyncio.run(main()), ("svar: katt", "svar: katt"))
+        self.assertEqual(len(CompletionHandler.requests_seen), 1)
+        self.assertEqual(len(cache_threads), 2)
+        self.assertNotIn(threading.get_ident(), cache_threads)
+
+    def test_invalid_body_returns_reserved_tokens(self):
+        client = self.module.AsyncOpenAIClient(self.config)
+        settled = []
+        client.base.rate_limiter = load_functions_module("rate_limit").RateLimiter(0, 0)
+        client.base.rate_limiter.settle = lambda estimated, used: settled.append(used)
+
+        async def main():
+            answer = await client.simple_request("garbled")
+            await client.close()
+            return answer
+
+        self.assertIsNone(asyncio.run(main()))
+        self.assertEqual(settled, [0])
+
+    def test_chunked_response(self):
+        client = self.module.AsyncOpenAIClient(self.config)
+
+        async def main():
+            answer, usage = await client.simple_request_with_usage("chunked")
+            again = await client.simple_request("etter")
+            await client.close()
+            return answer, usage, again
+
+        answer, usage, again = asyncio.run(main())
+        self.assertEqual(answer, "svar: chunked")
+        self.assertEqual(usage["total_tokens"], 8)
+        self.assertEqual(again, "svar: etter")
+        self.assertEqual(client.pool.opened, 1)
+
+    def test_timeout_applies_per_read(self):
+        """A slow answer that keeps arriving is read to the end, like on the blocking client"""
+        self.config["openai_request_timeout"] = 0.5
+        client = self.module.AsyncOpenAIClient(self.config)
+
+        async def main():
+            answer = await client.simple_request("trickle")
+            await client.close()
+            return answer
+
+        self.assertEqual(asyncio.run(main()), "svar: trickle")
+
+    def test_stalled_response_is_not_sent_again(self):
+        """A request that was sent and then timed out is not retried - it may already be billed"""
+        self.config.update(openai_request_timeout=0.5, openai_max_retries=3)
+        client = self.module.AsyncOpenAIClient(self.config)
+
+        async def main():
+            result = await client._make_request("chat/completions", {"messages": [{"content": "slow"}]})
+            await client.close()
+            return result
+
+        result = asyncio.run(main())
+        self.assertFalse(result["success"])
+        self.assertEqual(len(CompletionHandler.requests_seen), 1)
+
+    def test_cancelled_request_closes_its_connection(self):
+        client = self.module.AsyncOpenAIClient(self.config)
+
+        async def main():
+            task = asyncio.create_task(client.simple_request("slow"))
+            while not CompletionHandler.requests_seen:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(client.pool._idle, [])
+            answer = await client.simple_request("neste")
+            await client.close()
+            return answer
+
+        started = time.monotonic()
+        self.assertEqual(asyncio.run(main()), "svar: neste")
+        self.assertLess(time.monotonic() - started, 4.0)
+        self.assertEqual(client.pool.opened, 2)
+
+
+class TestBlockingOpenAIClient(AsyncClientTestCase):
+    """The facade serves existing blocking callers from one event loop"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.module.BlockingOpenAIClient(self.config)
+
+    def tearDown(self):
+        self.client.close()
+        super().tearDown()
+
+    def test_simple_request_keeps_callers_step(self):
+        metrics = load_functions_module("metrics")
+        self.client.client.base.metrics = metrics.MetricsRegistry()
+        with metrics.request_step("STEP1_NORWEGIAN_ANALYSIS"):
+            self.assertEqual(self.client.simple_request("hund"), "svar: hund")
+        self.assertIn("STEP1_NORWEGIAN_ANALYSIS", self.client.client.base.metrics.snapshot())
+
+    def test_map_requests_runs_concurrently(self):
+        started = time.monotonic()
+        answers = self.client.map_requests([{"prompt": f"ord {index}"} for index in range(50)])
+        self.assertEqual(answers, [f"svar: ord {index}" for index in range(50)])
+        self.assertLess(time.monotonic() - started, 3.0)
+        self.assertGreaterEqual(CompletionHandler.max_in_flight, 40)
+
+    def test_many_threads_share_the_loop(self):
+        results = {}
+
+        def worker(index):
+            results[index] = self.client.simple_request(f"tråd {index}")
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {index: f"svar: tråd {index}" for index in range(20)})
+        self.assertLessEqual(self.client.client.pool.opened, 20)
+
+    def test_step_flows_share_the_loop(self):
+        """Step flows run their code in worker threads while their requests wait on the loop"""
+        metrics = load_functions_module("metrics")
+        self.client.client.base.metrics = metrics.MetricsRegistry()
+        flow_threads = set()
+
+        def flow(word):
+            flow_threads.add(threading.get_ident())
+            first = yield word, "System", None, None
+            second = yield f"{first} igjen", "System", None, None
+            return second
+
+        def run(word):
+            with metrics.request_step("STEP1_NORWEGIAN_ANALYSIS"):
+                return self.client.submit(self.client.client.run_step_flow, flow(word))
+
+        started = time.monotonic()
+        futures = [run(f"ord {index}") for index in range(40)]
+        answers = [future.result() for future in futures]
+        self.assertEqual(answers, [f"svar: svar: ord {index} igjen" for index in range(40)])
+        self.assertLess(time.monotonic() - started, 4.0)
+        self.assertGreaterEqual(CompletionHandler.max_in_flight, 30)
+        self.assertNotIn(self.client._thread.ident, flow_threads)
+        self.assertIn("STEP1_NORWEGIAN_ANALYSIS", self.client.client.base.metrics.snapshot())
+
+    def test_future_cancel(self):
+        future = self.client.submit(self.client.client.simple_request, "slow")
+        while not CompletionHandler.requests_seen:
+            time.sleep(0.01)
+        self.assertTrue(future.cancel())
+        self.assertEqual(self.client.simple_request("neste"), "svar: neste")
+
+
+if __name__ == '__main__':
+    unittest.main()
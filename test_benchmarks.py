@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the offline benchmark harness and its mock servers
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import sys
+import json
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(__file__), 'benchmarks')
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+import mock_servers  # noqa: E402
+import run_benchmarks  # noqa: E402
+
+
+class TestMockServers(unittest.TestCase):
+    """Canned answers come from prompts.json"""
+
+    def test_canned_answers_match_prompts(self):
+        canned = mock_servers.CannedResponses()
+        with open(mock_servers.PROMPTS_PATH, encoding='utf-8') as f:
+            prompts = json.load(f)
+
+        analysis = canned.answer([{"role": "system", "content": prompts["norwegian_word_stack"]["system_message"]}])
+        self.assertIn("verb", json.loads(analysis))
+
+        translator = prompts["english_word_stack"]["system_message"].format(target_language="English")
+        self.assertEqual(canned.prompt_key([{"role": "system", "content": translator}]), "english_word_stack")
+        self.assertEqual(canned.answer([{"role": "system", "content": "unknown"}]), "OK")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(run_benchmarks.percentile(values, 50), 50)
+        self.assertEqual(run_benchmarks.percentile(values, 99), 99)
+        self.assertEqual(run_benchmarks.percentile([], 95), 0.0)
+
+
+class TestBenchmarkRun(unittest.TestCase):
+    """The pipeline scenarios run end to end against the mock server"""
+
+    def test_cardcraft_scenarios(self):
+        results = run_benchmarks.main([
+            "--scenarios", "analyzer,bulk,fused", "--items", "3", "--latency", "0", "--jitter", "0",
+            "--generation-tps", "0",
+        ])
+        self.assertEqual(results["analyzer"]["failed"], 0)
+        self.assertEqual(results["bulk"]["failed"], 0)
+        # Step 1 plus four dependent steps per note
+        self.assertEqual(results["bulk"]["requests"], 15)
+        # One request per note, with fewer prompt tokens than the five steps
+        self.assertEqual(results["fused"]["failed"], 0)
+        self.assertEqual(results["fused"]["requests"], 3)
+        self.assertLess(results["fused"]["tokens_per_item"], results["bulk"]["tokens_per_item"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test suite for bulk TTS generation
+Runs without Anki or Speechify: the collection and the processor are fakes
+"""
+
+import unittest
+import os
+import types
+import tempfile
+import threading
+
+from tests_support import load_functions_module
+
+
+class FakeNote:
+    def __init__(self, note_id, fields):
+        self.id = note_id
+        self._names = list(fields)
+        self.fields = list(fields.values())
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __getitem__(self, name):
+        return self.fields[self._names.index(name)]
+
+    def __setitem__(self, name, value):
+        self.fields[self._names.index(name)] = value
+
+
+class FakeCollection:
+    def __init__(self, notes, media_dir):
+        self.notes = {note.id: note for note in notes}
+        self.media = types.SimpleNamespace(addFile=self._add_file)
+        self.media_dir = media_dir
+        self.update_calls = []
+
+    def get_note(self, note_id):
+        return self.notes[note_id]
+
+    def update_notes(self, notes):
+        self.update_calls.append([note.id for note in notes])
+
+    def _add_file(self, path):
+        name = os.path.basename(path)
+        os.replace(path, os.path.join(self.media_dir, name))
+        return name
+
+
+class FakeProcessor:
+    """The parts of SpeechifyTTSProcessor that bulk TTS uses"""
+
+    field_index = 1
+    max_chars = 40000
+    base_url = "http://speechify.test"
+
+    def __init__(self, temp_dir, fail_on=()):
+        self.temp_dir = temp_dir
+        self.fail_on = set(fail_on)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def create_audio_file(self, text, raise_errors=False, before_request=None):
+        if text in self.fail_on:
+            raise RuntimeError("Speechify error")
+        before_request()
+        with self.lock:
+            self.requests += 1
+        path = os.path.join(self.temp_dir, f"{abs(hash(text))}.mp3")
+        with open(path, "wb") as f:
+            f.write(b"audio")
+        return path
+
+    def store_audio(self, audio_path, col=None):
+        return col.media.addFile(audio_path)
+
+    def discard_audio_file(self, audio_path):
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+
+
+class TestBulkTTS(unittest.TestCase):
+    """Test cases for plan_notes and voice_notes"""
+
+    def setUp(self):
+        self.module = load_functions_module("bulk_tts")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.media_dir = os.path.join(self.temp_dir.name, "media")
+        os.makedirs(self.media_dir)
+        self.processor = FakeProcessor(self.temp_dir.name, fail_on={"feil"})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_notes(self):
+        return [
+            FakeNote(1, {"Front": "a", "Norsk": "hviske", "Audio": ""}),
+            FakeNote(2, {"Front": "b", "Norsk": "løpe", "Audio": "[sound:old.mp3]"}),
+            FakeNote(3, {"Front": "c", "Norsk": "", "Audio": ""}),
+            FakeNote(4, {"Front": "d", "Norsk": "god"}),
+            FakeNote(5, {"Front": "e", "Norsk": "feil", "Audio": ""}),
+            FakeNote(6, {"Front": "f", "Norsk": "lys", "Audio": ""}),
+            FakeNote(7, {"Front": "g", "Norsk": "ro", "Audio": ""}),
+        ]
+
+    def test_plan_skips_notes_with_audio_or_without_text(self):
+        items, skipped = self.module.plan_notes(self.processor, self.make_notes())
+        self.assertEqual([note.id for note, _ in items], [1, 5, 6, 7])
+        self.assertEqual(skipped, [2, 3, 4])
+
+        items, _ = self.module.plan_notes(self.processor, self.make_notes(), skip_existing=False)
+        self.assertIn(2, [note.id for note, _ in items])
+
+    def test_voice_notes_writes_audio_in_batches(self):
+        col = FakeCollection(self.make_notes(), self.media_dir)
+        progress = []
+        report = self.module.voice_notes(
+            col, [1, 2, 3, 4, 5, 6, 7, 99], self.processor, max_workers=3, batch_size=2,
+            requests_per_minute=0, on_progress=lambda done, total, elapsed: progress.append((done, total))
+        )
+
+        self.assertEqual(sorted(report["voiced"]), [1, 6, 7])
+        self.assertEqual(sorted(report["skipped"]), [2, 3, 4, 99])
+        self.assertEqual(list(report["failed"]), [5])
+        self.assertEqual(progress[-1], (4, 4))
+        # Three voiced notes written as one full batch of two plus the remainder
+        self.assertEqual(sorted(len(batch) for batch in col.update_calls), [1, 2])
+
+        for note_id in (1, 6, 7):
+            tag = col.notes[note_id]["Audio"]
+            self.assertTrue(tag.startswith("[sound:"))
+            self.assertTrue(os.path.exists(os.path.join(self.media_dir, tag[7:-1])))
+        self.assertEqual(col.notes[2]["Audio"], "[sound:old.mp3]")
+        self.assertEqual(self.processor.requests, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test suite for the fused single-request CardCraft mode
+Runs without Anki dependencies: the OpenAI client is a fake
+"""
+
+import unittest
+import json
+
+from tests_support import load_functions_module
+
+
+FUSED_ANSWER = {
+    "word_stack": {"substantiv": ["en hvisking"], "adjektiv": None, "adverb": None,
+                   "verb": "hviske | hvisket | hvisket", "partisipp": "hviskende < null"},
+    "translation": {"substantiv": ["a whisper"], "adjektiv": None, "adverb": None,
+                    "verb": "whisper | whispered | whispered", "partisipp": "whispering"},
+    "description": ["🔸 Å snakke svært lavt."],
+    "examples_simple": "å **hviske** noe til noen\nen lav **hvisking**",
+    "sentences": ["Hun **hvisket** navnet hans.", "Vi hørte en **hvisking** i mørket."],
+}
+
+
+class FakeClient:
+    enabled = True
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def simple_request(self, prompt, system_message, examples=None, **settings):
+        self.calls.append((prompt, system_message, examples, settings))
+        return self.answer
+
+
+class TestFusedCardCraft(unittest.TestCase):
+    """Test cases for craft_fused and resolve_cardcraft_mode"""
+
+    def setUp(self):
+        self.module = load_functions_module("wordstack")
+        self.analyzer = self.module.NorwegianWordAnalyzer({
+            "openai_api_key": "test", "wordstack_store_enabled": False, "trace_log_enabled": False,
+            "field_1_response_lang": "Ukrainian"
+        })
+        self.show_critical = self.module.showCritical
+        self.module.showCritical = lambda text: None
+
+    def tearDown(self):
+        self.module.showCritical = self.show_critical
+
+    def test_one_request_gives_all_step_results(self):
+        """The fused answer is split and cleaned like the five step results"""
+        client = FakeClient(json.dumps(FUSED_ANSWER, ensure_ascii=False))
+        self.analyzer.openai_client = client
+        results = self.analyzer.craft_fused(" Hviske ")
+
+        self.assertEqual(len(client.calls), 1)
+        prompt, system_message, examples, settings = client.calls[0]
+        self.assertIn("INPUT: hviske", prompt)
+        self.assertIn("Ukrainian", system_message)
+        self.assertEqual(settings["options"].response_format, {"type": "json_object"})
+        self.assertEqual(len(examples), 1)
+        self.assertIn("word_stack", json.loads(examples[0]["assistant"]))
+
+        self.assertEqual(set(results), {"analysis", "translation", "description", "examples_simple", "sentences"})
+        self.assertEqual(results["analysis"]["verb"], "hviske | hvisket | hvisket")
+        self.assertEqual(results["translation"]["substantiv"], ["a whisper"])
+        self.assertEqual(results["description"], ["🔸 Å snakke svært lavt."])
+        self.assertEqual(results["examples_simple"], "å **hviske** <i>noe</i> til <i>noen</i>\nen lav **hvisking**")
+        self.assertEqual(results["sentences"], "Hun **hvisket** navnet hans.\nVi hørte en **hvisking** i mørket.")
+
+    def test_unusable_answer_is_none(self):
+        """Invalid JSON or a missing word stack fails the fused request"""
+        for answer in ("not json", json.dumps({"translation": {}}), None):
+            self.analyzer.openai_client = FakeClient(answer)
+            self.assertIsNone(self.analyzer.craft_fused("hviske"))
+
+    def test_missing_parts_are_none(self):
+        """Parts the model left out come back as None, like failed steps"""
+        self.analyzer.openai_client = FakeClient(json.dumps({"word_stack": FUSED_ANSWER["word_stack"]}))
+        results = self.analyzer.craft_fused("hviske")
+        self.assertIsNotNone(results["analysis"])
+        for name in ("translation", "description", "examples_simple", "sentences"):
+            self.assertIsNone(results[name])
+
+    def test_mode_per_deck(self):
+        """A deck uses its own mode, else its closest parent's, else the global one"""
+        resolve = self.module.resolve_cardcraft_mode
+        config = {"cardcraft_mode": "steps", "cardcraft_deck_modes": {"Norsk": "fused", "Norsk::Verb": "steps"}}
+        self.assertEqual(resolve(config, "Norsk"), "fused")
+        self.assertEqual(resolve(config, "Norsk::Substantiv::Abstrakt"), "fused")
+        self.assertEqual(resolve(config, "Norsk::Verb"), "steps")
+        self.assertEqual(resolve(config, "Engelsk"), "steps")
+        self.assertEqual(resolve(config, None), "steps")
+        self.assertEqual(resolve({"cardcraft_mode": "fused"}, "Engelsk"), "fused")
+        self.assertEqual(resolve({"cardcraft_mode": "unknown"}), "steps")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test suite for the resumable bulk job journal
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import tempfile
+
+from tests_support import load_functions_module
+
+
+class TestJobJournal(unittest.TestCase):
+    """Test cases for JobJournal"""
+
+    def setUp(self):
+        self.module = load_functions_module("job_journal")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resume_after_restart(self):
+        """Completed steps and notes survive reopening the journal"""
+        journal = self.module.JobJournal(self.path)
+        job_id = journal.create_job("cardcraft", [1, 2, 3])
+        journal.record_step(job_id, 1, "STEP1_NORWEGIAN_ANALYSIS", {"verb": "gå | gikk | gått"})
+        journal.mark_notes(job_id, [2], self.module.DONE)
+
+        # Simulated restart
+        reopened = self.module.JobJournal(self.path)
+        jobs = reopened.unfinished_jobs("cardcraft")
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["total"], 3)
+        self.assertEqual(jobs[0]["remaining"], 2)
+        self.assertEqual(reopened.remaining_notes(job_id), [1, 3])
+        self.assertEqual(
+            reopened.completed_steps(job_id, 1),
+            {"STEP1_NORWEGIAN_ANALYSIS": {"verb": "gå | gikk | gått"}}
+        )
+        self.assertEqual(reopened.completed_steps(job_id, 3), {})
+
+    def test_failed_notes_remain_resumable(self):
+        """Failed notes are still listed as remaining"""
+        journal = self.module.JobJournal(self.path)
+        job_id = journal.create_job("tts", [10, 11])
+        journal.mark_notes(job_id, [10], self.module.DONE)
+        journal.mark_notes(job_id, [11], self.module.FAILED)
+        self.assertEqual(journal.remaining_notes(job_id), [11])
+
+    def test_running_jobs_are_not_listed(self):
+        """Jobs still running in this session are left out, so they are not resumed twice"""
+        journal = self.module.JobJournal(self.path)
+        running = journal.create_job("cardcraft", [1])
+        interrupted = journal.create_job("tts", [2])
+        jobs = journal.unfinished_jobs(exclude={running})
+        self.assertEqual([job["job_id"] for job in jobs], [interrupted])
+
+    def test_finish_job(self):
+        """Finished jobs are no longer listed and their step results are dropped"""
+        journal = self.module.JobJournal(self.path)
+        job_id = journal.create_job("cardcraft", [1])
+        journal.record_step(job_id, 1, "STEP1_NORWEGIAN_ANALYSIS", {"adverb": "godt"})
+        journal.mark_notes(job_id, [1], self.module.DONE)
+        journal.finish_job(job_id)
+        self.assertEqual(journal.unfinished_jobs(), [])
+        self.assertEqual(journal.completed_steps(job_id, 1), {})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-step request metrics
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import json
+import tempfile
+
+from tests_support import load_functions_module
+
+
+USAGE = {"prompt_tokens": 900, "completion_tokens": 120, "prompt_tokens_details": {"cached_tokens": 512}}
+
+
+class TestHistogram(unittest.TestCase):
+    """Test cases for Histogram"""
+
+    def setUp(self):
+        self.module = load_functions_module("metrics")
+
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = self.module.Histogram(bounds=(0.1, 0.5, 1.0))
+        for value in [0.05] * 50 + [0.3] * 45 + [0.8] * 4 + [3.0]:
+            histogram.observe(value)
+        self.assertEqual(histogram.percentile(50), 0.1)
+        self.assertEqual(histogram.percentile(95), 0.5)
+        self.assertEqual(histogram.percentile(99), 1.0)
+        self.assertEqual(histogram.percentile(100), 3.0)
+        self.assertAlmostEqual(histogram.mean, (2.5 + 13.5 + 3.2 + 3.0) / 100)
+
+    def test_percentile_never_above_max(self):
+        histogram = self.module.Histogram(bounds=(1.0,))
+        histogram.observe(0.2)
+        self.assertEqual(histogram.percentile(50), 0.2)
+        self.assertEqual(self.module.Histogram().percentile(50), 0.0)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for MetricsRegistry"""
+
+    def setUp(self):
+        self.module = load_functions_module("metrics")
+        self.registry = self.module.MetricsRegistry()
+
+    def test_record_and_snapshot(self):
+        """Requests add up per step: tokens, retries, statuses, cache hits and errors"""
+        record = self.registry.record
+        record("STEP1_NORWEGIAN_ANALYSIS", "gpt-4.1", 1.2, queue=0.3, status=200, retries=1, usage=USAGE)
+        record("STEP1_NORWEGIAN_ANALYSIS", "gpt-4.1", 0.001, cached=True)
+        record("STEP1_NORWEGIAN_ANALYSIS", "gpt-4.1", 30.0, status=500, retries=4, ok=False)
+        record("STEP2_ENGLISH_TRANSLATION", "gpt-4.1-mini", 0.4, status=200, usage=USAGE)
+
+        stats = self.registry.snapshot()["STEP1_NORWEGIAN_ANALYSIS"]
+        self.assertEqual((stats["requests"], stats["errors"], stats["retries"], stats["cache_hits"]), (3, 1, 5, 1))
+        self.assertEqual((stats["prompt_tokens"], stats["completion_tokens"], stats["cached_tokens"]), (900, 120, 512))
+        self.assertEqual(stats["statuses"], {"200": 1, "cache": 1, "500": 1})
+        self.assertEqual(stats["wall"]["max"], 30.0)
+        self.assertEqual(self.registry.snapshot()["STEP2_ENGLISH_TRANSLATION"]["models"], {"gpt-4.1-mini": 1})
+
+    def test_report_lists_slowest_step_first(self):
+        self.assertIn("No requests", self.registry.report())
+        self.registry.record("STEP2_ENGLISH_TRANSLATION", "gpt-4.1", 0.4, status=200)
+        self.registry.record("STEP5_NORWEGIAN_SENTENCES", "gpt-4.1", 3.0, status=200)
+        lines = self.registry.report().splitlines()
+        self.assertTrue(lines[2].startswith("STEP5_NORWEGIAN_SENTENCES"))
+        self.assertTrue(lines[3].startswith("STEP2_ENGLISH_TRANSLATION"))
+
+    def test_export_writes_one_line_per_request(self):
+        trace_log = load_functions_module("trace_log")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "metrics.jsonl")
+            export = trace_log.TraceLogger(path)
+            registry = self.module.MetricsRegistry(export)
+            with trace_log.trace_context("hviske"):
+                registry.record("STEP1_NORWEGIAN_ANALYSIS", "gpt-4.1", 1.2, status=200, usage=USAGE)
+            export.close()
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["event"], "request")
+        self.assertEqual(records[0]["trace"], "hviske")
+        self.assertEqual(records[0]["cached_tokens"], 512)
+
+    def test_disabled(self):
+        self.assertIsNone(self.module.get_metrics({"metrics_enabled": False}))
+
+
+if __name__ == '__main__':
+    unittest.main()
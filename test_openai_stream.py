@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test suite for streamed (SSE) chat completions
+Runs without Anki dependencies against a local HTTP server
+"""
+
+import unittest
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests_support import load_functions_module
+
+
+CHUNKS = [
+    {"choices": [{"delta": {"role": "assistant"}}]},
+    {"choices": [{"delta": {"content": "Hei"}}]},
+    {"choices": [{"delta": {"content": " på"}}]},
+    {"choices": [{"delta": {"content": " deg!"}}]},
+    {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}},
+]
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        StreamHandler.requests_seen.append(json.loads(self.rfile.read(length)))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [f"data: {json.dumps(chunk)}\n\n" for chunk in CHUNKS]
+        events.insert(1, ": keep-alive\n\n")
+        events.append("data: [DONE]\n\n")
+        if StreamHandler.requests_seen[-1]["messages"][-1]["content"] == "cut":
+            events[3:] = ['data: {"choices": [{"delta": {"cont\n\n']  # Garbled after the first delta
+        for event in events:
+            payload = event.encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSSEParser(unittest.TestCase):
+    """Test cases for the incremental SSE parser"""
+
+    def setUp(self):
+        self.module = load_functions_module("openai_client")
+
+    def test_events_split_across_chunks(self):
+        """Events are returned only once complete, however the bytes are split"""
+        raw = b'data: {"a": 1}\r\n\r\n: comment\n\ndata: first\ndata: second\n\ndata: [DONE]\n\n'
+        for size in (1, 3, 7, len(raw)):
+            parser = self.module.SSEParser()
+            events = []
+            for start in range(0, len(raw), size):
+                events.extend(parser.feed(raw[start:start + size]))
+            self.assertEqual(events, ['{"a": 1}', "first\nsecond", "[DONE]"])
+
+    def test_multibyte_characters_split(self):
+        """UTF-8 characters split between chunks are decoded correctly"""
+        raw = "data: blåbær\n\n".encode("utf-8")
+        parser = self.module.SSEParser()
+        events = []
+        for byte in raw:
+            events.extend(parser.feed(bytes([byte])))
+        self.assertEqual(events, ["blåbær"])
+
+
+class TestStreamRequest(unittest.TestCase):
+    """Test cases for OpenAIClient.stream_request_with_usage"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_functions_module("openai_client")
+        cls.http_pool = load_functions_module("http_pool")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def make_client(self):
+        client = self.module.OpenAIClient({"openai_api_key": "test-key", "openai_cache_enabled": False})
+        client.pool = self.http_pool.ConnectionPool(f"http://127.0.0.1:{self.server.server_port}/v1")
+        return client
+
+    def test_deltas_text_and_usage(self):
+        """Deltas arrive in order and the full text, usage and first-token time are returned"""
+        client = self.make_client()
+        deltas = []
+        text, usage, ttft = client.stream_request_with_usage("Hei", on_delta=deltas.append)
+
+        self.assertEqual(deltas, ["Hei", " på", " deg!"])
+        self.assertEqual(text, "Hei på deg!")
+        self.assertEqual(usage["total_tokens"], 8)
+        self.assertIsNotNone(ttft)
+        self.assertTrue(StreamHandler.requests_seen[-1]["stream"])
+
+    def test_connection_reused_after_stream(self):
+        """A fully read stream returns its connection to the pool"""
+        client = self.make_client()
+        client.stream_request_with_usage("Hei")
+        self.assertEqual(len(client.pool._idle), 1)
+        client.stream_request_with_usage("Hei igjen")
+        self.assertEqual(len(client.pool._idle), 1)
+
+    def test_broken_stream_returns_reserved_tokens(self):
+        """A stream that fails after text was shown is not retried and gives back its tokens"""
+        client = self.make_client()
+        client.rate_limiter = load_functions_module("rate_limit").RateLimiter(0, 0)
+        settled = []
+        client.rate_limiter.settle = lambda estimated, used: settled.append(used)
+        deltas = []
+        text, usage, _ = client.stream_request_with_usage("cut", on_delta=deltas.append)
+        self.assertEqual(deltas, ["Hei"])
+        self.assertIsNone(text)
+        self.assertEqual(settled, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test suite for the CardCraft dependency-graph pipeline executor
+Runs without Anki dependencies
+"""
+
+import unittest
+import time
+import asyncio
+import threading
+import contextvars
+
+from tests_support import load_functions_module
+
+
+class TestRunPipeline(unittest.TestCase):
+    """Test cases for run_pipeline"""
+
+    def setUp(self):
+        self.pipeline = load_functions_module("pipeline")
+        self.Step = self.pipeline.PipelineStep
+
+    def test_dependencies_receive_results(self):
+        """Dependent steps are called with their dependencies' results"""
+        results = self.pipeline.run_pipeline([
+            self.Step("analysis", lambda: {"verb": "gå"}),
+            self.Step("translation", lambda a: a["verb"].upper(), ["analysis"]),
+            self.Step("both", lambda a, t: (a["verb"], t), ["analysis", "translation"]),
+        ])
+        self.assertEqual(results["translation"], "GÅ")
+        self.assertEqual(results["both"], ("gå", "GÅ"))
+
+    def test_independent_steps_run_concurrently(self):
+        """Steps that share only the root dependency overlap in time"""
+        barrier = threading.Barrier(3, timeout=2)
+
+        def wait_for_siblings(_):
+            barrier.wait()
+            return True
+
+        start = time.monotonic()
+        results = self.pipeline.run_pipeline([
+            self.Step("analysis", lambda: "root"),
+            self.Step("a", wait_for_siblings, ["analysis"]),
+            self.Step("b", wait_for_siblings, ["analysis"]),
+            self.Step("c", wait_for_siblings, ["analysis"]),
+        ], max_workers=4)
+        self.assertTrue(all(results[name] for name in "abc"))
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_failed_dependency_skips_dependents(self):
+        """A None result skips every step that depends on it"""
+        calls = []
+        results = self.pipeline.run_pipeline([
+            self.Step("analysis", lambda: None),
+            self.Step("translation", lambda a: calls.append(a), ["analysis"]),
+            self.Step("nested", lambda t: calls.append(t), ["translation"]),
+        ])
+        self.assertEqual(calls, [])
+        self.assertIsNone(results["translation"])
+        self.assertIsNone(results["nested"])
+
+    def test_step_exception_is_raised(self):
+        """An exception in a step is re-raised after the run"""
+        def broken():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.pipeline.run_pipeline([self.Step("analysis", broken)])
+
+    def test_steps_see_caller_context(self):
+        """Context variables set by the caller (the traced word) reach step threads"""
+        word = contextvars.ContextVar("word", default=None)
+        word.set("hviske")
+        results = self.pipeline.run_pipeline([
+            self.Step("analysis", lambda: word.get()),
+            self.Step("translation", lambda a: (a, word.get()), ["analysis"]),
+        ])
+        self.assertEqual(results["translation"], ("hviske", "hviske"))
+
+    def test_invalid_graph_rejected(self):
+        """Unknown dependencies and cycles are rejected up front"""
+        with self.assertRaises(ValueError):
+            self.pipeline.run_pipeline([self.Step("a", lambda x: x, ["missing"])])
+        with self.assertRaises(ValueError):
+            self.pipeline.run_pipeline([
+                self.Step("a", lambda x: x, ["b"]),
+                self.Step("b", lambda x: x, ["a"]),
+            ])
+
+
+class TestRunPipelineAsync(unittest.TestCase):
+    """Test cases for run_pipeline_async"""
+
+    def setUp(self):
+        self.pipeline = load_functions_module("pipeline")
+        self.Step = self.pipeline.PipelineStep
+
+    def test_steps_overlap_on_one_thread(self):
+        """Ready steps run at once as tasks; None results skip dependents"""
+        threads = []
+
+        async def root():
+            return {"verb": "gå"}
+
+        async def slow(analysis):
+            threads.append(threading.get_ident())
+            await asyncio.sleep(0.2)
+            return analysis["verb"]
+
+        async def nothing(_):
+            return None
+
+        async def never(_):
+            raise AssertionError("skipped step ran")
+
+        start = time.monotonic()
+        results = asyncio.run(self.pipeline.run_pipeline_async([
+            self.Step("analysis", root),
+            self.Step("a", slow, ["analysis"]),
+            self.Step("b", slow, ["analysis"]),
+            self.Step("c", slow, ["analysis"]),
+            self.Step("empty", nothing, ["analysis"]),
+            self.Step("nested", never, ["empty"]),
+        ]))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual([results[name] for name in "abc"], ["gå"] * 3)
+        self.assertIsNone(results["nested"])
+        self.assertEqual(set(threads), {threading.get_ident()})
+
+    def test_cancel_cancels_running_steps(self):
+        cancelled = []
+
+        async def root():
+            return True
+
+        async def hang(_):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            task = asyncio.ensure_future(self.pipeline.run_pipeline_async([
+                self.Step("analysis", root),
+                self.Step("a", hang, ["analysis"]),
+                self.Step("b", hang, ["analysis"]),
+            ]))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        self.assertEqual(cancelled, [True, True])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
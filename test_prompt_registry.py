@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test suite for the shared prompt registry
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import json
+import tempfile
+
+from tests_support import load_functions_module
+
+
+PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'InferAnki', 'prompts.json')
+
+
+class FakeClient:
+    enabled = True
+
+    def __init__(self):
+        self.calls = []
+
+    def simple_request(self, prompt, system_message, examples=None, **settings):
+        self.calls.append((prompt, system_message, examples))
+        return None
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """Test cases for PromptRegistry and CompiledPrompt"""
+
+    def setUp(self):
+        self.module = load_functions_module("prompt_registry")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "prompts.json")
+        self.reported = []
+        self.write_prompts({
+            "english_word_stack": {
+                "system_message": "Translate into {target_language}.",
+                "user_template": "{norwegian_json} -> {target_language}",
+                "api_settings": {"model": "gpt-4.1"},
+                "examples": {"hus": {"substantiv": "house"}},
+            }
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_prompts(self, prompts, mtime_ns=None):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(prompts, f)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def make_registry(self):
+        return self.module.PromptRegistry(self.path, report=self.reported.append)
+
+    def build_examples(self, prompt, target_language):
+        self.built.append(target_language)
+        for example_input, expected in prompt.get("examples", {}).items():
+            yield {"user": prompt.user_message(norwegian_json=example_input, target_language=target_language),
+                   "assistant": json.dumps(expected)}
+
+    def test_prefix_is_built_once_per_values(self):
+        """The system message and examples are formatted once and then shared"""
+        self.built = []
+        registry = self.make_registry()
+        prompt = registry.prompt("english_word_stack")
+        first = prompt.prefix(self.build_examples, target_language="Ukrainian")
+        again = registry.prompt("english_word_stack").prefix(self.build_examples, target_language="Ukrainian")
+        other = prompt.prefix(self.build_examples, target_language="English")
+
+        self.assertIs(first, again)
+        self.assertEqual(first[0], "Translate into Ukrainian.")
+        self.assertEqual(first[1], ({"user": "hus -> Ukrainian", "assistant": "{\"substantiv\": \"house\"}"},))
+        self.assertEqual(other[0], "Translate into English.")
+        self.assertEqual(self.built, ["Ukrainian", "English"])
+        self.assertEqual(registry.loads, 1)
+        self.assertEqual(prompt.user_message(norwegian_json="{}", target_language="English"), "{} -> English")
+
+    def test_reload_only_when_file_changes(self):
+        """An unchanged file is not parsed again; an edited one is"""
+        registry = self.make_registry()
+        before = registry.prompt("english_word_stack")
+        registry.prompts()
+        self.assertEqual(registry.loads, 1)
+
+        stat = os.stat(self.path)
+        self.write_prompts({"english_word_stack": {"system_message": "New {target_language}",
+                                                   "user_template": "{norwegian_json}"}},
+                           mtime_ns=stat.st_mtime_ns + 2_000_000_000)
+        after = registry.prompt("english_word_stack")
+        self.assertEqual(registry.loads, 2)
+        self.assertIsNot(after, before)
+        self.assertEqual(after.prefix(target_language="Norsk")[0], "New Norsk")
+
+    def test_unknown_placeholders_are_reported(self):
+        """A template the code cannot fill is reported once and left out"""
+        self.write_prompts({
+            "norwegian_description": {"system_message": "", "user_template": "{word_stack} {typo}"},
+            "chatbot": {"system_message": "{user_lang}", "user_template": "{user_message}",
+                        "quick_prompts": {"meaning": {"prompt_template": "{expression} {language}"}}},
+            "norwegian_word_stack": {"system_message": "Analyze {", "user_template": "{input_word}"},
+            "norwegian_examples_simple": {"system_message": "", "user_template": "{word_stack_json}"},
+        })
+        registry = self.make_registry()
+        self.assertIsNone(registry.prompt("norwegian_description"))
+        self.assertIsNone(registry.prompt("chatbot"))
+        self.assertIsNone(registry.prompt("norwegian_word_stack"))
+        self.assertIsNotNone(registry.prompt("norwegian_examples_simple"))
+        self.assertEqual(len(self.reported), 3)
+        self.assertIn("{typo}", self.reported[0])
+        self.assertIn("{language}", self.reported[1])
+        # The raw file is still there for callers that read it directly
+        self.assertIn("chatbot", registry.prompts())
+
+    def test_missing_file_is_reported(self):
+        registry = self.module.PromptRegistry(os.path.join(self.temp_dir.name, "none.json"),
+                                              report=self.reported.append)
+        self.assertIsNone(registry.prompt("chatbot"))
+        self.assertEqual(registry.prompts(), {})
+        registry.prompts()
+        self.assertEqual(self.reported, ["prompts.json not found"])
+
+    def test_shipped_prompts_are_valid(self):
+        registry = self.module.PromptRegistry(PROMPTS_PATH, report=self.reported.append)
+        with open(PROMPTS_PATH, encoding="utf-8") as f:
+            names = set(json.load(f))
+        self.assertEqual(self.reported, [])
+        self.assertEqual({name for name in names if registry.prompt(name)}, names)
+
+
+class TestAnalyzerPrompts(unittest.TestCase):
+    """The analyzer steps reuse the registry's prefixes"""
+
+    def setUp(self):
+        self.wordstack = load_functions_module("wordstack")
+        self.analyzer = self.wordstack.NorwegianWordAnalyzer({
+            "openai_api_key": "test", "wordstack_store_enabled": False, "trace_log_enabled": False,
+            "metrics_enabled": False, "field_1_response_lang": "English"
+        })
+        self.client = FakeClient()
+        self.analyzer.openai_client = self.client
+        self.show_critical = self.wordstack.showCritical
+        self.wordstack.showCritical = lambda text: None
+
+    def tearDown(self):
+        self.wordstack.showCritical = self.show_critical
+
+    def test_steps_share_examples_between_calls(self):
+        for word in ("hviske", "løpe"):
+            self.analyzer.analyze_word(word)
+            self.analyzer.get_examples_simple({"verb": word})
+        first_analysis, first_simple, second_analysis, second_simple = self.client.calls
+
+        self.assertIn("hviske", first_analysis[0])
+        self.assertIn("løpe", second_analysis[0])
+        self.assertIs(first_analysis[2], second_analysis[2])
+        self.assertIs(first_simple[2], second_simple[2])
+        # Examples-simple inputs are looked up in the word stack examples
+        self.assertTrue(first_simple[2])
+        self.assertTrue(all(example["user"] for example in first_simple[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test suite for retry backoff and token-bucket rate limiting
+Runs without Anki dependencies
+"""
+
+import unittest
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests_support import load_functions_module
+
+
+class FakeClock:
+    """Manual clock whose sleep advances time instantly"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for RetryPolicy and header parsing"""
+
+    def setUp(self):
+        self.module = load_functions_module("rate_limit")
+
+    def test_parse_durations(self):
+        """OpenAI reset headers and Retry-After variants are understood"""
+        self.assertEqual(self.module.parse_duration("6m0s"), 360.0)
+        self.assertAlmostEqual(self.module.parse_duration("20ms"), 0.02)
+        self.assertAlmostEqual(self.module.parse_duration("1h2m3.5s"), 3723.5)
+        self.assertEqual(self.module.parse_duration("7"), 7.0)
+        self.assertIsNone(self.module.parse_duration("soon"))
+        self.assertEqual(self.module.parse_retry_after({"retry-after": "3"}), 3.0)
+        self.assertEqual(self.module.parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}), 1.5)
+
+    def test_backoff_with_jitter(self):
+        """Delays stay within the exponential ceiling and Retry-After wins"""
+        policy = self.module.RetryPolicy(max_retries=5, base_delay=1.0, max_delay=8.0, rng=random.Random(1))
+        for attempt in range(6):
+            self.assertLessEqual(policy.delay(attempt), min(8.0, 2 ** attempt))
+        self.assertEqual(policy.delay(0, {"retry-after": "4"}), 4.0)
+        self.assertEqual(policy.delay(0, {"retry-after": "120"}), 8.0)
+
+    def test_should_retry(self):
+        """Only transient failures are retried, up to max_retries"""
+        policy = self.module.RetryPolicy(max_retries=2)
+        self.assertTrue(policy.should_retry(0, 429))
+        self.assertTrue(policy.should_retry(1, 503))
+        self.assertTrue(policy.should_retry(0, None))
+        self.assertFalse(policy.should_retry(2, 429))
+        self.assertFalse(policy.should_retry(0, 400))
+        self.assertFalse(policy.should_retry(0, 429, "insufficient_quota"))
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for TokenBucket and RateLimiter"""
+
+    def setUp(self):
+        self.module = load_functions_module("rate_limit")
+        self.clock = FakeClock()
+
+    def test_paces_after_burst(self):
+        """A full bucket allows a burst, then requests are paced at the rate"""
+        bucket = self.module.TokenBucket(60, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(60):
+            self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_server_headers_block_until_reset(self):
+        """remaining=0 from the server holds requests until the reset time"""
+        limiter = self.module.RateLimiter(600, 100000, clock=self.clock, sleep=self.clock.sleep)
+        limiter.observe({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+        limiter.acquire(10)
+        self.assertGreaterEqual(self.clock.now, 2.0)
+
+    def test_refund_unused_tokens(self):
+        """Reserved tokens not used by the response go back to the bucket"""
+        limiter = self.module.RateLimiter(0, 1000, clock=self.clock, sleep=self.clock.sleep)
+        limiter.acquire(900)
+        limiter.settle(900, 100)
+        self.assertEqual(limiter.acquire(800), 0.0)
+
+    def test_disabled_buckets(self):
+        """A rate of 0 never waits"""
+        limiter = self.module.RateLimiter(0, 0, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(1000):
+            limiter.acquire(10 ** 6)
+        self.assertEqual(self.clock.now, 0.0)
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    garbled = False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if FlakyHandler.failures > 0:
+            FlakyHandler.failures -= 1
+            body = json.dumps({"error": {"message": "Rate limit reached", "code": "rate_limit_exceeded"}})
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+        elif FlakyHandler.garbled:
+            body = "<html>Bad gateway</html>"
+            self.send_response(200)
+        else:
+            body = json.dumps({
+                "choices": [{"message": {"content": "Hei"}}],
+                "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}
+            })
+            self.send_response(200)
+        payload = body.encode("utf-8")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRetryingClient(unittest.TestCase):
+    """OpenAIClient retries 429 responses instead of failing"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_functions_module("openai_client")
+        cls.http_pool = load_functions_module("http_pool")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def make_client(self, max_retries):
+        client = self.module.OpenAIClient({
+            "openai_api_key": "test-key",
+            "openai_cache_enabled": False,
+            "openai_max_retries": max_retries,
+        })
+        client.pool = self.http_pool.ConnectionPool(f"http://127.0.0.1:{self.server.server_port}/v1")
+        return client
+
+    def test_retries_until_success(self):
+        FlakyHandler.failures = 2
+        self.assertEqual(self.make_client(max_retries=3).simple_request("Hei"), "Hei")
+
+    def test_retries_and_usage_are_recorded(self):
+        """One metrics record per request, with its retries, status and tokens"""
+        metrics = load_functions_module("metrics")
+        FlakyHandler.failures = 2
+        client = self.make_client(max_retries=3)
+        client.metrics = metrics.MetricsRegistry()
+        with metrics.request_step("STEP1_NORWEGIAN_ANALYSIS"):
+            client.simple_request("Hei", model="gpt-4.1")
+
+        stats = client.metrics.snapshot()["STEP1_NORWEGIAN_ANALYSIS"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["statuses"], {"200": 1})
+        self.assertEqual(stats["models"], {"gpt-4.1": 1})
+        self.assertEqual((stats["prompt_tokens"], stats["completion_tokens"]), (3, 1))
+
+    def test_gives_up_after_max_retries(self):
+        FlakyHandler.failures = 5
+        client = self.make_client(max_retries=1)
+        result = client._make_request("chat/completions", {"model": "gpt-4.1", "messages": []})
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error"], "Rate limit reached")
+        self.assertEqual(FlakyHandler.failures, 3)
+
+    def test_invalid_body_returns_reserved_tokens(self):
+        """A 200 whose body is not JSON gives back the tokens reserved for it"""
+        FlakyHandler.failures = 0
+        FlakyHandler.garbled = True
+        self.addCleanup(setattr, FlakyHandler, "garbled", False)
+        client = self.make_client(max_retries=0)
+        client.rate_limiter = load_functions_module("rate_limit").RateLimiter(0, 0)
+        settled = []
+        client.rate_limiter.settle = lambda estimated, used: settled.append(used)
+        result = client._make_request("chat/completions", {"model": "gpt-4.1", "messages": []})
+        self.assertFalse(result["success"])
+        self.assertEqual(settled, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-call request options
+Runs without Anki dependencies: requests are recorded instead of sent
+"""
+
+import unittest
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tests_support import load_functions_module
+
+
+PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'InferAnki', 'prompts.json')
+
+# Different settings for every step, so a request sent with another step's settings shows
+STEP_SETTINGS = {
+    "norwegian_word_stack": {"model": "gpt-4.1", "temperature": 0.1, "max_tokens": 1001, "cache": False},
+    "english_word_stack": {"model": "gpt-4.1-mini", "temperature": 0.2, "max_tokens": 1002},
+    "norwegian_description": {"model": "gpt-4o", "temperature": 0.3, "max_tokens": 1003},
+    "norwegian_examples_simple": {"model": "gpt-4o-mini", "temperature": 0.4, "max_tokens": 1004},
+    "norwegian_examples_sentences": {"model": "gpt-4.1-nano", "temperature": 0.5, "max_tokens": 1005},
+}
+
+
+class TestRequestOptions(unittest.TestCase):
+    """Test cases for RequestOptions and the shared client"""
+
+    def setUp(self):
+        self.client_module = load_functions_module("openai_client")
+        self.wordstack = load_functions_module("wordstack")
+        registry_module = load_functions_module("prompt_registry")
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        with open(PROMPTS_PATH, encoding="utf-8") as f:
+            prompts = json.load(f)
+        for name, settings in STEP_SETTINGS.items():
+            prompts[name]["api_settings"] = settings
+        path = os.path.join(self.temp_dir.name, "prompts.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(prompts, f, ensure_ascii=False)
+
+        self.analyzer = self.wordstack.NorwegianWordAnalyzer({
+            "openai_api_key": "test", "wordstack_store_enabled": False, "trace_log_enabled": False,
+            "metrics_enabled": False, "openai_cache_enabled": False, "field_1_response_lang": "English"
+        })
+        self.analyzer.prompt_registry = registry_module.PromptRegistry(path, report=self.fail)
+        self.system_messages = {
+            self.analyzer.prompt_registry.prompt(name).prefix(target_language="English")[0]: name
+            for name in STEP_SETTINGS
+        }
+
+        self.sent = []
+        self.sent_lock = threading.Lock()
+        self.analyzer.openai_client._cached_request = self.record_request
+        self.show_critical = self.wordstack.showCritical
+        self.wordstack.showCritical = lambda text: None
+
+    def tearDown(self):
+        self.wordstack.showCritical = self.show_critical
+        self.temp_dir.cleanup()
+
+    def record_request(self, endpoint, data, use_cache=False):
+        # Give other threads the chance to run between building and sending a request
+        time.sleep(random.uniform(0, 0.002))
+        with self.sent_lock:
+            self.sent.append((data, use_cache))
+        return {"success": True, "data": {"choices": [{"message": {"content": "{}"}}]}}
+
+    def test_concurrent_steps_send_their_own_settings(self):
+        """All steps on one client from many threads - every request carries its step's settings"""
+        analyzer = self.analyzer
+        word_stack = {"verb": "hviske | hvisket | hvisket"}
+        steps = [
+            lambda: analyzer.analyze_word("hviske"),
+            lambda: analyzer.translate_to_language(word_stack),
+            lambda: analyzer.get_description("hviske"),
+            lambda: analyzer.get_examples_simple(word_stack),
+            lambda: analyzer.get_examples_sentences(word_stack),
+        ]
+        rounds = 40
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            for future in [pool.submit(step) for _ in range(rounds) for step in steps]:
+                future.result()
+
+        self.assertEqual(len(self.sent), rounds * len(steps))
+        per_step = {}
+        for data, use_cache in self.sent:
+            name = self.system_messages[data["messages"][0]["content"]]
+            settings = STEP_SETTINGS[name]
+            per_step[name] = per_step.get(name, 0) + 1
+            self.assertEqual(data["model"], settings["model"], name)
+            self.assertEqual(data["temperature"], settings["temperature"], name)
+            self.assertEqual(data["max_tokens"], settings["max_tokens"], name)
+            self.assertEqual(use_cache, settings.get("cache", False), name)
+        self.assertEqual(per_step, {name: rounds for name in STEP_SETTINGS})
+
+        # Defaults are untouched by all of that
+        client = analyzer.openai_client
+        self.assertEqual((client.model, client.temperature, client.max_tokens), ("gpt-4.1", 0.3, 1500))
+
+    def test_options_are_immutable(self):
+        options = self.client_module.RequestOptions(model="gpt-4.1")
+        with self.assertRaises(AttributeError):
+            options.model = "gpt-4o"
+        with self.assertRaises(AttributeError):
+            self.analyzer.openai_client.model = "gpt-4o"
+
+    def test_unset_fields_use_client_defaults(self):
+        client = self.analyzer.openai_client
+        options = self.client_module.RequestOptions(temperature=0, response_format={"type": "json_object"})
+        data = client._prepare_request_data([], options)
+        self.assertEqual((data["model"], data["temperature"], data["max_tokens"]), ("gpt-4.1", 0, 1500))
+        self.assertEqual(data["response_format"], {"type": "json_object"})
+
+        gpt5 = client._prepare_request_data([], self.client_module.RequestOptions(model="gpt-5-mini", max_tokens=50))
+        self.assertEqual(gpt5["max_completion_tokens"], 50)
+        self.assertNotIn("temperature", gpt5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test suite for the persistent chat completion response cache
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import tempfile
+import time
+
+from tests_support import load_functions_module
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache"""
+
+    def setUp(self):
+        self.module = load_functions_module("response_cache")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_is_canonical(self):
+        """Key does not depend on dict ordering but does depend on parameters"""
+        make_key = self.module.ResponseCache.make_key
+        a = {"model": "gpt-4.1", "messages": [{"role": "user", "content": "god"}], "temperature": 0}
+        b = {"temperature": 0, "messages": [{"content": "god", "role": "user"}], "model": "gpt-4.1"}
+        c = dict(a, temperature=0.5)
+        self.assertEqual(make_key(a), make_key(b))
+        self.assertNotEqual(make_key(a), make_key(c))
+
+    def test_round_trip_and_persistence(self):
+        """Stored responses survive reopening the database"""
+        cache = self.module.ResponseCache(self.path)
+        cache.put("k", {"choices": [{"message": {"content": "hei"}}]})
+        reopened = self.module.ResponseCache(self.path)
+        self.assertEqual(reopened.get("k")["choices"][0]["message"]["content"], "hei")
+        self.assertIsNone(reopened.get("missing"))
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL are treated as misses"""
+        cache = self.module.ResponseCache(self.path, ttl_seconds=0.01)
+        cache.put("k", {"v": 1})
+        time.sleep(0.05)
+        self.assertIsNone(cache.get("k"))
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted above max_entries"""
+        cache = self.module.ResponseCache(self.path, max_entries=2)
+        cache.put("a", {"v": "a"})
+        cache.put("b", {"v": "b"})
+        cache.get("a")  # a is now more recent than b
+        cache.put("c", {"v": "c"})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+
+    def test_disabled_in_config(self):
+        """get_response_cache returns None when the cache is disabled"""
+        self.assertIsNone(self.module.get_response_cache({"openai_cache_enabled": False}))
+        cache = self.module.get_response_cache({"openai_cache_path": self.path})
+        self.assertIsNotNone(cache)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
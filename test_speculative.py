@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test suite for speculative CardCraft while typing
+Runs without Anki dependencies
+"""
+
+import unittest
+import time
+import asyncio
+import threading
+
+from tests_support import load_functions_module
+
+
+class RecordingSteps:
+    """Step 1 and step 2 functions that record their calls"""
+
+    def __init__(self, step_delay=0.0):
+        self.step_delay = step_delay
+        self.calls = []
+        self.lock = threading.Lock()
+        self.quiet = []
+
+    def analysis(self, word, results):
+        with self.lock:
+            self.calls.append(("analysis", word))
+        self.quiet.append(load_functions_module("ui_thread").errors_are_quiet())
+        time.sleep(self.step_delay)
+        return {"verb": word}
+
+    def translation(self, word, results):
+        with self.lock:
+            self.calls.append(("translation", word))
+        return {"verb": results["STEP1"]["verb"].upper()}
+
+    def steps(self):
+        return [("STEP1", self.analysis), ("STEP2", self.translation)]
+
+
+class TestSpeculativeCardCraft(unittest.TestCase):
+    """Test cases for SpeculativeCardCraft"""
+
+    def setUp(self):
+        self.module = load_functions_module("speculative")
+
+    def wait_idle(self, speculator, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while speculator._current is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_debounce_runs_only_last_text(self):
+        """Quick edits schedule one run, for the text after the pause"""
+        steps = RecordingSteps()
+        speculator = self.module.SpeculativeCardCraft(steps.steps(), delay=0.05)
+        for word in ("h", "hv", "hvi", "hviske"):
+            speculator.text_changed(word)
+        self.wait_idle(speculator)
+
+        self.assertEqual(steps.calls, [("analysis", "hviske"), ("translation", "hviske")])
+        self.assertEqual(speculator.results_for("hviske"), {"STEP1": {"verb": "hviske"}, "STEP2": {"verb": "HVISKE"}})
+        self.assertEqual(steps.quiet, [True])
+
+        # Same text again (another field changed) - nothing is requested
+        speculator.text_changed("hviske")
+        self.wait_idle(speculator)
+        self.assertEqual(len(steps.calls), 2)
+
+    def test_new_text_cancels_running_speculation(self):
+        """A result that arrives after the text changed is dropped and step 2 never starts"""
+        steps = RecordingSteps(step_delay=0.2)
+        speculator = self.module.SpeculativeCardCraft(steps.steps(), delay=0.01)
+        speculator.text_changed("hviske")
+        time.sleep(0.1)  # Step 1 is in flight
+        speculator.text_changed("")
+        time.sleep(0.3)
+
+        self.assertEqual(steps.calls, [("analysis", "hviske")])
+        self.assertEqual(speculator.results_for("hviske"), {})
+
+    def test_new_text_cancels_the_request_in_flight(self):
+        """A step handed to the request loop is cancelled there, not just ignored"""
+        requests = load_functions_module("async_openai_client").BlockingOpenAIClient(
+            {"openai_api_key": "test", "openai_cache_enabled": False, "metrics_enabled": False}
+        )
+        self.addCleanup(requests.close)
+        started, cancelled, quiet = threading.Event(), threading.Event(), []
+
+        async def request(word):
+            quiet.append(load_functions_module("ui_thread").errors_are_quiet())
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return {"verb": word}
+
+        speculator = self.module.SpeculativeCardCraft(
+            [("STEP1", lambda word, results: requests.submit(request, word))], delay=0.01
+        )
+        speculator.text_changed("hviske")
+        self.assertTrue(started.wait(2))
+        speculator.text_changed("")
+
+        self.assertTrue(cancelled.wait(2))
+        self.wait_idle(speculator)
+        self.assertEqual(speculator.results_for("hviske"), {})
+        self.assertEqual(quiet, [True])
+
+    def test_results_for_waits_for_running_speculation(self):
+        """Pressing the button mid-run waits instead of sending the same requests"""
+        steps = RecordingSteps(step_delay=0.2)
+        speculator = self.module.SpeculativeCardCraft(steps.steps(), delay=0.01)
+        speculator.text_changed("løpe")
+        time.sleep(0.1)
+
+        self.assertEqual(set(speculator.results_for("løpe")), {"STEP1", "STEP2"})
+
+    def test_results_for_cancels_pending_speculation(self):
+        """A speculation still waiting out the delay is cancelled, not waited for"""
+        steps = RecordingSteps()
+        speculator = self.module.SpeculativeCardCraft(steps.steps(), delay=0.2)
+        speculator.text_changed("god")
+        self.assertEqual(speculator.results_for("god"), {})
+        time.sleep(0.3)
+        self.assertEqual(steps.calls, [])
+
+    def test_failed_step_stops_the_chain(self):
+        """Nothing after a step that returned None runs; earlier results are kept"""
+        calls = []
+        speculator = self.module.SpeculativeCardCraft([
+            ("STEP1", lambda word, results: calls.append(1) or {"verb": word}),
+            ("STEP2", lambda word, results: None),
+            ("STEP3", lambda word, results: calls.append(3)),
+        ], delay=0.01)
+        speculator.text_changed("ro")
+        self.wait_idle(speculator)
+        self.assertEqual(calls, [1])
+        self.assertEqual(speculator.results_for("ro"), {"STEP1": {"verb": "ro"}})
+
+    def test_finished_words_are_bounded(self):
+        """Only the most recent max_words results are kept"""
+        speculator = self.module.SpeculativeCardCraft(RecordingSteps().steps(), delay=0.0, max_words=2)
+        for word in ("a", "b", "c"):
+            speculator.text_changed(word)
+            self.wait_idle(speculator)
+        self.assertEqual(speculator.results_for("a"), {})
+        self.assertIn("STEP1", speculator.results_for("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
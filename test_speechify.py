@@ -11,6 +11,8 @@ import json
 import sys
 from unittest.mock import Mock, patch, MagicMock
 
+from tests_support import load_functions_module
+
 # Mock Anki environment before importing
 sys.modules['aqt'] = Mock()
 sys.modules['aqt.utils'] = Mock()
@@ -47,14 +49,7 @@ class TestSpeechifySimple(unittest.TestCase):
     def test_import_speechify_processor(self):
         """Test that SpeechifyTTSProcessor can be imported"""
         try:
-            # Import directly from the file to avoid Anki dependencies
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "tts_handler", 
-                os.path.join(os.path.dirname(__file__), 'InferAnki', 'functions', 'tts_handler.py')
-            )
-            tts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tts_module)
+            tts_module = load_functions_module("tts_handler", fresh=True)
             
             # Test that the class exists
             self.assertTrue(hasattr(tts_module, 'SpeechifyTTSProcessor'))
@@ -69,13 +64,7 @@ class TestSpeechifySimple(unittest.TestCase):
         """Test text processing logic without full initialization"""
         try:
             # Import the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "tts_handler", 
-                os.path.join(os.path.dirname(__file__), 'InferAnki', 'functions', 'tts_handler.py')
-            )
-            tts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tts_module)
+            tts_module = load_functions_module("tts_handler", fresh=True)
             
             # Create processor instance
             processor = tts_module.SpeechifyTTSProcessor(self.test_config)
@@ -100,13 +89,7 @@ class TestSpeechifySimple(unittest.TestCase):
         """Test configuration loading"""
         try:
             # Import the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "tts_handler", 
-                os.path.join(os.path.dirname(__file__), 'InferAnki', 'functions', 'tts_handler.py')
-            )
-            tts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tts_module)
+            tts_module = load_functions_module("tts_handler", fresh=True)
             
             # Create processor instance
             processor = tts_module.SpeechifyTTSProcessor(self.test_config)
@@ -126,13 +109,7 @@ class TestSpeechifySimple(unittest.TestCase):
         """Test Norwegian voice mapping"""
         try:
             # Import the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "tts_handler", 
-                os.path.join(os.path.dirname(__file__), 'InferAnki', 'functions', 'tts_handler.py')
-            )
-            tts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tts_module)
+            tts_module = load_functions_module("tts_handler", fresh=True)
             
             # Test Emma voice mapping
             config_emma = self.test_config.copy()
@@ -153,13 +130,7 @@ class TestSpeechifySimple(unittest.TestCase):
         """Test different audio format support"""
         try:
             # Import the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "tts_handler", 
-                os.path.join(os.path.dirname(__file__), 'InferAnki', 'functions', 'tts_handler.py')
-            )
-            tts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(tts_module)
+            tts_module = load_functions_module("tts_handler", fresh=True)
             
             supported_formats = ["aac", "mp3", "ogg", "wav"]
             
@@ -173,6 +144,234 @@ class TestSpeechifySimple(unittest.TestCase):
         except Exception as e:
             self.fail(f"Audio formats test failed: {e}")
 
+class TestTTSAudioCache(unittest.TestCase):
+    """Test content-addressed reuse of voiced audio"""
+    
+    def setUp(self):
+        self.tts_module = load_functions_module("tts_handler", fresh=True)
+        
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "tts_enabled": True,
+            "speechify_api_key": "test_api_key",
+            "tts_media_dir": self.media_dir.name
+        }
+    
+    def tearDown(self):
+        self.media_dir.cleanup()
+    
+    def test_key_depends_on_voice_settings(self):
+        """Identical text with another voice or format gets another key"""
+        make_key = self.tts_module.TTSAudioCache.make_key
+        base = make_key("hei", "scott", "simba-multilingual", "nb-NO", "mp3")
+        self.assertEqual(base, make_key("hei", "scott", "simba-multilingual", "nb-NO", "mp3"))
+        self.assertNotEqual(base, make_key("hei", "emma", "simba-multilingual", "nb-NO", "mp3"))
+        self.assertNotEqual(base, make_key("hei", "scott", "simba-multilingual", "nb-NO", "wav"))
+        self.assertNotEqual(base, make_key("hei.", "scott", "simba-multilingual", "nb-NO", "mp3"))
+    
+    def test_hit_reuses_media_file_without_api_call(self):
+        """Audio found in the media folder is returned without calling Speechify"""
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        key = processor.audio_key(processor.process_text_for_tts("Hei på deg"))
+        name = self.tts_module.TTSAudioCache.media_name(key, "mp3")
+        with open(os.path.join(self.media_dir.name, name), "wb") as f:
+            f.write(b"audio")
+        
+        # Index is rebuilt from the media folder by a fresh processor
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        self.tts_module.Speechify = Mock()
+        path = processor.create_audio_file("Hei på deg")
+        
+        self.assertEqual(path, os.path.join(self.media_dir.name, name))
+        self.assertTrue(processor.is_media_file(path))
+        self.tts_module.Speechify.assert_not_called()
+    
+    def test_miss_decodes_into_media_folder(self):
+        """New audio is decoded straight into the media folder and indexed"""
+        import base64
+        audio = bytes(range(256)) * 1000  # Several decode chunks
+        self.tts_module.Speechify = Mock()
+        speech = self.tts_module.Speechify.return_value.tts.audio.speech
+        speech.return_value = Mock(audio_data=base64.b64encode(audio).decode("ascii"))
+
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        path = processor.create_audio_file("Hei på deg")
+
+        self.assertTrue(processor.is_media_file(path))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), audio)
+        self.assertEqual(os.listdir(self.media_dir.name), [os.path.basename(path)])
+
+        # Second request is a cache hit on the file just written
+        self.assertEqual(processor.create_audio_file("Hei på deg"), path)
+        self.assertEqual(speech.call_count, 1)
+        self.assertEqual(self.tts_module.Speechify.call_count, 1)
+
+    def test_write_base64_handles_line_breaks(self):
+        """Payloads with line breaks decode to the same bytes"""
+        import base64
+        import io
+        audio = os.urandom(100000)
+        for data in (base64.b64encode(audio), base64.encodebytes(audio).decode("ascii")):
+            f = io.BytesIO()
+            self.assertEqual(self.tts_module.write_base64(data, f), len(audio))
+            self.assertEqual(f.getvalue(), audio)
+
+    def test_deleted_media_file_is_a_miss(self):
+        """A cached file removed from the media folder is not returned"""
+        cache = self.tts_module.TTSAudioCache(self.media_dir.name)
+        cache.add("0" * 40, "inferanki-tts-" + "0" * 40 + ".mp3")
+        self.assertIsNone(cache.lookup("0" * 40))
+        self.assertEqual(len(cache), 0)
+
+    def test_concurrent_callers_share_one_audio_cache(self):
+        """Threads asking for the cache at once get the same instance, built once"""
+        import threading
+        import time
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        real_cache = self.tts_module.TTSAudioCache
+        built = []
+
+        def slow_cache(media_dir):
+            time.sleep(0.05)
+            built.append(media_dir)
+            return real_cache(media_dir)
+
+        caches = []
+        with patch.object(self.tts_module, "TTSAudioCache", side_effect=slow_cache):
+            threads = [threading.Thread(target=lambda: caches.append(processor.get_audio_cache())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len({id(cache) for cache in caches}), 1)
+
+class TestTTSChunking(unittest.TestCase):
+    """Test chunked synthesis of long text"""
+    
+    def setUp(self):
+        self.tts_module = load_functions_module("tts_handler", fresh=True)
+        
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.media_dir = os.path.join(self.temp_dir.name, "media")
+        os.makedirs(self.media_dir)
+        self.config = {
+            "tts_enabled": True,
+            "speechify_api_key": "test_api_key",
+            "tts_media_dir": self.media_dir,
+            "tts_chunk_cache_dir": os.path.join(self.temp_dir.name, "chunks"),
+            "tts_chunk_chars": 200
+        }
+        self.sentences = [f"Setning nummer {i} handler om {'ord ' * (i % 7)}og mer." for i in range(40)]
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    @staticmethod
+    def frame(text):
+        """One 128 kbit/s MPEG-1 Layer III frame whose payload identifies text"""
+        return b"\xff\xfb\x90\x64" + bytes([sum(text.encode("utf-8")) % 256]) * 413
+    
+    def mock_speechify(self):
+        import base64
+        self.tts_module.Speechify = Mock()
+        speech = self.tts_module.Speechify.return_value.tts.audio.speech
+        speech.side_effect = lambda **kwargs: Mock(
+            audio_data=base64.b64encode(self.frame(kwargs["input"]) * 2).decode("ascii")
+        )
+        return speech
+    
+    def test_split_keeps_text_and_limit(self):
+        """Chunks fit the limit, end at sentences and join back into the text"""
+        text = " ".join(self.sentences)
+        chunks = self.tts_module.split_tts_text(text, 200)
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(" ".join(chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 200)
+            self.assertTrue(chunk.endswith("."))
+        self.assertEqual(self.tts_module.split_tts_text("kort tekst", 200), ["kort tekst"])
+        self.assertEqual(self.tts_module.split_tts_text("", 200), [])
+        
+        # A sentence over the limit is cut between words
+        long_sentence = " ".join(["ord"] * 100)
+        chunks = self.tts_module.split_tts_text(long_sentence, 50)
+        self.assertEqual(" ".join(chunks), long_sentence)
+        self.assertTrue(all(len(chunk) <= 50 for chunk in chunks))
+    
+    def test_edit_changes_few_chunks(self):
+        """Editing one sentence leaves most chunk boundaries where they were"""
+        before = self.tts_module.split_tts_text(" ".join(self.sentences), 200)
+        edited = list(self.sentences)
+        edited[20] = "En mye lengre setning som erstatter den gamle og tar mer plass enn den."
+        after = self.tts_module.split_tts_text(" ".join(edited), 200)
+        self.assertLessEqual(len(set(after) - set(before)), 2)
+    
+    def test_frame_spans_skip_tags_and_info_frame(self):
+        """ID3 tags, the Xing frame and junk are not part of the audio"""
+        frame = self.frame("a")
+        info_frame = b"\xff\xfb\x90\x64" + bytes(32) + b"Xing" + bytes(377)
+        id3 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"12345"
+        data = id3 + info_frame + frame * 3 + b"junk" + frame + b"TAG" + bytes(125)
+        spans = self.tts_module.mp3_frame_spans(data)
+        start = len(id3) + len(info_frame)
+        self.assertEqual(spans, [[start, start + 3 * 417], [start + 3 * 417 + 4, start + 4 * 417 + 4]])
+    
+    def test_long_text_is_voiced_in_chunks(self):
+        """Chunks are requested separately and their frames joined in text order"""
+        speech = self.mock_speechify()
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        text = "<br>".join(self.sentences)
+        chunks = processor.speech_chunks(text, processor.process_text_for_tts(text))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith('<prosody rate="0.8">'))
+        
+        path = processor.create_audio_file(text)
+        self.assertEqual(speech.call_count, len(chunks))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"".join(self.frame(chunk) * 2 for chunk in chunks))
+        self.assertEqual(os.listdir(self.media_dir), [os.path.basename(path)])
+        
+        # After an edit only the changed chunks are requested again
+        edited = list(self.sentences)
+        edited[20] = "En helt ny setning."
+        edited_text = "<br>".join(edited)
+        edited_chunks = processor.speech_chunks(edited_text, processor.process_text_for_tts(edited_text))
+        speech.reset_mock()
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        processor.create_audio_file(edited_text)
+        self.assertEqual(speech.call_count, len(set(edited_chunks) - set(chunks)))
+        self.assertGreater(speech.call_count, 0)
+    
+    def test_short_text_is_one_request(self):
+        """Text under the limit keeps a single request and no chunk cache"""
+        speech = self.mock_speechify()
+        processor = self.tts_module.SpeechifyTTSProcessor(self.config)
+        processor.create_audio_file("Hei på deg")
+        self.assertEqual(speech.call_count, 1)
+        self.assertFalse(os.path.exists(self.config["tts_chunk_cache_dir"]))
+    
+    def test_prune_removes_least_recently_used(self):
+        """prune deletes the oldest chunk audio first"""
+        chunk_dir = os.path.join(self.temp_dir.name, "chunks")
+        os.makedirs(chunk_dir)
+        names = []
+        for i in range(3):
+            name = self.tts_module.TTSAudioCache.media_name(str(i) * 40, "mp3")
+            path = os.path.join(chunk_dir, name)
+            with open(path, "wb") as f:
+                f.write(bytes(100))
+            os.utime(path, (1000 + i, 1000 + i))
+            names.append(name)
+        cache = self.tts_module.TTSAudioCache(chunk_dir)
+        cache.prune(250)
+        self.assertEqual(sorted(os.listdir(chunk_dir)), names[1:])
+        self.assertIsNone(cache.lookup("0" * 40))
+        self.assertEqual(len(cache), 2)
+
+
 class TestConfigurationFiles(unittest.TestCase):
     """Test configuration file structure"""
     
@@ -218,6 +417,7 @@ def run_simple_tests():
     
     # Add test cases
     suite.addTest(unittest.makeSuite(TestSpeechifySimple))
+    suite.addTest(unittest.makeSuite(TestTTSAudioCache))
     suite.addTest(unittest.makeSuite(TestConfigurationFiles))
     
     # Run tests
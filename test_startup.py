@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Startup budget for the add-on import
+Runs without Anki: the benchmark imports the add-on against a stand-in for aqt
+"""
+
+import unittest
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(__file__), 'benchmarks')
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+import bench_startup  # noqa: E402
+
+# Median import time allowed; the lazy add-on takes about a third of this, the eager one took more
+STARTUP_BUDGET_MS = 120
+
+
+class TestStartup(unittest.TestCase):
+    """Importing the add-on stays cheap and side-effect free"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.report = bench_startup.run(runs=3)
+
+    def test_heavy_modules_are_deferred(self):
+        self.assertEqual(self.report["deferred_loaded"], [])
+
+    def test_no_threads_or_files_at_import(self):
+        self.assertEqual(self.report["threads_started"], 0)
+        self.assertEqual(self.report["created"], [])
+
+    def test_import_time_within_budget(self):
+        self.assertLess(self.report["median_ms"], STARTUP_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
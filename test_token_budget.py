@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test suite for prompts.json request settings and the adaptive token budget
+Runs without Anki dependencies: requests are answered by a fake
+"""
+
+import unittest
+import os
+import tempfile
+
+from tests_support import load_functions_module
+
+
+def completion(tokens, finish_reason="stop"):
+    return {"success": True, "data": {
+        "choices": [{"message": {"content": "x" * tokens}, "finish_reason": finish_reason}],
+        "usage": {"completion_tokens": tokens},
+    }}
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Test cases for TokenBudget"""
+
+    def setUp(self):
+        self.module = load_functions_module("token_budget")
+
+    def test_configured_limit_until_enough_samples(self):
+        budget = self.module.TokenBudget(min_samples=5, floor=10)
+        for _ in range(4):
+            budget.observe("STEP3", 100)
+        self.assertEqual(budget.limit("STEP3", 1000), 1000)
+        budget.observe("STEP3", 100)
+        self.assertEqual(budget.limit("STEP3", 1000), 150)
+        self.assertEqual(budget.limit(None, 1000), 1000)
+
+    def test_limit_follows_percentile_within_bounds(self):
+        budget = self.module.TokenBudget(percentile=90, headroom=1.5, min_samples=10, floor=200)
+        for length in range(10, 110, 10):  # 10 .. 100
+            budget.observe("STEP1", length)
+        self.assertEqual(budget.limit("STEP1", 2000), 200)  # 90 * 1.5 = 135, raised to the floor
+        for length in [600] * 10:
+            budget.observe("STEP1", length)
+        self.assertEqual(budget.limit("STEP1", 2000), 900)
+        self.assertEqual(budget.limit("STEP1", 500), 500)  # Never above the configured limit
+
+    def test_window_forgets_old_lengths(self):
+        budget = self.module.TokenBudget(percentile=100, headroom=1.0, min_samples=3, floor=1, window=3)
+        for length in (1000, 50, 50, 50):
+            budget.observe("STEP2", length)
+        self.assertEqual(budget.limit("STEP2", 2000), 50)
+        self.assertEqual(budget.snapshot()["STEP2"], {"samples": 3, "limit": 50, "truncated": 0})
+
+
+class TestBudgetedRequests(unittest.TestCase):
+    """The client applies the budget per step and recovers from truncation"""
+
+    def setUp(self):
+        self.client_module = load_functions_module("openai_client")
+        self.metrics = load_functions_module("metrics")
+        budget_module = load_functions_module("token_budget")
+        cache_module = load_functions_module("response_cache")
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+        self.client = self.client_module.OpenAIClient({
+            "openai_api_key": "test", "openai_cache_enabled": False, "metrics_enabled": False
+        })
+        self.client.token_budget = budget_module.TokenBudget(min_samples=3, floor=10, headroom=1.0)
+        self.client.cache = cache_module.ResponseCache(os.path.join(self.temp_dir.name, "cache.sqlite3"))
+        self.sent = []
+        self.answers = []
+        self.client._make_request = self.fake_request
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fake_request(self, endpoint, data):
+        self.sent.append(data["max_tokens"])
+        return self.answers.pop(0)
+
+    def request(self, prompt="Hei", cache=False):
+        options = self.client_module.RequestOptions(model="gpt-4.1", max_tokens=2000, cache=cache)
+        with self.metrics.request_step("STEP3_NORWEGIAN_DESCRIPTION"):
+            return self.client.simple_request(prompt, options=options)
+
+    def test_lengths_cap_later_requests(self):
+        self.answers = [completion(40), completion(60), completion(50), completion(45)]
+        for _ in range(4):
+            self.request()
+        self.assertEqual(self.sent, [2000, 2000, 2000, 60])
+
+    def test_truncated_answer_is_resent_with_configured_limit(self):
+        self.answers = [completion(40)] * 3 + [completion(40, "length"), completion(300)]
+        for _ in range(3):
+            self.request()
+        self.assertEqual(self.request(), "x" * 300)
+        self.assertEqual(self.sent[3:], [40, 2000])
+        stats = self.client.token_budget.snapshot()["STEP3_NORWEGIAN_DESCRIPTION"]
+        self.assertEqual((stats["truncated"], stats["samples"]), (1, 4))
+
+    def test_capped_requests_share_the_cache_entry(self):
+        """Answers are cached as the configured request, so the budget never causes a cache miss"""
+        self.answers = [completion(40), completion(40), completion(40)]
+        for prompt in ("a", "b", "c"):
+            self.request(prompt, cache=True)
+        for prompt in ("a", "b", "c"):
+            self.request(prompt, cache=True)
+        self.assertEqual(len(self.sent), 3)
+
+    def test_truncated_answers_are_not_cached(self):
+        self.answers = [completion(2000, "length"), completion(30)]
+        self.request(cache=True)
+        self.request(cache=True)
+        self.assertEqual(len(self.sent), 2)
+
+
+class TestPromptSettings(unittest.TestCase):
+    """api_settings from prompts.json reach every request"""
+
+    def setUp(self):
+        self.client_module = load_functions_module("openai_client")
+
+    def test_max_completion_tokens_and_response_format(self):
+        options = self.client_module.RequestOptions.from_api_settings({
+            "model": "gpt-5-chat-latest", "temperature": 0, "max_completion_tokens": 2000,
+            "response_format": {"type": "json_object"}, "cache": True
+        })
+        self.assertEqual(options.max_tokens, 2000)
+        self.assertTrue(options.cache)
+        client = self.client_module.OpenAIClient({"openai_api_key": "test"})
+        data = client._prepare_request_data([], options)
+        self.assertEqual(data["max_completion_tokens"], 2000)
+        self.assertEqual(data["response_format"], {"type": "json_object"})
+        self.assertEqual(data["temperature"], 0)
+        self.assertNotIn("cache", data)
+
+    def test_steps_use_shipped_settings(self):
+        """Every analyzer step sends its prompt's token limit and JSON mode"""
+        wordstack = load_functions_module("wordstack")
+        analyzer = wordstack.NorwegianWordAnalyzer({
+            "openai_api_key": "test", "wordstack_store_enabled": False, "trace_log_enabled": False
+        })
+        calls = []
+
+        class FakeClient:
+            enabled = True
+
+            def simple_request(self, prompt, system_message, examples=None, options=None):
+                calls.append(options)
+                return None
+
+        analyzer.openai_client = FakeClient()
+        show_critical = wordstack.showCritical
+        wordstack.showCritical = lambda text: None
+        try:
+            word_stack = {"verb": "hviske"}
+            analyzer.analyze_word("hviske")
+            analyzer.translate_to_language(word_stack)
+            analyzer.get_description("hviske")
+            analyzer.get_examples_simple(word_stack)
+            analyzer.get_examples_sentences(word_stack)
+        finally:
+            wordstack.showCritical = show_critical
+
+        prompts = analyzer.prompts
+        names = ["norwegian_word_stack", "english_word_stack", "norwegian_description",
+                 "norwegian_examples_simple", "norwegian_examples_sentences"]
+        self.assertEqual(len(calls), len(names))
+        for name, options in zip(names, calls):
+            settings = prompts[name]["api_settings"]
+            self.assertEqual(options.max_tokens, settings["max_completion_tokens"], name)
+            self.assertEqual(options.response_format, settings.get("response_format"), name)
+            self.assertEqual(options.temperature, settings["temperature"], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
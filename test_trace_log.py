@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test suite for the background trace log
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import gzip
+import json
+import tempfile
+import threading
+
+from tests_support import load_functions_module
+
+
+def read_records(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestTraceLogger(unittest.TestCase):
+    """Test cases for TraceLogger and get_trace_logger"""
+
+    def setUp(self):
+        self.module = load_functions_module("trace_log")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "logs", "trace.jsonl")
+        self.loggers = []
+
+    def tearDown(self):
+        for logger in self.loggers:
+            logger.close()
+        self.temp_dir.cleanup()
+
+    def make_logger(self, **kwargs):
+        logger = self.module.TraceLogger(self.path, **kwargs)
+        self.loggers.append(logger)
+        return logger
+
+    def test_records_are_written_by_the_writer_thread(self):
+        """log() returns at once; flush() waits for the JSON lines to be on disk"""
+        logger = self.make_logger()
+        logger.log("api_call", trace="hviske", step="STEP1_NORWEGIAN_ANALYSIS", response="{\"verb\": \"hviske\"}")
+        with self.module.trace_context("løpe"):
+            logger.log("step", step="STEP2_ENGLISH_TRANSLATION", elapsed=0.5)
+        self.assertTrue(logger.flush())
+
+        records = read_records(self.path)
+        self.assertEqual([r["event"] for r in records], ["api_call", "step"])
+        self.assertEqual(records[0]["trace"], "hviske")
+        self.assertEqual(records[1]["trace"], "løpe")
+        self.assertEqual(records[1]["elapsed"], 0.5)
+        self.assertNotEqual(records[0]["thread"], "InferAnki trace log")
+
+    def test_rotation_gzips_old_files(self):
+        """Past max_bytes the file becomes name.1.gz; only backups old files are kept"""
+        logger = self.make_logger(max_bytes=2000, backups=2)
+        for i in range(60):
+            logger.log("step", trace="ord", index=i, padding="x" * 100)
+            logger.flush()
+        logger.close()
+
+        files = sorted(os.listdir(os.path.dirname(self.path)))
+        self.assertEqual([name for name in files if name.endswith(".gz")], ["trace.jsonl.1.gz", "trace.jsonl.2.gz"])
+        newest = read_records(self.path + ".1.gz")
+        if os.path.exists(self.path):
+            newest += read_records(self.path)
+        indices = [r["index"] for r in newest]
+        self.assertEqual(indices, list(range(indices[0], 60)))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Records beyond the queue size are counted and reported, never waited for"""
+        logger = self.make_logger(queue_size=5)
+        release = threading.Event()
+        original_write = logger._write
+        logger._write = lambda records: (release.wait(5), original_write(records))
+        for i in range(50):
+            logger.log("step", trace="ord", index=i)
+        release.set()
+        logger.flush()
+
+        self.assertGreater(logger.dropped, 0)
+        records = read_records(self.path)
+        dropped = [r for r in records if r["event"] == "trace_dropped"]
+        self.assertEqual(sum(r["count"] for r in dropped), logger.dropped)
+        self.assertEqual(len(records) - len(dropped) + logger.dropped, 50)
+
+    def test_sampling_keeps_whole_traces(self):
+        """A sampled-out word loses all of its records, a kept word none"""
+        logger = self.make_logger(sample_rate=0.5)
+        words = [f"ord{i}" for i in range(40)]
+        for word in words:
+            for step in ("STEP1", "STEP2"):
+                logger.log("step", trace=word, step=step)
+        logger.flush()
+
+        per_word = {}
+        for record in read_records(self.path):
+            per_word.setdefault(record["trace"], []).append(record["step"])
+        self.assertTrue(0 < len(per_word) < len(words))
+        self.assertTrue(all(steps == ["STEP1", "STEP2"] for steps in per_word.values()))
+        self.assertEqual(set(per_word), {w for w in words if self.module.trace_sampled(w, 0.5)})
+
+    def test_disabled_logger_writes_nothing(self):
+        """Disabled or zero sample rate gives the shared no-op logger"""
+        for config in ({"trace_log_enabled": False, "trace_log_path": self.path},
+                       {"trace_log_sample_rate": 0, "trace_log_path": self.path}):
+            logger = self.module.get_trace_logger(config)
+            self.assertFalse(logger.enabled)
+            logger.log("step", trace="ord")
+            self.assertTrue(logger.flush())
+        self.assertFalse(os.path.exists(os.path.dirname(self.path)))
+
+    def test_shared_logger_per_path(self):
+        config = {"trace_log_path": self.path}
+        logger = self.module.get_trace_logger(config)
+        self.loggers.append(logger)
+        self.assertIs(self.module.get_trace_logger(config), logger)
+        logger.close()
+        self.assertIsNot(self.module.get_trace_logger(config), logger)
+        self.loggers.append(self.module.get_trace_logger(config))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the TTS text normalizer
+The normalizer must produce exactly what the old regex cascade produced
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import sys
+import json
+import random
+
+from tests_support import load_functions_module
+
+
+ROOT_DIR = os.path.dirname(__file__)
+GOLDEN_PATH = os.path.join(ROOT_DIR, 'tts_normalizer_golden.json')
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+from tts_normalizer_legacy import legacy_normalize  # noqa: E402
+
+
+# Pieces of field HTML the random inputs are assembled from
+FRAGMENTS = [
+    "ord", "god", " ", "  ", "\n", "\r\n", "\t", ".", "..", "...", "....", "|", "-", " - ", "<", ">", "<>",
+    "<br>", "<BR/>", "<br />", "<br", "</li>", "<li>", "<li class='x'>", "<ul>", "</ul>", "<ol>", "</ol>",
+    "<div>", "</div>", "<div class=a>", "</DIV>", "<b>", "</b>", "<span style=\"x\">", "<link>",
+    "&nbsp;", "&amp;", "&lt;", "&gt;", "&quot;", "&hellip;", "&#39;", "&amp;quot;", "&amp;nbsp;", "&amp;lt;",
+    "&", "lt;", "nbsp;", ";", "/", "🔸", "⟨LONG_PAUSE⟩",
+]
+
+
+class TestTTSNormalizer(unittest.TestCase):
+    """Test cases for normalize_tts_text"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_functions_module("tts_handler")
+
+    def test_golden_corpus(self):
+        """Every corpus field normalizes to the recorded cascade output"""
+        with open(GOLDEN_PATH, encoding='utf-8') as f:
+            corpus = json.load(f)
+        for case in corpus:
+            with self.subTest(text=case["input"]):
+                self.assertEqual(self.module.normalize_tts_text(case["input"]), case["expected"])
+
+    def test_golden_corpus_matches_cascade(self):
+        """The corpus itself is still what the reference cascade gives"""
+        with open(GOLDEN_PATH, encoding='utf-8') as f:
+            corpus = json.load(f)
+        for case in corpus:
+            self.assertEqual(legacy_normalize(case["input"]), case["expected"])
+
+    def test_random_fields_match_cascade(self):
+        """Random mixes of tags, entities and separators give identical output"""
+        rng = random.Random(12)
+        for _ in range(5000):
+            text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 25)))
+            self.assertEqual(self.module.normalize_tts_text(text), legacy_normalize(text), repr(text))
+
+    def test_processor_wraps_prosody(self):
+        """process_text_for_tts keeps the speech rate wrapper, even around empty text"""
+        processor = self.module.SpeechifyTTSProcessor({"elevenlabs_speech_rate": 0.8})
+        self.assertEqual(processor.process_text_for_tts("a | b<br>c"), '<prosody rate="0.8">a, b .. c</prosody>')
+        self.assertEqual(processor.process_text_for_tts("<b></b>"), '<prosody rate="0.8"></prosody>')
+        self.assertEqual(processor.process_text_for_tts(None), "")
+
+        processor.speech_rate = 1.0
+        self.assertEqual(processor.process_text_for_tts("<b></b>"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
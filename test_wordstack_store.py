@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test suite for the lemma-keyed word stack store
+Runs without Anki dependencies
+"""
+
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+
+from tests_support import load_functions_module
+
+
+class TestWordStackStore(unittest.TestCase):
+    """Test cases for WordStackStore"""
+
+    def setUp(self):
+        self.module = load_functions_module("wordstack_store")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "wordstack.sqlite3")
+        self.analysis = {
+            "substantiv": ["et hvisk", "en hvisking"],
+            "adjektiv": None,
+            "adverb": None,
+            "verb": "hviske | hvisket | hvisket",
+            "partisipp": "hviskende"
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_normalize_lemma(self):
+        """Case, whitespace and edge punctuation are normalized away; words keep their articles"""
+        normalize = self.module.normalize_lemma
+        self.assertEqual(normalize("  En   Hvisking. "), "en hvisking")
+        self.assertEqual(normalize("PC-en"), "pc-en")
+        self.assertEqual(normalize("et"), "et")
+        self.assertEqual(self.module.normalize_form("å anta"), "anta")
+        self.assertEqual(self.module.normalize_form("en hvisking"), "hvisking")
+        self.assertEqual(self.module.normalize_form("en"), "en")
+
+    def test_lookup_by_lemma_and_form(self):
+        """The stored stack is found by its lemma and by any contained form"""
+        store = self.module.WordStackStore(self.path)
+        store.store_analysis("hvisk", self.analysis)
+        for word in ("hvisk", "Hvisket", "en hvisking", "hviskende"):
+            lemma, analysis = store.lookup(word)
+            self.assertEqual(lemma, "hvisk")
+            self.assertEqual(analysis, self.analysis)
+        self.assertEqual(store.lookup("god"), (None, None))
+
+    def test_stack_is_keyed_by_its_own_lemma(self):
+        """An inflected input is stored under the base form it belongs to"""
+        store = self.module.WordStackStore(self.path)
+        self.assertEqual(store.store_analysis("Hvisket", self.analysis), "hviske")
+        self.assertEqual(store.lookup("hviske")[0], "hviske")
+        self.assertEqual(store.lookup("et")[0], None)
+
+    def test_shared_forms_are_not_answered_from_the_store(self):
+        """A form of several stacks needs a request; an exact lemma still matches"""
+        store = self.module.WordStackStore(self.path)
+        god = {"substantiv": None, "adjektiv": "god < bedre < best", "adverb": None, "verb": None, "partisipp": None}
+        bra = {"substantiv": None, "adjektiv": "bra < bedre < best", "adverb": "bra", "verb": None, "partisipp": None}
+        store.store_analysis("god", god)
+        self.assertEqual(store.lookup("bedre"), ("god", god))
+        store.store_analysis("bra", bra)
+        self.assertEqual(store.lookup("bedre"), (None, None))
+        self.assertEqual(store.lookup("god"), ("god", god))
+
+        lese = {"substantiv": ["en lesing"], "adjektiv": None, "adverb": None,
+                "verb": "lese | leser | leste | lest", "partisipp": None}
+        leser = {"substantiv": ["en leser"], "adjektiv": None, "adverb": None, "verb": None, "partisipp": None}
+        store.store_analysis("lese", lese)
+        store.store_analysis("leser", leser)
+        self.assertEqual(store.lookup("leser"), ("leser", leser))
+        self.assertEqual(store.lookup("leste"), ("lese", lese))
+
+    def test_reanalysis_drops_old_forms(self):
+        """Forms of the replaced stack no longer lead to it"""
+        store = self.module.WordStackStore(self.path)
+        store.store_analysis("hvisk", self.analysis)
+        store.store_analysis("hvisk", dict(self.analysis, partisipp=None))
+        self.assertEqual(store.lookup("hviskende"), (None, None))
+
+    def test_old_forms_index_is_rebuilt(self):
+        """Stores written with the first-owner-wins forms table are migrated on open"""
+        conn = sqlite3.connect(self.path)
+        conn.executescript(
+            "CREATE TABLE stacks (lemma TEXT PRIMARY KEY, analysis TEXT NOT NULL,"
+            " stack_hash TEXT NOT NULL, updated REAL NOT NULL);"
+            "CREATE TABLE forms (form TEXT PRIMARY KEY, lemma TEXT NOT NULL);"
+        )
+        conn.execute("INSERT INTO stacks VALUES ('hvisk', ?, '', 0)", (json.dumps(self.analysis),))
+        conn.execute("INSERT INTO forms VALUES ('hviskende', 'other')")
+        conn.commit()
+        conn.close()
+
+        store = self.module.WordStackStore(self.path)
+        self.assertEqual(store.lookup("hviskende")[0], "hvisk")
+
+    def test_translations_per_language(self):
+        """Translations are stored per language and shared by reopened stores"""
+        store = self.module.WordStackStore(self.path)
+        store.store_analysis("hvisk", self.analysis)
+        store.store_translation(self.analysis, "English", {"verb": "whisper | whispered | whispered"})
+
+        reopened = self.module.WordStackStore(self.path)
+        self.assertEqual(reopened.get_translation(dict(self.analysis), "english")["verb"],
+                         "whisper | whispered | whispered")
+        self.assertIsNone(reopened.get_translation(self.analysis, "Ukrainian"))
+
+    def test_new_analysis_drops_old_translations(self):
+        """Re-analyzing a lemma invalidates translations of the old stack"""
+        store = self.module.WordStackStore(self.path)
+        store.store_analysis("hvisk", self.analysis)
+        store.store_translation(self.analysis, "English", {"verb": "whisper"})
+        updated = dict(self.analysis, partisipp=None)
+        store.store_analysis("hvisk", updated)
+        self.assertIsNone(store.get_translation(updated, "English"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
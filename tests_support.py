@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the test suites
+Loads InferAnki/functions modules without Anki dependencies
+"""
+
+import os
+import sys
+import types
+import importlib
+import importlib.util
+
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'InferAnki', 'functions')
+
+
+def load_functions_module(name, fresh=False):
+    """Import a functions/ module without running functions/__init__.py (which needs Qt)
+
+    fresh=True executes a new copy of the module, for tests that replace its globals.
+    """
+    package = sys.modules.get("inferanki_functions")
+    if package is None:
+        package = types.ModuleType("inferanki_functions")
+        package.__path__ = [FUNCTIONS_DIR]
+        sys.modules["inferanki_functions"] = package
+    if not fresh:
+        return importlib.import_module(f"inferanki_functions.{name}")
+    spec = importlib.util.spec_from_file_location(
+        f"inferanki_functions.{name}", os.path.join(FUNCTIONS_DIR, f"{name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module